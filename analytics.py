@@ -0,0 +1,311 @@
+# utils/analytics.py
+# Columnar snapshot of order history for ad-hoc analytics. Orders and line
+# items are exported from SQLite into fixed-width column files (timestamps,
+# paise amounts, payment/order-type codes, dictionary-encoded item ids,
+# quantities) under db/analytics/, refreshed incrementally by order id.
+# Reports memory-map the columns and scan them with NumPy when it is
+# installed (plain memoryview loops otherwise), without touching the live DB.
+import calendar
+import heapq
+import json
+import mmap
+import os
+import sqlite3
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from utils import db_utils
+from utils.calculator import from_minor
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python scans
+    np = None
+
+SNAPSHOT_DIR = "analytics"  # under db_utils.DB_DIR
+META_FILE = "meta.json"
+FETCH_SIZE = 10000
+
+# column name -> array typecode
+ORDER_COLUMNS = {"id": "q", "ts": "q", "total": "q", "subtotal": "q", "gst": "q",
+                 "discount": "q", "payment": "b", "order_type": "b"}
+ITEM_COLUMNS = {"order_id": "q", "ts": "q", "item": "i", "qty": "i", "price": "q"}
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+ORDER_TYPES = ("Dine-In", "Takeaway")
+
+_NP_TYPES = {"q": "<i8", "i": "<i4", "b": "i1"}
+
+def _snapshot_dir(path=None):
+    return path or os.path.join(db_utils.DB_DIR, SNAPSHOT_DIR)
+
+def _column_path(directory, table, name):
+    return os.path.join(directory, f"{table}.{name}.col")
+
+@lru_cache(maxsize=4096)
+def _day_epoch(day):
+    return calendar.timegm(datetime.strptime(day, "%Y-%m-%d").timetuple())
+
+def _epoch(order_date):
+    """'YYYY-MM-DD HH:MM:SS' (naive local time) -> seconds, treating it as UTC so days stay aligned."""
+    return (_day_epoch(order_date[:10]) + int(order_date[11:13]) * 3600
+            + int(order_date[14:16]) * 60 + int(order_date[17:19]))
+
+def _day_bounds(start_date, end_date):
+    return _day_epoch(start_date), _day_epoch(end_date) + 86400
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_order_id": 0, "orders": 0, "items": 0, "item_names": []}
+
+def _write_meta(directory, meta):
+    tmp = os.path.join(directory, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, META_FILE))
+
+# ---------------------------------------------------------------------- refresh
+
+def _sources(conn):
+    """Yield schema names holding orders: main plus each archived partition (attached)."""
+    yield "main"
+    for part, _, _ in db_utils.order_segments(conn, "0000-01-01", "9999-12-31"):
+        if part is None:
+            continue
+        with db_utils.attach_partition(conn, part) as schemas:
+            yield schemas[0]
+
+def refresh_snapshot(path=None):
+    """
+    Append orders with id above the snapshot's last_order_id (all orders on
+    the first run, archived partitions included). Column files are
+    appended first and meta.json replaced last, so a crash mid-refresh
+    leaves the previous snapshot intact.
+    Returns: number of orders added
+    """
+    directory = _snapshot_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    meta = _read_meta(directory)
+    last = meta["last_order_id"]
+    names = meta["item_names"]
+    codes = {n: i for i, n in enumerate(names)}
+    pay_codes = {v: i for i, v in enumerate(PAYMENT_METHODS)}
+    type_codes = {v: i for i, v in enumerate(ORDER_TYPES)}
+
+    # Drop anything a crashed refresh appended past the committed counts
+    files = {}
+    for table, columns, count in (("orders", ORDER_COLUMNS, meta["orders"]), ("items", ITEM_COLUMNS, meta["items"])):
+        for name, code in columns.items():
+            p = _column_path(directory, table, name)
+            f = open(p, "ab")
+            f.truncate(count * array(code).itemsize)
+            files[table, name] = f
+
+    db_path = db_utils._db_path()
+    conn = sqlite3.connect(db_utils.read_only_uri(db_path), uri=True)
+    conn.row_factory = sqlite3.Row
+    n_orders = n_items = 0
+    max_id = last
+    try:
+        for schema in _sources(conn):
+            cur = conn.execute(f"""
+                SELECT id, order_date, total, subtotal, gst, discount, payment_method, order_type
+                FROM {schema}.orders WHERE id > ? ORDER BY id;
+            """, (last,))
+            while True:
+                rows = cur.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                cols = {k: array(c) for k, c in ORDER_COLUMNS.items()}
+                for oid, order_date, total, subtotal, gst, discount, payment, otype in rows:
+                    cols["id"].append(oid)
+                    cols["ts"].append(_epoch(order_date))
+                    cols["total"].append(round(total * 100))
+                    cols["subtotal"].append(round(subtotal * 100))
+                    cols["gst"].append(round(gst * 100))
+                    cols["discount"].append(round(discount * 100))
+                    cols["payment"].append(pay_codes[payment])
+                    cols["order_type"].append(type_codes[otype])
+                for k, col in cols.items():
+                    col.tofile(files["orders", k])
+                n_orders += len(rows)
+                max_id = max(max_id, rows[-1][0])
+
+            cur = conn.execute(f"""
+                SELECT oi.order_id, o.order_date, oi.item_name, oi.quantity, oi.price
+                FROM {schema}.order_items oi
+                JOIN {schema}.orders o ON o.id = oi.order_id
+                WHERE oi.order_id > ? ORDER BY oi.order_id, oi.id;
+            """, (last,))
+            while True:
+                rows = cur.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                cols = {k: array(c) for k, c in ITEM_COLUMNS.items()}
+                for oid, order_date, name, qty, price in rows:
+                    code = codes.get(name)
+                    if code is None:
+                        code = codes[name] = len(names)
+                        names.append(name)
+                    cols["order_id"].append(oid)
+                    cols["ts"].append(_epoch(order_date))
+                    cols["item"].append(code)
+                    cols["qty"].append(qty)
+                    cols["price"].append(round(price * 100))
+                for k, col in cols.items():
+                    col.tofile(files["items", k])
+                n_items += len(rows)
+    finally:
+        conn.close()
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    if n_orders or n_items:
+        meta.update(last_order_id=max_id, orders=meta["orders"] + n_orders, items=meta["items"] + n_items,
+                    item_names=names, refreshed_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        _write_meta(directory, meta)
+    return n_orders
+
+# ---------------------------------------------------------------------- reading
+
+class _Column:
+    """Read-only memory-mapped column: a NumPy array, or a memoryview without NumPy."""
+
+    def __init__(self, path, code, length):
+        self._mm = None
+        if length == 0:
+            self.data = np.zeros(0, dtype=_NP_TYPES[code]) if np is not None else memoryview(array(code))
+            return
+        if np is not None:
+            self.data = np.memmap(path, dtype=_NP_TYPES[code], mode="r", shape=(length,))
+        else:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = memoryview(self._mm)[:length * array(code).itemsize].cast(code)
+
+    def close(self):
+        if self._mm is not None:
+            self.data.release()
+            self._mm.close()
+
+class Snapshot:
+    """
+    Memory-mapped view of a snapshot. Date arguments are inclusive
+    YYYY-MM-DD; amounts are returned in major units.
+    """
+
+    def __init__(self, path=None):
+        self.directory = _snapshot_dir(path)
+        self.meta = _read_meta(self.directory)
+        self.item_names = self.meta["item_names"]
+        self.orders = {k: _Column(_column_path(self.directory, "orders", k), c, self.meta["orders"])
+                       for k, c in ORDER_COLUMNS.items()}
+        self.items = {k: _Column(_column_path(self.directory, "items", k), c, self.meta["items"])
+                      for k, c in ITEM_COLUMNS.items()}
+
+    def close(self):
+        for col in (*self.orders.values(), *self.items.values()):
+            col.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _o(self, name):
+        return self.orders[name].data
+
+    def _i(self, name):
+        return self.items[name].data
+
+    def summary(self, start_date, end_date):
+        """Returns: dict with orders, total, subtotal, gst, discount, avg_order_value"""
+        lo, hi = _day_bounds(start_date, end_date)
+        keys = ("total", "subtotal", "gst", "discount")
+        if np is not None:
+            ts = self._o("ts")
+            mask = (ts >= lo) & (ts < hi)
+            n = int(np.count_nonzero(mask))
+            sums = {k: int(self._o(k)[mask].sum()) for k in keys}
+        else:
+            sums = dict.fromkeys(keys, 0)
+            n = 0
+            cols = [self._o(k) for k in keys]
+            for i, t in enumerate(self._o("ts")):
+                if lo <= t < hi:
+                    n += 1
+                    for k, col in zip(keys, cols):
+                        sums[k] += col[i]
+        out = {k: from_minor(v) for k, v in sums.items()}
+        out["orders"] = n
+        out["avg_order_value"] = round(sums["total"] / n / 100, 2) if n else None
+        return out
+
+    def sales_by_day(self, start_date, end_date):
+        """Returns: list of (YYYY-MM-DD, orders, total), oldest first"""
+        lo, hi = _day_bounds(start_date, end_date)
+        if np is not None:
+            ts = self._o("ts")
+            mask = (ts >= lo) & (ts < hi)
+            days = ts[mask] // 86400
+            uniq, inverse = np.unique(days, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(uniq))
+            totals = np.zeros(len(uniq), dtype=np.int64)
+            np.add.at(totals, inverse, self._o("total")[mask])
+            rows = zip(uniq.tolist(), counts.tolist(), totals.tolist())
+        else:
+            acc = {}
+            total = self._o("total")
+            for i, t in enumerate(self._o("ts")):
+                if lo <= t < hi:
+                    a = acc.setdefault(t // 86400, [0, 0])
+                    a[0] += 1
+                    a[1] += total[i]
+            rows = ((d, n, s) for d, (n, s) in sorted(acc.items()))
+        return [(datetime.fromtimestamp(d * 86400, timezone.utc).strftime("%Y-%m-%d"), n, from_minor(s)) for d, n, s in rows]
+
+    def by_payment_method(self, start_date, end_date):
+        """Returns: {payment_method: (orders, total)}"""
+        lo, hi = _day_bounds(start_date, end_date)
+        k = len(PAYMENT_METHODS)
+        if np is not None:
+            ts = self._o("ts")
+            mask = (ts >= lo) & (ts < hi)
+            codes = self._o("payment")[mask].astype(np.int64)
+            counts = np.bincount(codes, minlength=k).tolist()
+            totals = np.zeros(k, dtype=np.int64)
+            np.add.at(totals, codes, self._o("total")[mask])
+            totals = totals.tolist()
+        else:
+            counts, totals = [0] * k, [0] * k
+            pay, total = self._o("payment"), self._o("total")
+            for i, t in enumerate(self._o("ts")):
+                if lo <= t < hi:
+                    counts[pay[i]] += 1
+                    totals[pay[i]] += total[i]
+        return {m: (counts[c], from_minor(totals[c])) for c, m in enumerate(PAYMENT_METHODS)}
+
+    def top_items(self, start_date, end_date, n=5):
+        """Returns: list of (item_name, quantity), largest first; ties by item name (as SQL reports)"""
+        lo, hi = _day_bounds(start_date, end_date)
+        if np is not None:
+            ts = self._i("ts")
+            mask = (ts >= lo) & (ts < hi)
+            qty = np.bincount(self._i("item")[mask], weights=self._i("qty")[mask],
+                              minlength=len(self.item_names)).astype(np.int64).tolist()
+        else:
+            qty = [0] * len(self.item_names)
+            item, q = self._i("item"), self._i("qty")
+            for i, t in enumerate(self._i("ts")):
+                if lo <= t < hi:
+                    qty[item[i]] += q[i]
+        totals = ((self.item_names[c], qty[c]) for c in range(len(qty)) if qty[c] > 0)
+        return heapq.nsmallest(n, totals, key=lambda kv: (-kv[1], kv[0]))
@@ -5,8 +5,11 @@ Restaurant Billing Software - Main Application Entry Point
 
 import sys
 import os
-import tkinter as tk
+import argparse
 import logging
+import time
+
+_STARTED = time.perf_counter()
 
 # Enable logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -15,10 +18,11 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(BASE_DIR)
 
-from ui.main_ui import RestaurantBillingApp
+def run_gui():
+    """Start the Tkinter billing application."""
+    import tkinter as tk
+    from ui.main_ui import RestaurantBillingApp
 
-def main():
-    """Main entry point for the Restaurant Billing Software"""
     logging.info("=" * 60)
     logging.info("RESTAURANT BILLING SOFTWARE")
     logging.info("=" * 60)
@@ -37,7 +41,7 @@ def main():
     root.title("Restaurant Billing Software")
     app = RestaurantBillingApp(root)
 
-    logging.info("Application started successfully!")
+    logging.info(f"Application started successfully in {(time.perf_counter() - _STARTED) * 1000:.0f} ms!")
     logging.info("=" * 60)
     logging.info("Features available:")
     logging.info("- Dine-In and Takeaway order support")
@@ -50,5 +54,236 @@ def main():
 
     root.mainloop()
 
+def run_ingest(path, batch_size):
+    """Bulk-load orders from a JSONL file."""
+    from utils.db_utils import init_database, iter_orders_jsonl, save_orders_bulk
+
+    init_database()
+    start = time.perf_counter()
+    ids = save_orders_bulk(iter_orders_jsonl(path), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    if ids:
+        logging.info(f"Ingested {len(ids)} orders (#{ids[0]}..#{ids[-1]}) from {path} in {elapsed:.2f}s")
+    else:
+        logging.info(f"No orders found in {path}")
+
+def run_rebuild_rollup(start_date=None, end_date=None):
+    """Backfill or repair the daily_sales rollup from the orders table."""
+    from utils.db_utils import init_database, rebuild_daily_sales
+
+    init_database()
+    days = rebuild_daily_sales(start_date, end_date)
+    logging.info(f"Rebuilt daily_sales rollup for {days} day(s)")
+
+def run_archive(granularity, before=None, vacuum=False):
+    """Move closed months/years of orders into read-only archive databases"""
+    from utils.db_utils import init_database
+    from utils.partitions import archive_orders
+    init_database()
+    start = time.perf_counter()
+    moved = archive_orders(before, granularity, vacuum=vacuum)
+    total = sum(n for _, n in moved)
+    logging.info(f"Archived {total} order(s) in {len(moved)} partition(s) in {time.perf_counter() - start:.2f}s")
+
+def run_report(start_date, end_date, chunk="month", workers=None, outlets=None, years=0):
+    """Print a parallel sales report (optionally across outlet databases / year over year) as JSON"""
+    import json
+    from utils.db_utils import init_database
+    from utils.report_engine import ReportEngine
+    if not outlets:
+        init_database()
+    start = time.perf_counter()
+    with ReportEngine(workers=workers, chunk=chunk, databases=outlets) as engine:
+        if years:
+            result = engine.year_over_year(start_date, end_date, years)
+        else:
+            result = engine.sales_report(start_date, end_date)
+    print(json.dumps(result, indent=2))
+    logging.info(f"Report built in {time.perf_counter() - start:.2f}s with {engine.workers} worker(s)")
+
+def run_snapshot(start_date=None, end_date=None):
+    """Refresh the columnar analytics snapshot; with a range, print its summary as JSON"""
+    import json
+    from utils.analytics import Snapshot, refresh_snapshot
+    from utils.db_utils import init_database
+
+    init_database()
+    start = time.perf_counter()
+    added = refresh_snapshot()
+    logging.info(f"Analytics snapshot refreshed with {added} new order(s) in {time.perf_counter() - start:.2f}s")
+    if not start_date:
+        return
+    start = time.perf_counter()
+    with Snapshot() as snap:
+        result = {
+            "summary": snap.summary(start_date, end_date),
+            "by_payment_method": snap.by_payment_method(start_date, end_date),
+            "top_items": snap.top_items(start_date, end_date),
+            "daily": snap.sales_by_day(start_date, end_date),
+        }
+    print(json.dumps(result, indent=2))
+    logging.info(f"Snapshot report built in {time.perf_counter() - start:.3f}s")
+
+def run_sync_menu(path, delete_missing=True, dry_run=False):
+    """Sync the menu table from a CSV in one transaction and print the change set as JSON"""
+    import json
+    from utils.db_utils import init_database
+    from utils.menu_sync import sync_menu
+
+    init_database()
+    start = time.perf_counter()
+    changes = sync_menu(path, delete_missing, dry_run)
+    print(json.dumps(changes, indent=2))
+    logging.info(f"Menu sync {'checked' if dry_run else 'applied'} in {time.perf_counter() - start:.2f}s")
+
+def run_close_day(through=None, path=None):
+    """Append not-yet-closed days (through `through`, default yesterday) to sales_report.csv"""
+    from utils.db_utils import init_database
+    from utils.day_close import SALES_REPORT_CSV, close_days
+
+    init_database()
+    start = time.perf_counter()
+    closed = close_days(through, path or SALES_REPORT_CSV)
+    if closed:
+        logging.info(f"Day close: {closed[0]}..{closed[-1]} ({len(closed)} day(s)) "
+                     f"in {time.perf_counter() - start:.2f}s")
+    else:
+        logging.info("Day close: nothing to close")
+
+def run_serve(host, port, readers, journal=None):
+    """Run the headless HTTP billing server (no GUI)."""
+    from server import run_server
+
+    run_server(host=host, port=port, readers=readers, journal=journal)
+
+def run_export(kind, path, start_date=None, end_date=None):
+    """Stream orders, line items or daily summaries to CSV/JSONL (optionally gzip)."""
+    from utils.db_utils import init_database
+    from utils.exporter import export
+
+    init_database()
+    start = time.perf_counter()
+    rows = export(kind, path, start_date, end_date)
+    logging.info(f"Exported {rows} {kind} row(s) to {path} in {time.perf_counter() - start:.2f}s")
+
+def enable_metrics(path, slow_query_ms=None):
+    """Turn on DB query instrumentation and dump it to path periodically and at exit"""
+    import atexit
+    from utils import db_utils, db_metrics
+    db_utils.enable_metrics(slow_query_ms)
+    db_metrics.start_reporter(60.0, path)
+
+    def _dump():
+        db_utils.dump_metrics(path)
+        db_metrics.REGISTRY.log_snapshot()
+        logging.info(f"DB metrics written to {path}")
+
+    atexit.register(_dump)
+
+def main(argv=None):
+    """Main entry point for the Restaurant Billing Software"""
+    parser = argparse.ArgumentParser(description="Restaurant Billing Software")
+    parser.add_argument("--ingest", metavar="JSONL",
+                        help="bulk-load orders from a JSONL file (one order object per line) and exit")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="orders per transaction for --ingest (default: 1000)")
+    parser.add_argument("--rebuild-rollup", action="store_true",
+                        help="recompute the daily_sales rollup from orders and exit")
+    parser.add_argument("--export", choices=("orders", "items", "daily"),
+                        help="export orders, line items or daily summaries to --out and exit")
+    parser.add_argument("--out", metavar="PATH",
+                        help="output file for --export (.csv, .jsonl, optionally .gz) or --close-day")
+    parser.add_argument("--start", metavar="YYYY-MM-DD", help="first day for --rebuild-rollup/--export")
+    parser.add_argument("--end", metavar="YYYY-MM-DD", help="last day for --rebuild-rollup/--export")
+    parser.add_argument("--archive", choices=("month", "year"),
+                        help="move closed months/years of orders into read-only archive databases and exit")
+    parser.add_argument("--before", metavar="YYYY-MM-DD",
+                        help="archive only periods ending on or before this day (default: today)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the main database after --archive")
+    parser.add_argument("--report", action="store_true",
+                        help="print a sales report for --start..--end as JSON (parallel, exact totals) and exit")
+    parser.add_argument("--chunk", choices=("day", "month"), default="month",
+                        help="range split for --report (default: month)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --report (default: CPU count)")
+    parser.add_argument("--outlet", action="append", metavar="DB",
+                        help="outlet database file to include in --report (repeatable; default: local database)")
+    parser.add_argument("--yoy", type=int, default=0, metavar="N",
+                        help="with --report, also report the same range N years back")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="refresh the columnar analytics snapshot (db/analytics/) and exit; "
+                             "with --start, also print a report from it")
+    parser.add_argument("--sync-menu", nargs="?", const="", metavar="CSV",
+                        help="make the menu match a CSV (item_name,category,price,gst; default: data/menu.csv) "
+                             "in one transaction, print the change set and exit")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="with --sync-menu, keep menu items that are not in the CSV")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="with --sync-menu, only print the change set")
+    parser.add_argument("--close-day", nargs="?", const="", metavar="YYYY-MM-DD",
+                        help="end-of-day close: append every finished day not closed yet (through this day, "
+                             "default yesterday) to data/sales_report.csv, or --out, and exit")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the headless HTTP/JSON billing server instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address for --serve (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port for --serve (default: 8080)")
+    parser.add_argument("--readers", type=int, default=4, help="reader threads for --serve (default: 4)")
+    parser.add_argument("--journal", nargs="?", const="", metavar="PATH",
+                        help="with --serve, acknowledge orders once appended to a write-ahead journal "
+                             "(default: db/orders.journal) and save them to the database in the background")
+    parser.add_argument("--busy-timeout", type=int, default=None, metavar="MS",
+                        help="how long a write waits for another terminal's lock before retrying (default: 5000)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="record DB query timings and write them to PATH as JSON "
+                             "(refreshed every minute and on exit)")
+    parser.add_argument("--slow-query-ms", type=float, default=None,
+                        help="log queries slower than this with their query plan (default: 100)")
+    args = parser.parse_args(argv)
+    if args.busy_timeout is not None:
+        from utils.db_utils import configure_db
+        configure_db(busy_timeout=args.busy_timeout)
+    if args.metrics_file:
+        enable_metrics(args.metrics_file, args.slow_query_ms)
+
+    if args.ingest:
+        run_ingest(args.ingest, args.batch_size)
+        return
+    if args.rebuild_rollup:
+        run_rebuild_rollup(args.start, args.end)
+        return
+    if args.export:
+        if not args.out:
+            parser.error("--export requires --out")
+        run_export(args.export, args.out, args.start, args.end)
+        return
+    if args.report:
+        if not args.start:
+            parser.error("--report requires --start")
+        run_report(args.start, args.end or args.start, args.chunk, args.workers, args.outlet, args.yoy)
+        return
+    if args.archive:
+        run_archive(args.archive, args.before, args.vacuum)
+        return
+    if args.sync_menu is not None:
+        from utils.menu_sync import MENU_CSV
+        run_sync_menu(args.sync_menu or MENU_CSV, not args.keep_missing, args.dry_run)
+        return
+    if args.close_day is not None:
+        run_close_day(args.close_day or None, args.out)
+        return
+    if args.snapshot:
+        run_snapshot(args.start, args.end or args.start)
+        return
+    if args.serve:
+        journal = None
+        if args.journal is not None:
+            from utils.db_utils import DB_DIR
+            from utils.order_journal import JOURNAL_NAME
+            journal = args.journal or os.path.join(DB_DIR, JOURNAL_NAME)
+        run_serve(args.host, args.port, args.readers, journal)
+        return
+
+    run_gui()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Restaurant Billing Software - scale benchmarks for the db_utils and
+calculator hot paths.
+
+Builds (or reuses) synthetic databases with 10k / 1M / 10M orders and
+times save_order, get_orders_by_date, get_sales_summary, get_total_sales,
+load_menu and the calculator, reporting p50/p99 latency and peak memory.
+Every run is compared with a stored baseline.
+
+    python benchmarks.py --scales 10k                 # quick run
+    python benchmarks.py --scales 10k,1m --update-baseline
+    python benchmarks.py --scales 1m --fail-on-regression
+    python benchmarks.py --contention 1,2,4,8 --duration 10
+
+--contention runs N terminal processes saving orders into one database at
+once and reports commits/s and write-lock wait percentiles per N.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from utils import db_utils
+from utils.calculator import OrderBatch, calculate_batch, calculate_order_totals
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_DATA_DIR = os.path.join(BASE_DIR, "bench_data")
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "bench_baseline.json")
+ORDERS_PER_DAY = 400
+SYNTH_END_DAY = datetime(2024, 12, 31)  # synthetic history ends here; save_order writes land on today
+SEED = 42
+
+CATEGORIES = {
+    "Main Course": (120, 450), "Snacks": (40, 180), "Beverage": (20, 120),
+    "Dessert": (60, 200), "Breads": (15, 60), "Combos": (250, 600),
+}
+GST_RATES = (5, 5, 5, 12, 18)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# ---------------------------------------------------------------------- data
+
+def synthetic_menu(n_items=300, rng=None):
+    """Menu rows (item_name, category, price, gst) spread over realistic categories."""
+    rng = rng or random.Random(SEED)
+    rows = []
+    cats = list(CATEGORIES)
+    for i in range(n_items):
+        cat = cats[i % len(cats)]
+        lo, hi = CATEGORIES[cat]
+        rows.append((f"{cat} Item {i:04d}", cat, float(rng.randrange(lo, hi, 5)), float(rng.choice(GST_RATES))))
+    return rows
+
+def synthetic_orders(n_orders, menu, rng=None, end_day=None):
+    """
+    Yield order dicts over n_orders / ORDERS_PER_DAY days ending at end_day.
+    Item popularity is Zipf-like, so a few items dominate as on a real menu.
+    """
+    rng = rng or random.Random(SEED)
+    end_day = end_day or SYNTH_END_DAY
+    n_days = max(1, n_orders // ORDERS_PER_DAY)
+    first_day = end_day - timedelta(days=n_days - 1)
+    weights = [1.0 / (rank + 1) for rank in range(len(menu))]
+    per_day = n_orders / n_days
+    for i in range(n_orders):
+        day = first_day + timedelta(days=int(i / per_day))
+        ts = day + timedelta(seconds=36000 + int((i % per_day) / per_day * 43200))
+        picks = rng.choices(menu, weights=weights, k=rng.choice((1, 1, 2, 2, 3, 4, 6)))
+        items = {}
+        for name, _, price, gst in picks:
+            q, p, g = items.get(name, (0, price, gst))
+            items[name] = (q + 1, p, g)
+        yield {
+            "order_type": "Dine-In" if rng.random() < 0.6 else "Takeaway",
+            "payment_method": rng.choice(("Cash", "Card", "UPI", "UPI")),
+            "order_date": ts.strftime("%Y-%m-%d %H:%M:%S"),
+            "items": [(n, q, p, g) for n, (q, p, g) in items.items()],
+            "discount_pct": 10 if rng.random() < 0.05 else 0,
+        }
+
+def _priced(orders, chunk=10_000):
+    """Attach exact totals to order dicts in chunks using the batch engine."""
+    buf = []
+    for o in orders:
+        buf.append(o)
+        if len(buf) >= chunk:
+            yield from _price_chunk(buf)
+            buf = []
+    if buf:
+        yield from _price_chunk(buf)
+
+def _price_chunk(orders):
+    batch = OrderBatch()
+    for o in orders:
+        batch.add_order(o["items"], discount_pct=o["discount_pct"])
+    for o, t in zip(orders, calculate_batch(batch).as_dicts()):
+        o.update(t)
+        o["items"] = [(n, q, p) for n, q, p, _ in o["items"]]
+        yield o
+
+def use_database(data_dir, scale):
+    """Point db_utils at <data_dir>/<scale>/restaurant.db."""
+    db_utils.close_connections()
+    db_utils.DB_DIR = os.path.join(data_dir, scale)
+    os.makedirs(db_utils.DB_DIR, exist_ok=True)
+    db_utils.init_database()
+
+def build_database(data_dir, scale, n_orders):
+    """Create the synthetic database for a scale unless it already exists."""
+    use_database(data_dir, scale)
+    with db_utils.db_connection() as conn:
+        existing = conn.execute("SELECT COUNT(*) FROM orders;").fetchone()[0]
+    if existing >= n_orders:
+        logging.info(f"[{scale}] reusing {existing} orders in {db_utils.DB_DIR}")
+        return
+    rng = random.Random(SEED)
+    menu = synthetic_menu(rng=rng)
+    with db_utils.transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?);", menu)
+    db_utils.invalidate_menu_cache()
+    logging.info(f"[{scale}] generating {n_orders - existing} orders...")
+    start = time.perf_counter()
+    orders = synthetic_orders(n_orders, menu, rng=rng)
+    for _ in range(existing):
+        next(orders)
+    db_utils.save_orders_bulk(_priced(orders), batch_size=5000)
+    with db_utils.db_connection() as conn:
+        conn.execute("ANALYZE;")
+    logging.info(f"[{scale}] built in {time.perf_counter() - start:.1f}s")
+
+# ---------------------------------------------------------------------- timing
+
+# Fresh interpreter up to "ready for the first bill": server imports, schema
+# check and menu load against the benchmark database
+COLD_START = """
+import sys
+sys.path.insert(0, {base!r})
+import server
+from utils import db_utils
+db_utils.DB_DIR = {db_dir!r}
+db_utils.init_database()
+db_utils.load_menu()
+"""
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+def measure(fn, args_list):
+    """
+    Run fn(*args) for each args tuple and return latency stats (ms). Peak
+    memory comes from one extra traced call, so tracing does not skew timings.
+    """
+    gc.collect()
+    latencies = []
+    wall = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    wall = time.perf_counter() - wall
+
+    tracemalloc.start()
+    fn(*args_list[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "runs": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "ops_per_s": round(len(latencies) / wall, 1) if wall else None,
+        "peak_kib": peak // 1024,
+    }
+
+def run_benchmarks(scale, runs=50, save_runs=300, rng=None):
+    """Time the hot paths against the currently selected database."""
+    rng = rng or random.Random(SEED)
+    span = max(1, SCALES[scale] // ORDERS_PER_DAY) - 1
+    first = SYNTH_END_DAY - timedelta(days=span)
+
+    def day(offset=0):
+        return (first + timedelta(days=rng.randint(0, max(0, span - offset)))).strftime("%Y-%m-%d")
+
+    def day_range(n_days):
+        start = day(n_days)
+        end = (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=n_days - 1)).strftime("%Y-%m-%d")
+        return start, end
+
+    menu = [(i.item_name, i.price) for i in db_utils.load_menu()]
+    sample_items = [[(n, rng.randint(1, 3), p) for n, p in rng.sample(menu, rng.randint(1, 6))]
+                    for _ in range(2000)]
+
+    results = {}
+    results["get_orders_by_date"] = measure(db_utils.get_orders_by_date, [(day(),) for _ in range(runs)])
+    results["iter_orders_by_date"] = measure(lambda d: sum(1 for _ in db_utils.iter_orders_by_date(d)),
+                                             [(day(),) for _ in range(runs)])
+    results["get_sales_summary_7d"] = measure(db_utils.get_sales_summary, [day_range(7) for _ in range(runs)])
+    results["get_sales_summary_90d"] = measure(db_utils.get_sales_summary, [day_range(90) for _ in range(runs)])
+    results["get_total_sales"] = measure(db_utils.get_total_sales, [() for _ in range(runs)])
+    results["load_menu"] = measure(db_utils.load_menu, [() for _ in range(runs)])
+
+    def load_menu_cold():
+        db_utils.menu_catalog()._snapshot = None
+        db_utils.load_menu()
+    results["load_menu_cold"] = measure(load_menu_cold, [() for _ in range(runs)])
+    script = COLD_START.format(base=BASE_DIR, db_dir=db_utils.DB_DIR)
+    results["cold_start"] = measure(lambda: subprocess.run([sys.executable, "-c", script], check=True),
+                                    [() for _ in range(max(5, runs // 5))])
+    results["calculate_order_totals"] = measure(calculate_order_totals, [(items,) for items in sample_items])
+
+    def batch_totals(orders):
+        batch = OrderBatch()
+        for items in orders:
+            batch.add_order(items)
+        calculate_batch(batch)
+    results["calculate_batch_2000"] = measure(batch_totals, [(sample_items,) for _ in range(10)])
+
+    # Writes last so the read benchmarks see the same data every run
+    def save(items):
+        t = calculate_order_totals(items)
+        db_utils.save_order("Dine-In", t["subtotal"], t["gst"], t["discount"], t["total"], "Cash", items)
+    results["save_order"] = measure(save, [(sample_items[i % len(sample_items)],) for i in range(save_runs)])
+    return results
+
+# ---------------------------------------------------------------------- contention
+
+def _terminal(db_dir, settings, terminal, duration, ready, out):
+    """One POS terminal process: save orders back to back for `duration` seconds."""
+    db_utils.DB_DIR = db_dir
+    db_utils.configure_db(**settings)  # spawned processes don't inherit the parent's settings
+    rng = random.Random(SEED + terminal)
+    menu = [(i.item_name, i.price) for i in db_utils.load_menu()]
+    waits, commits, errors = [], 0, 0
+    ready.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        items = [(n, rng.randint(1, 3), p) for n, p in rng.sample(menu, rng.randint(1, 6))]
+        t = calculate_order_totals(items)
+        t0 = time.perf_counter()
+        try:
+            with db_utils.transaction():  # BEGIN IMMEDIATE: returns once we hold the write lock
+                waits.append((time.perf_counter() - t0) * 1000.0)
+                db_utils.save_order("Dine-In", t["subtotal"], t["gst"], t["discount"], t["total"], "Cash", items)
+            commits += 1
+        except sqlite3.OperationalError:
+            errors += 1  # lock not obtained within busy_timeout and retries: a lost bill
+    out.put((commits, errors, waits))
+
+def run_contention(data_dir, terminal_counts, duration=5.0):
+    """
+    Save orders from 1..N concurrent processes into one database.
+    Returns: {terminals: {commits, commits_per_s, errors, wait_p50_ms, wait_p95_ms, wait_p99_ms, wait_max_ms}}
+    """
+    use_database(data_dir, "contention")
+    with db_utils.transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?);",
+                         synthetic_menu())
+    db_dir = db_utils.DB_DIR
+    db_utils.close_connections()
+    results = {}
+    for n in terminal_counts:
+        ready = multiprocessing.Barrier(n + 1)
+        out = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_terminal, args=(db_dir, dict(db_utils.DB_SETTINGS), t, duration, ready, out))
+                 for t in range(n)]
+        for p in procs:
+            p.start()
+        ready.wait()
+        parts = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        commits = sum(c for c, _, _ in parts)
+        waits = [w for _, _, ws in parts for w in ws] or [0.0]
+        results[str(n)] = {
+            "commits": commits,
+            "commits_per_s": round(commits / duration, 1),
+            "errors": sum(e for _, e, _ in parts),
+            "wait_p50_ms": round(percentile(waits, 50), 3),
+            "wait_p95_ms": round(percentile(waits, 95), 3),
+            "wait_p99_ms": round(percentile(waits, 99), 3),
+            "wait_max_ms": round(max(waits), 3),
+        }
+    return results
+
+def print_contention(results):
+    print(f"\n== contention (busy_timeout {db_utils.DB_SETTINGS['busy_timeout']} ms, "
+          f"{db_utils.DB_SETTINGS['write_retries']} retries) ==")
+    print(f"{'terminals':<11}{'commits':>9}{'commits/s':>11}{'errors':>8}"
+          f"{'wait p50':>10}{'p95':>9}{'p99':>9}{'max':>9}")
+    for n, r in results.items():
+        print(f"{n:<11}{r['commits']:>9}{r['commits_per_s']:>11}{r['errors']:>8}{r['wait_p50_ms']:>10.2f}"
+              f"{r['wait_p95_ms']:>9.2f}{r['wait_p99_ms']:>9.2f}{r['wait_max_ms']:>9.2f}")
+
+# ---------------------------------------------------------------------- baseline
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for metrics slower than baseline * (1 + tolerance)."""
+    problems = []
+    for scale, benches in results.items():
+        for name, stats in benches.items():
+            base = baseline.get(scale, {}).get(name)
+            if not base:
+                continue
+            for key in ("p50_ms", "p99_ms"):
+                # Ignore sub-50µs noise
+                if base[key] > 0.05 and stats[key] > base[key] * (1 + tolerance):
+                    problems.append(f"{scale} {name} {key}: {stats[key]:.3f} vs baseline {base[key]:.3f}")
+    return problems
+
+def print_table(scale, results, baseline):
+    print(f"\n== {scale} ==")
+    print(f"{'benchmark':<26}{'p50 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'peak KiB':>10}{'p50 vs base':>13}")
+    for name, st in results.items():
+        base = baseline.get(scale, {}).get(name)
+        delta = f"{(st['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%" if base and base["p50_ms"] else "-"
+        print(f"{name:<26}{st['p50_ms']:>10.3f}{st['p99_ms']:>10.3f}{st['ops_per_s']:>12}{st['peak_kib']:>10}{delta:>13}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scale benchmarks for db_utils and calculator")
+    parser.add_argument("--scales", default="10k", help=f"comma-separated: {','.join(SCALES)} (default: 10k)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where synthetic databases are kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (default 0.25)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any metric regressed")
+    parser.add_argument("--runs", type=int, default=50, help="timed runs per read benchmark")
+    parser.add_argument("--json", metavar="PATH", help="also write results to this JSON file")
+    parser.add_argument("--contention", metavar="N,N,...",
+                        help="instead of the scale benchmarks, run the multi-terminal write benchmark "
+                             "with these terminal (process) counts, e.g. 1,2,4,8")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per --contention step (default 5)")
+    parser.add_argument("--busy-timeout", type=int, default=None, help="busy_timeout in ms for --contention")
+    args = parser.parse_args(argv)
+
+    if args.contention:
+        try:
+            counts = [int(n) for n in args.contention.split(",") if n.strip()]
+        except ValueError:
+            parser.error("--contention expects comma-separated terminal counts")
+        if args.busy_timeout is not None:
+            db_utils.configure_db(busy_timeout=args.busy_timeout)
+        results = run_contention(args.data_dir, counts, args.duration)
+        print_contention(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"contention": results}, f, indent=2)
+        return 0
+
+    scales = [s.strip().lower() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for scale in scales:
+        build_database(args.data_dir, scale, SCALES[scale])
+        results[scale] = run_benchmarks(scale, runs=args.runs)
+        print_table(scale, results[scale], baseline)
+
+    if sys.platform != "win32":
+        import resource
+        print(f"\nmax RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} MiB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    if args.update_baseline or not baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
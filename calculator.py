@@ -1,4 +1,21 @@
 # GST, discount, total calculation logic for the Restaurant Billing Software
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+np = None  # optional NumPy for vectorized batch evaluation, imported on first use
+_np_checked = False
+
+def _load_numpy():
+    """Import NumPy the first time a batch needs it (keeps it off the startup path)."""
+    global np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np, _np_checked = numpy, True
+    return np
 
 def calculate_total(price, quantity, gst_rate=0.05, discount=0):
     """
@@ -71,3 +88,221 @@ def calculate_order_totals(order_items, gst_rate=0.05, discount=0):
         'discount': round(discount, 2),
         'total': round(total, 2)
     }
+
+# ---------------------------------------------------------------------------
+# Batch engine: exact integer arithmetic in minor units (paise/cents)
+# ---------------------------------------------------------------------------
+
+_BP = 10000  # basis points per 1 (100% == 10000 bp)
+
+@lru_cache(maxsize=8192)
+def to_minor(amount):
+    """
+    Convert a currency amount to integer minor units (paise/cents)
+
+    Args:
+        amount (float|int|str|Decimal): Amount in major units
+
+    Returns:
+        int: Amount in minor units, rounded half up
+    """
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_minor(minor):
+    """
+    Convert integer minor units back to a major-unit float
+
+    Args:
+        minor (int): Amount in minor units
+
+    Returns:
+        float: Amount with 2 decimal places
+    """
+    return int(minor) / 100
+
+@lru_cache(maxsize=256)
+def percent_to_bp(percent):
+    """
+    Convert a percentage (e.g. 5 or 12.5) to integer basis points
+
+    Args:
+        percent (float): Percentage
+
+    Returns:
+        int: Basis points (5% -> 500)
+    """
+    return int((Decimal(str(percent)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def _round_div(num, den):
+    """Integer division rounding half up (num >= 0, den > 0)."""
+    return (num + den // 2) // den
+
+def totals_from_sums(subtotal, gst_num, discount=0, discount_bp=0):
+    """
+    Finish one order from its running sums (all integer minor units)
+
+    Args:
+        subtotal (int): Sum of price * qty over the lines
+        gst_num (int): Sum of price * qty * gst_bp over the lines (unrounded)
+        discount (int): Absolute discount
+        discount_bp (int): Percentage discount on the subtotal, in basis points
+
+    Returns:
+        tuple: (subtotal, gst, discount, total) with the same rounding and
+            clamping as calculate_batch
+    """
+    tax = _round_div(gst_num, _BP)
+    disc = discount + _round_div(subtotal * discount_bp, _BP)
+    disc = min(max(disc, 0), subtotal + tax)
+    return subtotal, tax, disc, subtotal + tax - disc
+
+class OrderBatch:
+    """
+    Column store of orders for calculate_batch.
+
+    Line columns (one entry per order line, lines of an order contiguous):
+        price (minor units), qty, gst_bp
+    Order columns (one entry per order):
+        start (offset of first line), discount (minor units), discount_bp
+    """
+
+    def __init__(self):
+        self.price = array("q")
+        self.qty = array("q")
+        self.gst_bp = array("q")
+        self.start = array("q")
+        self.discount = array("q")
+        self.discount_bp = array("q")
+
+    def __len__(self):
+        return len(self.start)
+
+    def add_order(self, items, discount=0, discount_pct=0, gst_rate=0.05):
+        """
+        Append one order
+
+        Args:
+            items (list): Tuples (item_name, quantity, price) or
+                (item_name, quantity, price, gst_percent) for per-item GST
+            discount (float): Absolute discount amount
+            discount_pct (float): Percentage discount on the subtotal
+            gst_rate (float): GST rate as decimal for items without their own rate
+
+        Returns:
+            int: Index of the order in the batch
+        """
+        default_bp = percent_to_bp(gst_rate * 100)
+        self.start.append(len(self.price))
+        for item in items:
+            self.price.append(to_minor(item[2]))
+            self.qty.append(int(item[1]))
+            self.gst_bp.append(percent_to_bp(item[3]) if len(item) > 3 else default_bp)
+        self.discount.append(to_minor(discount or 0))
+        self.discount_bp.append(percent_to_bp(discount_pct or 0))
+        return len(self.start) - 1
+
+class BatchTotals:
+    """Per-order results of calculate_batch, as array('q') columns in minor units."""
+
+    def __init__(self, subtotal, gst, discount, total):
+        self.subtotal = subtotal
+        self.gst = gst
+        self.discount = discount
+        self.total = total
+
+    def __len__(self):
+        return len(self.total)
+
+    def as_dicts(self):
+        """
+        Returns:
+            list: One dict per order with subtotal, gst, discount, total (floats)
+        """
+        return [
+            {'subtotal': from_minor(s), 'gst': from_minor(g), 'discount': from_minor(d), 'total': from_minor(t)}
+            for s, g, d, t in zip(self.subtotal, self.gst, self.discount, self.total)
+        ]
+
+def _batch_python(batch):
+    n_orders = len(batch)
+    n_lines = len(batch.price)
+    amounts = [p * q for p, q in zip(batch.price, batch.qty)]
+    gst_nums = [a * g for a, g in zip(amounts, batch.gst_bp)]
+    bounds = list(batch.start) + [n_lines]
+
+    subtotal, gst, discount, total = array("q"), array("q"), array("q"), array("q")
+    for o in range(n_orders):
+        s, e = bounds[o], bounds[o + 1]
+        sub, tax, disc, tot = totals_from_sums(sum(amounts[s:e]), sum(gst_nums[s:e]),
+                                               batch.discount[o], batch.discount_bp[o])
+        subtotal.append(sub)
+        gst.append(tax)
+        discount.append(disc)
+        total.append(tot)
+    return BatchTotals(subtotal, gst, discount, total)
+
+def _batch_numpy(batch):
+    n_orders = len(batch)
+    n_lines = len(batch.price)
+    price = np.frombuffer(batch.price, dtype=np.int64)
+    qty = np.frombuffer(batch.qty, dtype=np.int64)
+    gst_bp = np.frombuffer(batch.gst_bp, dtype=np.int64)
+    start = np.frombuffer(batch.start, dtype=np.int64)
+
+    counts = np.diff(np.append(start, n_lines))
+    sub = np.zeros(n_orders, dtype=np.int64)
+    gst_num = np.zeros(n_orders, dtype=np.int64)
+    if n_lines:
+        amounts = price * qty
+        nonempty = counts > 0
+        # reduceat sums each order's contiguous slice; empty orders stay 0
+        sub[nonempty] = np.add.reduceat(amounts, start[nonempty])
+        gst_num[nonempty] = np.add.reduceat(amounts * gst_bp, start[nonempty])
+
+    tax = (gst_num + _BP // 2) // _BP
+    disc = np.frombuffer(batch.discount, dtype=np.int64) + \
+        (sub * np.frombuffer(batch.discount_bp, dtype=np.int64) + _BP // 2) // _BP
+    disc = np.minimum(np.maximum(disc, 0), sub + tax)
+    tot = sub + tax - disc
+    cols = [array("q", c.astype(np.int64).tobytes()) for c in (sub, tax, disc, tot)]
+    return BatchTotals(*cols)
+
+def calculate_batch(batch, use_numpy=None):
+    """
+    Compute totals for every order in an OrderBatch using integer minor units.
+    GST is summed per order at full precision and rounded once (half up);
+    discounts are clamped to [0, subtotal + gst].
+
+    Args:
+        batch (OrderBatch): Orders to price
+        use_numpy (bool): Force/forbid NumPy; default uses it when installed
+
+    Returns:
+        BatchTotals: Per-order subtotal, gst, discount, total in minor units
+    """
+    if use_numpy is None:
+        use_numpy = _load_numpy() is not None
+    if use_numpy:
+        if _load_numpy() is None:
+            raise RuntimeError("NumPy is not installed")
+        return _batch_numpy(batch)
+    return _batch_python(batch)
+
+def calculate_batch_totals(orders, gst_rate=0.05, use_numpy=None):
+    """
+    Calculate totals for many orders at once with exact rounding
+
+    Args:
+        orders (iterable): Dicts with 'items' (see OrderBatch.add_order) and
+            optional 'discount' (amount) / 'discount_pct' (percentage)
+        gst_rate (float): Default GST rate as decimal
+        use_numpy (bool): See calculate_batch
+
+    Returns:
+        list: One dict per order with subtotal, gst, discount, total
+    """
+    batch = OrderBatch()
+    for o in orders:
+        batch.add_order(o['items'], discount=o.get('discount', 0),
+                        discount_pct=o.get('discount_pct', 0), gst_rate=gst_rate)
+    return calculate_batch(batch, use_numpy=use_numpy).as_dicts()
@@ -0,0 +1,118 @@
+# utils/cart.py
+# Keyed shopping cart for the cashier screen. Lines are looked up by item name
+# and running subtotal/GST sums are kept in integer minor units, so adding,
+# changing or removing a line and re-reading the totals are all O(1) however
+# long the order gets.
+from utils.calculator import to_minor, from_minor, percent_to_bp, totals_from_sums
+
+class CartLine:
+    """One order line; price/gst are the menu values at the time it was priced."""
+    __slots__ = ("item_name", "qty", "price", "gst", "price_minor", "gst_bp")
+
+    def __init__(self, item_name, qty, price, gst):
+        self.item_name = item_name
+        self.qty = qty
+        self.price = price
+        self.gst = gst
+        self.price_minor = to_minor(price)
+        self.gst_bp = percent_to_bp(gst)
+
+    @property
+    def amount_minor(self):
+        return self.price_minor * self.qty
+
+    @property
+    def total(self):
+        return from_minor(self.amount_minor)
+
+class Cart:
+    """
+    Ordered mapping item_name -> CartLine with running sums.
+
+    Totals match calculator.calculate_batch exactly: GST is accumulated
+    unrounded (price * qty * gst_bp) and rounded once when read.
+    """
+
+    def __init__(self):
+        self._lines = {}  # insertion-ordered
+        self._subtotal = 0
+        self._gst_num = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, item_name):
+        return item_name in self._lines
+
+    def get(self, item_name):
+        return self._lines.get(item_name)
+
+    def _account(self, line, sign):
+        amount = line.amount_minor
+        self._subtotal += sign * amount
+        self._gst_num += sign * amount * line.gst_bp
+
+    def add(self, item_name, price, gst, qty=1):
+        """Add qty of an item (new line or bump an existing one). Returns: the CartLine"""
+        line = self._lines.get(item_name)
+        if line is None:
+            line = self._lines[item_name] = CartLine(item_name, 0, price, gst)
+        return self.set_quantity(item_name, line.qty + qty)
+
+    def set_quantity(self, item_name, qty):
+        """Set a line's quantity; 0 or less removes it. Returns: the CartLine (None if removed)"""
+        line = self._lines[item_name]
+        if qty <= 0:
+            self.remove(item_name)
+            return None
+        self._account(line, -1)
+        line.qty = int(qty)
+        self._account(line, 1)
+        return line
+
+    def remove(self, item_name):
+        """Drop a line. Returns: the removed CartLine, or None if it was not in the cart"""
+        line = self._lines.pop(item_name, None)
+        if line is not None:
+            self._account(line, -1)
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self._subtotal = 0
+        self._gst_num = 0
+
+    def reprice(self, lookup):
+        """
+        Re-read price/GST for every line from lookup(item_name) -> item or None
+        (e.g. MenuCatalog.get); lines whose item vanished keep their old price.
+        Returns: list of item names whose price or GST changed
+        """
+        changed = []
+        for name, line in self._lines.items():
+            item = lookup(name)
+            if item is None or (item.price == line.price and item.gst == line.gst):
+                continue
+            self._account(line, -1)
+            line.price, line.gst = item.price, item.gst
+            line.price_minor, line.gst_bp = to_minor(item.price), percent_to_bp(item.gst)
+            self._account(line, 1)
+            changed.append(name)
+        return changed
+
+    def totals(self, discount=0, discount_pct=0):
+        """
+        Returns: dict with subtotal, gst, discount, total (floats), the same
+        shape as one entry of calculate_batch_totals
+        """
+        sub, tax, disc, tot = totals_from_sums(self._subtotal, self._gst_num,
+                                               to_minor(discount or 0), percent_to_bp(discount_pct or 0))
+        return {"subtotal": from_minor(sub), "gst": from_minor(tax),
+                "discount": from_minor(disc), "total": from_minor(tot)}
+
+    def line_items(self):
+        """Returns: list of (item_name, qty, unit_price) tuples for save_order"""
+        return [(l.item_name, l.qty, l.price) for l in self._lines.values()]
@@ -0,0 +1,141 @@
+# utils/day_close.py
+# End-of-day close: appends one sales_report.csv row
+# (date,total_sales,total_orders,most_sold_item) per finished day and records
+# it in the day_close table, so each run only touches days not closed yet.
+# A closed day whose daily_sales totals have changed since (late orders from a
+# replayed spool, a merged archive) is closed again and its row rewritten.
+# Totals come from the daily_sales rollup; most-sold items from one grouped
+# pass over the new days' line items (archived partitions included).
+import csv
+import io
+import logging
+import os
+from datetime import date, datetime, timedelta
+
+from utils import db_utils
+
+SALES_REPORT_CSV = os.path.normpath(os.path.join(db_utils.BASE_DIR, "..", "data", "sales_report.csv"))
+HEADER = ("date", "total_sales", "total_orders", "most_sold_item")
+
+_ITEMS_SQL = """
+    SELECT o.order_day, oi.item_name, SUM(oi.quantity)
+    FROM {s}.orders o
+    JOIN {s}.order_items oi ON oi.order_id = o.id
+    WHERE o.order_day >= ? AND o.order_day < ?
+    GROUP BY o.order_day, oi.item_name"""
+
+def _open_days(conn, through):
+    """
+    daily_sales days up to `through` with no day_close row, or whose order
+    count or total no longer match the closed row: [(day, total, order_count)]
+    """
+    return [tuple(r) for r in conn.execute("""
+        SELECT d.day, d.total, d.order_count FROM daily_sales d
+        LEFT JOIN day_close c ON c.day = d.day
+        WHERE d.day <= ? AND d.order_count > 0
+          AND (c.day IS NULL OR c.order_count != d.order_count OR ROUND(c.total, 2) != ROUND(d.total, 2))
+        ORDER BY d.day;
+    """, (through,))]
+
+def _most_sold(conn, days):
+    """One grouped pass over line items for the span of days. Returns: {day: item_name}"""
+    wanted = set(days)
+    best = {}  # day -> (quantity, item_name)
+    for part, seg_lo, seg_hi in db_utils.order_segments(conn, min(days), db_utils._next_day(max(days))):
+        with db_utils.attach_partition(conn, part) as schemas:
+            sql = db_utils.union_all(_ITEMS_SQL, schemas) + ";"
+            for day, name, qty in conn.execute(sql, (seg_lo, seg_hi) * len(schemas)):
+                if day not in wanted:
+                    continue
+                cur = best.get(day)
+                # Highest quantity wins; ties go to the alphabetically first item
+                if cur is None or qty > cur[0] or (qty == cur[0] and name < cur[1]):
+                    best[day] = (qty, name)
+    return {day: name for day, (_, name) in best.items()}
+
+def _csv_rows(path):
+    """
+    Rows already in the report (header excluded). A last line torn by a
+    crash mid-append is cut off first. Returns: list of rows
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            logging.warning(f"{path}: removed a partial last line")
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row for row in csv.reader(f) if row and row[0] != HEADER[0]]
+
+def _append_rows(path, rows):
+    """Append rows (header first for a new/empty file) in a single write, then fsync."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        writer.writerow(HEADER)
+    writer.writerows(rows)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write(buf.getvalue())
+        f.flush()
+        os.fsync(f.fileno())
+
+def _rewrite_rows(path, existing, rows):
+    """Replace the file with existing rows, updated by day from rows (new days appended), atomically."""
+    updated = {r[0]: r for r in rows}
+    out = [updated.pop(row[0], row) for row in existing]
+    out.extend(r for r in rows if r[0] in updated)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        writer.writerows(out)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def close_days(through=None, path=SALES_REPORT_CSV):
+    """
+    Close every day up to `through` (YYYY-MM-DD, default yesterday) that has
+    orders and is not closed yet: append its row to the CSV, then record it
+    in day_close. A day whose totals changed after it was closed gets its
+    CSV row replaced (the file is rewritten atomically) and is recorded again.
+    Safe to rerun after a crash: a day already in the CSV is never written
+    twice, its row is just brought up to date.
+    Returns: list of closed days
+    """
+    through = through or (date.today() - timedelta(days=1)).isoformat()
+    datetime.strptime(through, "%Y-%m-%d")  # reject malformed dates
+    conn = db_utils.get_connection()
+    candidates = _open_days(conn, through)
+    if not candidates:
+        return []
+    # Archives must be attached outside a transaction, so read items first
+    most_sold = _most_sold(conn, [r[0] for r in candidates])
+
+    with db_utils.transaction() as conn:  # write lock: concurrent closes can't both append a day
+        # Days whose totals moved since the item pass are left for the next run
+        unchanged = set(_open_days(conn, through)) & set(candidates)
+        rows = [(day, round(total, 2), count, most_sold.get(day, ""))
+                for day, total, count in candidates if (day, total, count) in unchanged]
+        if not rows:
+            return []
+        existing = _csv_rows(path)
+        in_csv = {row[0] for row in existing}
+        if any(r[0] in in_csv for r in rows):
+            _rewrite_rows(path, existing, rows)
+        else:
+            _append_rows(path, rows)
+        closed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany("""
+            INSERT INTO day_close (day, total, order_count, most_sold_item, closed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                total = excluded.total, order_count = excluded.order_count,
+                most_sold_item = excluded.most_sold_item, closed_at = excluded.closed_at;
+        """, [(*r, closed_at) for r in rows])
+    reclosed = sum(r[0] in in_csv for r in rows)
+    logging.info(f"Closed {len(rows)} day(s) through {through} into {path}"
+                 + (f" ({reclosed} existing row(s) rewritten)" if reclosed else ""))
+    return [r[0] for r in rows]
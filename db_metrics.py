@@ -0,0 +1,331 @@
+# utils/db_metrics.py
+# Opt-in query instrumentation for the DB layer: per-query latency histograms,
+# row counts, SQLite VM work, lock-wait and transaction times, kept in a
+# rolling in-process registry, plus a slow-query log with EXPLAIN QUERY PLAN.
+# Enable with db_utils.enable_metrics() or BILLING_DB_METRICS=1.
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get("BILLING_DB_METRICS", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("BILLING_SLOW_QUERY_MS", "100"))
+PROGRESS_STEPS = 1000  # progress-handler granularity (SQLite VM instructions)
+
+slow_log = logging.getLogger("db_utils.slow")
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_WS = re.compile(r"\s+")
+
+def normalize_sql(sql, limit=160):
+    """Collapse whitespace so the same statement always maps to one metric."""
+    sql = _WS.sub(" ", sql).strip().rstrip(";")
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+class Histogram:
+    """
+    Cumulative bucket counts plus a rolling window of recent samples for
+    percentiles. Samples are execute() latencies; time spent fetching the
+    results afterwards is summed separately in fetch_ms.
+    """
+    __slots__ = ("buckets", "count", "total", "max", "rows", "vm_steps", "fetch_ms", "recent")
+
+    def __init__(self, window=1024):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.vm_steps = 0
+        self.fetch_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms, rows=0, vm_steps=0):
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.rows += rows
+        self.vm_steps += vm_steps
+        if ms > self.max:
+            self.max = ms
+        self.recent.append(ms)
+
+    def add_fetch(self, ms, rows=0, vm_steps=0):
+        self.fetch_ms += ms
+        self.rows += rows
+        self.vm_steps += vm_steps
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p / 100.0 * len(recent)))], 3) if recent else None
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else None,
+            "max_ms": round(self.max, 3),
+            "fetch_ms": round(self.fetch_ms, 3),
+            "p50_ms": pct(50),
+            "p99_ms": pct(99),
+            "rows": self.rows,
+            "avg_rows": round(self.rows / self.count, 1) if self.count else None,
+            "vm_steps": self.vm_steps,
+            "buckets": {("+inf" if b == float("inf") else str(b)): n
+                        for b, n in zip(BUCKETS_MS, self.buckets) if n},
+        }
+
+class MetricsRegistry:
+    """Thread-safe store of named histograms, counters and recent slow queries."""
+
+    def __init__(self, slow_window=100):
+        self._lock = threading.Lock()
+        self._hist = {}
+        self._counters = {}
+        self.slow_queries = deque(maxlen=slow_window)
+        self.started = time.time()
+
+    def _histogram(self, name):
+        h = self._hist.get(name)
+        if h is None:
+            h = self._hist[name] = Histogram()
+        return h
+
+    def observe(self, name, ms, rows=0, vm_steps=0):
+        with self._lock:
+            self._histogram(name).observe(ms, rows, vm_steps)
+
+    def observe_fetch(self, name, ms, rows=0, vm_steps=0):
+        """Add result-fetching time to a statement without counting another sample."""
+        with self._lock:
+            self._histogram(name).add_fetch(ms, rows, vm_steps)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def add_slow_query(self, entry):
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self._counters.clear()
+            self.slow_queries.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Plain-dict view: {'queries', 'helpers', 'transactions', 'counters', 'slow_queries', ...}."""
+        with self._lock:
+            hist = {k: v.summary() for k, v in self._hist.items()}
+            counters = dict(self._counters)
+            slow = list(self.slow_queries)
+            started = self.started
+        groups = {"queries": {}, "helpers": {}, "transactions": {}}
+        for name, summary in hist.items():
+            kind, sep, key = name.partition(":")
+            if sep and kind == "query":
+                groups["queries"][key] = summary
+            elif sep and kind == "helper":
+                groups["helpers"][key] = summary
+            else:  # transaction, commit, lock_wait
+                groups["transactions"][name] = summary
+        groups["counters"] = counters
+        groups["slow_queries"] = slow
+        groups["since"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started))
+        groups["taken_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        return groups
+
+    def dump_json(self, path):
+        """Write a snapshot to path atomically."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        os.replace(tmp, path)
+
+    def log_snapshot(self, logger=None, top=10):
+        """Log the slowest queries by total time."""
+        logger = logger or logging.getLogger("db_utils.metrics")
+        snap = self.snapshot()
+        ranked = sorted(snap["queries"].items(), key=lambda kv: kv[1]["total_ms"] + kv[1]["fetch_ms"],
+                        reverse=True)[:top]
+        logger.info(f"DB metrics since {snap['since']}: {len(snap['queries'])} statements, "
+                    f"{len(snap['slow_queries'])} slow")
+        for sql, s in ranked:
+            logger.info(f"  {s['total_ms'] + s['fetch_ms']:>10.1f} ms total  n={s['count']:<6} p50={s['p50_ms']} "
+                        f"p99={s['p99_ms']} rows/q={s['avg_rows']}  {sql}")
+        for name, s in snap["transactions"].items():
+            logger.info(f"  {name}: n={s['count']} p50={s['p50_ms']} p99={s['p99_ms']} max={s['max_ms']}")
+
+REGISTRY = MetricsRegistry()
+
+# ---------------------------------------------------------------------- connection hooks
+
+def _explain(conn, sql, params):
+    try:
+        cur = sqlite3.Cursor(conn)  # plain cursor: not instrumented
+        cur.row_factory = None
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+        return [row[-1] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        return [f"(plan unavailable: {e})"]
+
+def _record(conn, sql, params, ms, rows, vm_steps):
+    """Record one executed statement. Returns: its metric key"""
+    key = normalize_sql(sql)
+    REGISTRY.observe("query:" + key, ms, rows, vm_steps)
+    head = key[:16].upper()
+    if head.startswith("BEGIN IMMEDIATE") or head.startswith("BEGIN EXCLUSIVE"):
+        REGISTRY.observe("lock_wait", ms)
+    if ms >= SLOW_QUERY_MS and not head.startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "EXPLAIN")):
+        plan = _explain(conn, sql, params)
+        REGISTRY.add_slow_query({
+            "sql": key, "ms": round(ms, 3), "rows": rows, "vm_steps": vm_steps,
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"), "plan": plan,
+        })
+        slow_log.warning(f"slow query {ms:.1f} ms ({rows} rows): {key} | plan: {'; '.join(plan)}")
+    return key
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Records one sample per statement when execute() returns, so a result
+    read with a single fetchone() (or never read) still counts. Rows and
+    time from later fetches are added to that statement's fetch_ms/rows.
+    """
+
+    _key = None  # metric key of the statement whose results are being fetched
+
+    def _start(self, sql, params, call):
+        self._key = None
+        conn = self.connection
+        vm_start = conn._vm_steps
+        t0 = time.perf_counter()
+        try:
+            return call()
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            rows = self.rowcount if self.rowcount > 0 else 0
+            key = _record(conn, sql, params, ms, rows, (conn._vm_steps - vm_start) * PROGRESS_STEPS)
+            if self.description is not None:
+                self._key = key
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, parameters, lambda: super(InstrumentedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        seq = seq_of_parameters if isinstance(seq_of_parameters, (list, tuple)) else list(seq_of_parameters)
+        first = seq[0] if seq else ()
+        return self._start(sql, first, lambda: super(InstrumentedCursor, self).executemany(sql, seq))
+
+    def _fetched(self, t0, vm_start, rows):
+        if self._key is not None:
+            steps = (self.connection._vm_steps - vm_start) * PROGRESS_STEPS
+            REGISTRY.observe_fetch("query:" + self._key, (time.perf_counter() - t0) * 1000.0, rows, steps)
+
+    def fetchone(self):
+        vm_start, t0 = self.connection._vm_steps, time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, vm_start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        vm_start, t0 = self.connection._vm_steps, time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(t0, vm_start, len(rows))
+        return rows
+
+    def fetchall(self):
+        vm_start, t0 = self.connection._vm_steps, time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, vm_start, len(rows))
+        return rows
+
+    def __next__(self):
+        vm_start, t0 = self.connection._vm_steps, time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, vm_start, 0)
+            raise
+        self._fetched(t0, vm_start, 1)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that hands out InstrumentedCursors and times commits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vm_steps = 0
+        self.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+        self.set_trace_callback(self._on_trace)
+
+    def _on_progress(self):
+        self._vm_steps += 1
+        return 0
+
+    @staticmethod
+    def _on_trace(statement):
+        REGISTRY.incr("statements")
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            REGISTRY.observe("commit", (time.perf_counter() - t0) * 1000.0)
+
+def timed(fn):
+    """Decorator recording helper-level latency as 'helper:<name>' when metrics are on."""
+    name = "helper:" + fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            REGISTRY.observe(name, (time.perf_counter() - t0) * 1000.0)
+    return wrapper
+
+# ---------------------------------------------------------------------- reporting
+
+def start_reporter(interval=60.0, path=None, logger=None):
+    """
+    Daemon thread that logs a snapshot (and writes it to path as JSON, if
+    given) every interval seconds. Returns: threading.Event; set() it to stop.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                if path:
+                    REGISTRY.dump_json(path)
+                REGISTRY.log_snapshot(logger)
+            except Exception:
+                logging.exception("DB metrics reporter failed")
+
+    threading.Thread(target=run, name="db-metrics-reporter", daemon=True).start()
+    return stop
@@ -1,89 +1,721 @@
 # utils/db_utils.py
 import sqlite3
 import os
-from datetime import datetime
+import json
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-# Resolve DB path relative to this file; ensure folder exists
+from utils import db_metrics
+from utils.calculator import calculate_batch_totals
+
+# Resolve DB path relative to this file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "db"))
-os.makedirs(DB_DIR, exist_ok=True)
+DB_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "db"))  # created on first connect
+
+DEFAULT_DB = "restaurant.db"
+
+# Connection tuning applied to every connection (see configure_db).
+# cache_size < 0 is in KiB (SQLite convention); mmap_size is in bytes.
+# busy_timeout: how long (ms) a connection waits for another terminal's write
+# lock; write_retries/retry_backoff_ms: how often transaction() retries a
+# BEGIN IMMEDIATE or COMMIT that still fails with "database is locked".
+DB_SETTINGS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 64 * 1024 * 1024,
+    "busy_timeout": 5000,
+    "write_retries": 3,
+    "retry_backoff_ms": 50,
+}
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNC_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Per-thread persistent connections: {db_path: conn}. Bumping
+# _settings_version makes every thread reopen with the new settings.
+_local = threading.local()
+_settings_version = 0
+_settings_lock = threading.Lock()
+
 
-def connect_db(db_name="restaurant.db"):
+def configure_db(**settings):
     """
-    Connect to SQLite DB with foreign keys enabled.
+    Update connection settings (journal_mode, synchronous, cache_size, mmap_size,
+    busy_timeout, write_retries, retry_backoff_ms).
+    Pooled connections are reopened lazily with the new values.
+    """
+    global _settings_version
+    unknown = set(settings) - set(DB_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown DB setting(s): {', '.join(sorted(unknown))}")
+    if "journal_mode" in settings and str(settings["journal_mode"]).upper() not in _JOURNAL_MODES:
+        raise ValueError(f"Invalid journal_mode: {settings['journal_mode']}")
+    if "synchronous" in settings and str(settings["synchronous"]).upper() not in _SYNC_LEVELS:
+        raise ValueError(f"Invalid synchronous level: {settings['synchronous']}")
+    for key in ("cache_size", "mmap_size", "busy_timeout", "write_retries"):
+        if key in settings:
+            settings[key] = int(settings[key])
+    if "retry_backoff_ms" in settings:
+        settings["retry_backoff_ms"] = float(settings["retry_backoff_ms"])
+    for key in ("busy_timeout", "write_retries", "retry_backoff_ms"):
+        if settings.get(key, 0) < 0:
+            raise ValueError(f"{key} must be >= 0")
+    with _settings_lock:
+        DB_SETTINGS.update(settings)
+        _settings_version += 1
+
+
+def enable_metrics(slow_query_ms=None):
+    """
+    Turn on query instrumentation (see db_metrics): per-statement latency,
+    rows, lock-wait and transaction times, and a slow-query log with
+    EXPLAIN QUERY PLAN. Pooled connections are reopened instrumented.
+    """
+    global _settings_version
+    if slow_query_ms is not None:
+        db_metrics.SLOW_QUERY_MS = float(slow_query_ms)
+    with _settings_lock:
+        db_metrics.ENABLED = True
+        _settings_version += 1
+
+def disable_metrics():
+    """Turn query instrumentation off (collected metrics are kept)."""
+    global _settings_version
+    with _settings_lock:
+        db_metrics.ENABLED = False
+        _settings_version += 1
+
+def get_metrics():
+    """Snapshot of the in-process DB metrics registry as a plain dict."""
+    return db_metrics.REGISTRY.snapshot()
+
+def dump_metrics(path):
+    """Write the current DB metrics snapshot to a JSON file."""
+    db_metrics.REGISTRY.dump_json(path)
+
+def _db_path(db_name=DEFAULT_DB):
+    return os.path.join(DB_DIR, db_name)
+
+
+def _apply_pragmas(conn):
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute(f"PRAGMA journal_mode = {str(DB_SETTINGS['journal_mode']).upper()};")
+    conn.execute(f"PRAGMA synchronous = {str(DB_SETTINGS['synchronous']).upper()};")
+    conn.execute(f"PRAGMA cache_size = {int(DB_SETTINGS['cache_size'])};")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_SETTINGS['mmap_size'])};")
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_SETTINGS['busy_timeout'])};")
+
+
+def connect_db(db_name=DEFAULT_DB):
+    """
+    Open a new SQLite connection with foreign keys and the configured
+    journal/sync/cache/mmap settings. Caller owns (and closes) it.
+    Prefer get_connection()/transaction() for pooled per-thread access.
     Returns: sqlite3.Connection
     """
-    db_path = os.path.join(DB_DIR, db_name)
-    conn = sqlite3.connect(db_path)
+    db_path = _db_path(db_name)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    factory = db_metrics.InstrumentedConnection if db_metrics.ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(db_path, factory=factory, uri=True)  # uri: read-only ATTACH of archives
     conn.row_factory = sqlite3.Row
-    # Enable foreign keys
-    conn.execute("PRAGMA foreign_keys = ON;")
+    _apply_pragmas(conn)
     return conn
 
-def init_database():
-    """Create tables if they don't exist."""
-    conn = connect_db()
+
+def get_connection(db_name=DEFAULT_DB):
+    """
+    Return this thread's persistent connection to db_name, opening it on
+    first use (or after configure_db changed the settings).
+    """
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+    db_path = _db_path(db_name)
+    entry = pool.get(db_path)
+    if entry is not None:
+        conn, version = entry
+        if version == _settings_version:
+            return conn
+        conn.close()
+    conn = connect_db(db_name)
+    pool[db_path] = (conn, _settings_version)
+    return conn
+
+
+def close_connections():
+    """Close every pooled connection owned by the calling thread."""
+    pool = getattr(_local, "pool", None)
+    if not pool:
+        return
+    for conn, _ in pool.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    pool.clear()
+
+
+@contextmanager
+def db_connection(db_name=DEFAULT_DB):
+    """Context manager yielding the pooled connection for read-only work."""
+    yield get_connection(db_name)
+
+
+@contextmanager
+def transaction(db_name=DEFAULT_DB):
+    """
+    Context manager yielding the pooled connection inside a write
+    transaction. The outermost block starts with BEGIN IMMEDIATE, so the
+    write lock is taken (waiting up to busy_timeout, then retrying with
+    backoff) before any work is done and the body never fails half-way on
+    a lock. Commits on success, rolls back on error. Nested use joins the
+    outer transaction (only the outermost block commits).
+    """
+    conn = get_connection(db_name)
+    depth = getattr(_local, "tx_depth", None)
+    if depth is None:
+        depth = _local.tx_depth = {}
+    key = id(conn)
+    depth[key] = depth.get(key, 0) + 1
+    started = time.perf_counter()
     try:
+        if depth[key] == 1 and not conn.in_transaction:
+            _retry_busy(conn.execute, "BEGIN IMMEDIATE;")
+        yield conn
+        if depth[key] == 1:
+            _retry_busy(conn.commit)
+    except BaseException:
+        if depth[key] == 1:
+            conn.rollback()
+        raise
+    finally:
+        depth[key] -= 1
+        if depth[key] == 0 and db_metrics.ENABLED:
+            db_metrics.REGISTRY.observe("transaction", (time.perf_counter() - started) * 1000.0)
+
+def _is_busy(exc):
+    name = getattr(exc, "sqlite_errorname", "")  # Python 3.11+
+    if name:
+        return name.startswith(("SQLITE_BUSY", "SQLITE_LOCKED"))
+    msg = str(exc)
+    return "locked" in msg or "busy" in msg
+
+def _retry_busy(fn, *args):
+    """
+    Call fn(*args), retrying up to write_retries times while SQLite reports
+    the database busy/locked, sleeping retry_backoff_ms (doubling, jittered,
+    capped at 1 s) in between. Other errors, and the last failure, propagate.
+    """
+    retries = int(DB_SETTINGS["write_retries"])
+    delay = DB_SETTINGS["retry_backoff_ms"] / 1000.0
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            if attempt == retries:
+                if db_metrics.ENABLED:
+                    db_metrics.REGISTRY.incr("write_lock_failures")
+                raise
+        if db_metrics.ENABLED:
+            db_metrics.REGISTRY.incr("write_lock_retries")
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, 1.0)
+
+def init_database():
+    """
+    Bring the schema up to date. The number of migrations applied is kept
+    in PRAGMA user_version, so on an up-to-date database this is a single
+    PRAGMA read however many migrations exist.
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA user_version;").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with transaction() as conn:  # one process migrates; the others wait and find it done
         cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS menu (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_name TEXT NOT NULL UNIQUE,
-                category TEXT NOT NULL,
-                price REAL NOT NULL CHECK(price > 0),
-                gst REAL NOT NULL DEFAULT 5.0
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_type TEXT NOT NULL CHECK(order_type IN ('Dine-In', 'Takeaway')),
-                subtotal REAL NOT NULL,
-                gst REAL NOT NULL,
-                discount REAL NOT NULL DEFAULT 0,
-                total REAL NOT NULL,
-                payment_method TEXT NOT NULL CHECK(payment_method IN ('Cash', 'Card', 'UPI')),
-                order_date TEXT NOT NULL
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS order_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                item_name TEXT NOT NULL,
-                quantity INTEGER NOT NULL CHECK(quantity > 0),
-                price REAL NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES orders (id) ON DELETE CASCADE
-            );
+        version = cur.execute("PRAGMA user_version;").fetchone()[0]
+        for step, migrate in enumerate(_MIGRATIONS[version:], version + 1):
+            migrate(cur)
+            cur.execute(f"PRAGMA user_version = {step};")
+    invalidate_menu_cache()
+
+# Schema migrations, applied in order by init_database. Only ever append:
+# user_version records how many have run. Each step must also be safe on
+# databases created before versioning (user_version 0, tables present).
+
+def _create_base_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS menu (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            price REAL NOT NULL CHECK(price > 0),
+            gst REAL NOT NULL DEFAULT 5.0
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_type TEXT NOT NULL CHECK(order_type IN ('Dine-In', 'Takeaway')),
+            subtotal REAL NOT NULL,
+            gst REAL NOT NULL,
+            discount REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL,
+            payment_method TEXT NOT NULL CHECK(payment_method IN ('Cash', 'Card', 'UPI')),
+            order_date TEXT NOT NULL
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            item_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL CHECK(quantity > 0),
+            price REAL NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders (id) ON DELETE CASCADE
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders (order_date);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);")
+
+def _create_order_partitions(cur):
+    """Archived order partitions (see utils/partitions.py): [start_day, end_day)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS order_partitions (
+            name TEXT PRIMARY KEY,
+            file TEXT NOT NULL,
+            start_day TEXT NOT NULL,
+            end_day TEXT NOT NULL,
+            order_count INTEGER NOT NULL,
+            archived_at TEXT NOT NULL
+        );
+    """)
+
+def _create_daily_sales(cur):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_sales';")
+    rollup_exists = cur.fetchone() is not None
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            subtotal REAL NOT NULL DEFAULT 0,
+            gst REAL NOT NULL DEFAULT 0,
+            discount REAL NOT NULL DEFAULT 0,
+            cash_count INTEGER NOT NULL DEFAULT 0,
+            card_count INTEGER NOT NULL DEFAULT 0,
+            upi_count INTEGER NOT NULL DEFAULT 0,
+            dine_in_count INTEGER NOT NULL DEFAULT 0,
+            takeaway_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+    """)
+    if not rollup_exists:
+        rebuild_daily_sales()
+
+def _create_day_close(cur):
+    """Days already written to sales_report.csv by the end-of-day close (see utils/day_close.py)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS day_close (
+            day TEXT PRIMARY KEY,
+            total REAL NOT NULL,
+            order_count INTEGER NOT NULL,
+            most_sold_item TEXT,
+            closed_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """)
+
+def _create_menu_version(cur):
+    """
+    Single-row counter bumped by any menu change (any connection/process);
+    MenuCatalog polls it to know when its cached copy is stale.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS menu_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+    """)
+    cur.execute("INSERT OR IGNORE INTO menu_version (id, version) VALUES (1, 0);")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_menu_version_{event.lower()}
+            AFTER {event} ON menu
+            BEGIN
+                UPDATE menu_version SET version = version + 1 WHERE id = 1;
+            END;
         """)
-        conn.commit()
-    finally:
-        conn.close()
 
-def load_menu():
-    """Return all menu rows ordered by category, item_name."""
-    conn = connect_db()
-    try:
+def _migrate_order_day(cur):
+    """Add and backfill orders.order_day (YYYY-MM-DD) on databases created before it existed."""
+    cols = {r["name"] for r in cur.execute("PRAGMA table_info(orders);")}
+    if "order_day" not in cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN order_day TEXT;")
+    cur.execute("UPDATE orders SET order_day = substr(order_date, 1, 10) WHERE order_day IS NULL;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_order_day ON orders (order_day);")
+
+# daily_sales counter columns, keyed by the orders value they count
+_PAYMENT_COUNT_COLS = {"Cash": "cash_count", "Card": "card_count", "UPI": "upi_count"}
+_ORDER_TYPE_COUNT_COLS = {"Dine-In": "dine_in_count", "Takeaway": "takeaway_count"}
+_ROLLUP_COLS = ("order_count", "total", "subtotal", "gst", "discount",
+                *_PAYMENT_COUNT_COLS.values(), *_ORDER_TYPE_COUNT_COLS.values())
+
+def _update_daily_sales(cur, orders):
+    """
+    Add orders to the daily_sales rollup inside the caller's transaction.
+    orders: iterable of (day, order_type, subtotal, gst, discount, total, payment_method)
+    """
+    per_day = {}
+    for day, order_type, subtotal, gst, discount, total, payment_method in orders:
+        acc = per_day.get(day)
+        if acc is None:
+            acc = per_day[day] = dict.fromkeys(_ROLLUP_COLS, 0)
+        acc["order_count"] += 1
+        acc["total"] += total
+        acc["subtotal"] += subtotal
+        acc["gst"] += gst
+        acc["discount"] += discount
+        acc[_PAYMENT_COUNT_COLS[payment_method]] += 1
+        acc[_ORDER_TYPE_COUNT_COLS[order_type]] += 1
+    _add_daily_sales(cur, per_day)
+
+def _add_daily_sales(cur, per_day):
+    """Add per-day sums ({day: {rollup column: value}}) to daily_sales."""
+    assignments = ", ".join(
+        f"{c} = ROUND({c} + ?, 2)" if c in ("total", "subtotal", "gst", "discount") else f"{c} = {c} + ?"
+        for c in _ROLLUP_COLS
+    )
+    cur.executemany("INSERT OR IGNORE INTO daily_sales (day) VALUES (?);", [(d,) for d in per_day])
+    cur.executemany(
+        f"UPDATE daily_sales SET {assignments} WHERE day = ?;",
+        [tuple(acc[c] for c in _ROLLUP_COLS) + (day,) for day, acc in per_day.items()],
+    )
+
+_ROLLUP_SELECT = (
+    "COUNT(*), ROUND(SUM(total), 2), ROUND(SUM(subtotal), 2), ROUND(SUM(gst), 2), ROUND(SUM(discount), 2), "
+    + ", ".join(f"SUM(payment_method = '{v}')" for v in _PAYMENT_COUNT_COLS) + ", "
+    + ", ".join(f"SUM(order_type = '{v}')" for v in _ORDER_TYPE_COUNT_COLS)
+)
+
+@db_metrics.timed
+def rebuild_daily_sales(start_date=None, end_date=None):
+    """
+    Recompute daily_sales from orders (hot database and archived partitions),
+    for every day or for an inclusive YYYY-MM-DD range. Use to backfill or
+    repair the rollup.
+    Returns: number of days written
+    """
+    lo = start_date or "0000-00-00"
+    hi = end_date or "9999-12-31"
+    conn = get_connection()
+    # Archives are immutable: sum them first (ATTACH is not allowed inside a transaction)
+    archived = {}
+    for part, seg_lo, seg_hi in order_segments(conn, lo, _next_day(hi)):
+        if part is None:
+            continue
+        if conn.in_transaction:
+            raise RuntimeError("rebuild_daily_sales over archived partitions must run outside a transaction")
+        with attach_partition(conn, part) as schemas:
+            rows = conn.execute(f"""
+                SELECT order_day, {_ROLLUP_SELECT} FROM {schemas[0]}.orders
+                WHERE order_day >= ? AND order_day < ? GROUP BY order_day;
+            """, (seg_lo, seg_hi)).fetchall()
+        for row in rows:
+            archived[row[0]] = dict(zip(_ROLLUP_COLS, row[1:]))
+
+    with transaction() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM menu ORDER BY category, item_name;")
-        return cur.fetchall()
+        if start_date or end_date:
+            params = (lo, hi)
+            cur.execute("DELETE FROM daily_sales WHERE day >= ? AND day <= ?;", params)
+            where = "WHERE order_day >= ? AND order_day <= ?"
+        else:
+            params = ()
+            cur.execute("DELETE FROM daily_sales;")
+            where = ""
+        cur.execute(f"""
+            INSERT INTO daily_sales (day, {", ".join(_ROLLUP_COLS)})
+            SELECT order_day, {_ROLLUP_SELECT}
+            FROM main.orders
+            {where}
+            GROUP BY order_day;
+        """, params)
+        _add_daily_sales(cur, archived)
+        cur.execute(f"SELECT COUNT(*) FROM daily_sales {where.replace('order_day', 'day')};", params)
+        return cur.fetchone()[0]
+
+def _migrate_order_uuid(cur):
+    """
+    Add orders.order_uuid: an optional client-generated id that makes
+    resubmitting the same order (spool/journal replay) idempotent.
+    """
+    cols = {r["name"] for r in cur.execute("PRAGMA table_info(orders);")}
+    if "order_uuid" not in cols:
+        cur.execute("ALTER TABLE orders ADD COLUMN order_uuid TEXT;")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_order_uuid ON orders (order_uuid);")
+
+def _day_range(start_date, end_date=None):
+    """
+    Convert an inclusive YYYY-MM-DD day range into half-open timestamp
+    bounds [start, end) usable against the order_date index.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date or start_date, "%Y-%m-%d") + timedelta(days=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+def _next_day(day):
+    """'YYYY-MM-DD' of the following day ('9999-...' sentinels pass through)."""
+    if day.startswith("9999"):
+        return day
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+# ---------------------------------------------------------------------- partition router
+# Closed periods of orders can be moved to read-only archive files (see
+# utils/partitions.py, registered in order_partitions). Order queries split
+# their date range into segments: stretches held only by the hot database,
+# and archived periods, which read the archive plus any late orders for
+# that period still in the hot database.
+
+_alias_ids = itertools.count(1)
+
+def order_segments(conn, lo, hi):
+    """
+    Split the half-open day range [lo, hi) into chronological segments.
+    Returns: list of (partition row or None, seg_lo, seg_hi)
+    """
+    try:
+        parts = conn.execute("""
+            SELECT name, file, start_day, end_day FROM order_partitions
+            WHERE start_day < ? AND end_day > ?
+            ORDER BY start_day;
+        """, (hi, lo)).fetchall()
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        parts = []  # database (e.g. another outlet's) predates partitioning
+    segments = []
+    pos = lo
+    for part in parts:
+        if part["start_day"] > pos:
+            segments.append((None, pos, part["start_day"]))
+        seg_hi = min(hi, part["end_day"])
+        segments.append((part, max(pos, part["start_day"]), seg_hi))
+        pos = seg_hi
+    if pos < hi:
+        segments.append((None, pos, hi))
+    return segments
+
+def read_only_uri(path):
+    """SQLite URI that opens path read-only (for ATTACH or sqlite3.connect(uri=True))."""
+    from urllib.request import pathname2url  # slow import, only needed off the billing path
+    return f"file:{pathname2url(path)}?mode=ro"
+
+@contextmanager
+def attach_partition(conn, part, base_dir=None):
+    """
+    Attach an archive read-only for the duration of the block. part["file"]
+    is relative to base_dir (default DB_DIR), the main database's folder.
+    Yields: schema names to query, e.g. ["part7", "main"] (["main"] for part=None)
+    """
+    if part is None:
+        yield ["main"]
+        return
+    alias = f"part{next(_alias_ids)}"
+    path = os.path.join(base_dir or DB_DIR, part["file"])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Archive partition {part['name']} is missing: {path}")
+    conn.execute(f"ATTACH DATABASE ? AS {alias};", (read_only_uri(path),))
+    try:
+        yield [alias, "main"]
     finally:
-        conn.close()
+        conn.execute(f"DETACH DATABASE {alias};")
 
-def save_order(order_type, subtotal, gst, discount, total, payment_method, items):
+def union_all(arm, schemas):
+    """UNION ALL of one SELECT (with {s} as the schema placeholder) over schemas."""
+    return "\nUNION ALL\n".join(arm.format(s=s) for s in schemas)
+
+def list_partitions():
+    """Registered archive partitions, oldest first (name, file, start_day, end_day, order_count, archived_at)."""
+    with db_connection() as conn:
+        return conn.execute("SELECT * FROM order_partitions ORDER BY start_day;").fetchall()
+
+class MenuItem:
+    """One menu row. Supports item["column"] access like sqlite3.Row."""
+    __slots__ = ("id", "item_name", "category", "price", "gst")
+
+    def __init__(self, id, item_name, category, price, gst):
+        self.id = id
+        self.item_name = item_name
+        self.category = category
+        self.price = price
+        self.gst = gst
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return f"MenuItem(#{self.id} {self.item_name!r} {self.price})"
+
+class _MenuSnapshot:
+    __slots__ = ("version", "items", "by_name", "by_id", "by_category", "search_index")
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = tuple(items)  # ordered by category, item_name
+        self.by_name = {i.item_name: i for i in self.items}
+        self.by_id = {i.id: i for i in self.items}
+        by_category = {}
+        for i in self.items:
+            by_category.setdefault(i.category, []).append(i)
+        self.by_category = {c: tuple(v) for c, v in by_category.items()}
+        self.search_index = None  # built on first search
+
+class MenuCatalog:
+    """
+    Shared in-memory copy of the menu table with O(1) lookup by name and id
+    and per-category lists. The menu_version counter (bumped by triggers on
+    every menu change, from any terminal) is checked at most once per
+    refresh_interval seconds; the menu is reloaded only when it changed.
+    """
+
+    def __init__(self, db_name=DEFAULT_DB, refresh_interval=1.0):
+        self.db_name = db_name
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is not None and now - self._checked_at < self.refresh_interval:
+            return snap
+        with self._lock:
+            with db_connection(self.db_name) as conn:
+                cur = conn.cursor()
+                # Read the version before the rows: a concurrent edit then
+                # leaves us with an older version number, never a newer one.
+                cur.execute("SELECT version FROM menu_version WHERE id = 1;")
+                row = cur.fetchone()
+                version = row[0] if row else 0
+                snap = self._snapshot
+                if snap is None or snap.version != version:
+                    cur.execute("""
+                        SELECT id, item_name, category, price, gst FROM menu
+                        ORDER BY category, item_name;
+                    """)
+                    snap = _MenuSnapshot(version, (MenuItem(*r) for r in cur.fetchall()))
+                    self._snapshot = snap
+            self._checked_at = time.monotonic()
+        return snap
+
+    def invalidate(self):
+        """Force a version check on next access (call after local menu writes)."""
+        self._checked_at = 0.0
+
+    @property
+    def version(self):
+        return self._fresh().version
+
+    @property
+    def items(self):
+        """All items ordered by category, item_name."""
+        return self._fresh().items
+
+    @property
+    def categories(self):
+        return list(self._fresh().by_category)
+
+    def get(self, item_name, default=None):
+        return self._fresh().by_name.get(item_name, default)
+
+    def get_by_id(self, item_id, default=None):
+        return self._fresh().by_id.get(item_id, default)
+
+    def by_category(self, category):
+        return self._fresh().by_category.get(category, ())
+
+    def search(self, query, limit=None):
+        """
+        Type-ahead search over item names and categories (see menu_search).
+        The index is built once per menu version.
+        Returns: list of MenuItem, best matches first
+        """
+        snap = self._fresh()
+        index = snap.search_index
+        if index is None:
+            from utils.menu_search import MenuSearchIndex
+            index = snap.search_index = MenuSearchIndex(snap.items)
+        return index.search(query, limit)
+
+    def __contains__(self, item_name):
+        return item_name in self._fresh().by_name
+
+    def __len__(self):
+        return len(self._fresh().items)
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def menu_catalog(db_name=DEFAULT_DB):
+    """Return the process-wide MenuCatalog for db_name."""
+    key = _db_path(db_name)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.setdefault(key, MenuCatalog(db_name))
+    return catalog
+
+def invalidate_menu_cache(db_name=DEFAULT_DB):
+    """Make the shared catalog re-check the menu version on next access."""
+    catalog = _catalogs.get(_db_path(db_name))
+    if catalog is not None:
+        catalog.invalidate()
+
+@db_metrics.timed
+def load_menu():
+    """Return all menu items (MenuItem) ordered by category, item_name, from the shared catalog."""
+    return list(menu_catalog().items)
+
+@db_metrics.timed
+def save_order(order_type, subtotal, gst, discount, total, payment_method, items,
+               order_uuid=None, order_date=None):
     """
     Persist an order and its items atomically.
     items: list of tuples (item_name, quantity, price)
+    order_uuid: optional client id; saving the same uuid again returns the
+                existing order_id instead of inserting a duplicate, also
+                once that order has been archived
+    order_date: optional 'YYYY-MM-DD HH:MM:SS' (defaults to now)
     Returns: order_id
     """
-    conn = connect_db()
-    try:
+    archived = _archived_uuids([(order_uuid, order_date)])
+    if order_uuid in archived:
+        return archived[order_uuid]
+    with transaction() as conn:
         cur = conn.cursor()
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if order_uuid is not None:
+            cur.execute("SELECT id FROM orders WHERE order_uuid = ?;", (order_uuid,))
+            existing = cur.fetchone()
+            if existing is not None:
+                return existing[0]
+        now = order_date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         cur.execute("""
-            INSERT INTO orders (order_type, subtotal, gst, discount, total, payment_method, order_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?);
-        """, (order_type, subtotal, gst, discount, total, payment_method, now))
+            INSERT INTO orders (order_type, subtotal, gst, discount, total, payment_method,
+                                order_date, order_day, order_uuid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """, (order_type, subtotal, gst, discount, total, payment_method, now, now[:10], order_uuid))
         order_id = cur.lastrowid
 
         cur.executemany("""
@@ -91,114 +723,341 @@ def save_order(order_type, subtotal, gst, discount, total, payment_method, items
             VALUES (?, ?, ?, ?);
         """, [(order_id, n, q, p) for (n, q, p) in items])
 
-        conn.commit()
+        _update_daily_sales(cur, [(now[:10], order_type, subtotal, gst, discount, total, payment_method)])
         return order_id
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
-def get_orders_by_date(date_yyyy_mm_dd: str):
+def _item_tuples(items):
+    """Normalize items given as (name, qty, price) tuples or item dicts."""
+    out = []
+    for it in items:
+        if isinstance(it, dict):
+            out.append((it["item_name"], int(it["quantity"]), float(it["price"])))
+        else:
+            n, q, p = it
+            out.append((n, int(q), float(p)))
+    return out
+
+def _existing_uuids(cur, uuids, chunk=500):
+    """Map the given order_uuids that are already saved to their order ids."""
+    uuids = [u for u in set(uuids) if u is not None]
+    found = {}
+    for i in range(0, len(uuids), chunk):
+        part = uuids[i:i + chunk]
+        cur.execute(f"SELECT order_uuid, id FROM orders WHERE order_uuid IN ({', '.join('?' * len(part))});", part)
+        found.update((u, oid) for u, oid in cur.fetchall())
+    return found
+
+def _archived_uuids(orders, chunk=500):
     """
-    Return list of dicts: each order + its items.
+    Map order_uuids already moved to an archive partition to their order ids.
+    orders: (order_uuid, order_date) pairs; only partitions covering the
+    given dates are opened, so undated (today's) orders cost one query.
+    Partitions are attached outside any transaction (SQLite refuses ATTACH
+    inside one); archiving runs at day close, not alongside replays.
     """
-    conn = connect_db()
-    try:
+    by_day = {}
+    for order_uuid, order_date in orders:
+        if order_uuid is not None and order_date:
+            by_day.setdefault(order_date[:10], []).append(order_uuid)
+    if not by_day:
+        return {}
+    found = {}
+    with db_connection() as conn:
+        for part, _, _ in order_segments(conn, min(by_day), max(by_day) + "\uffff"):
+            if part is None:
+                continue
+            uuids = [u for day, us in by_day.items() if part["start_day"] <= day < part["end_day"] for u in us]
+            if not uuids:
+                continue
+            with attach_partition(conn, part) as (schema, _):
+                for i in range(0, len(uuids), chunk):
+                    sub = uuids[i:i + chunk]
+                    found.update(tuple(r) for r in conn.execute(
+                        f"SELECT order_uuid, id FROM {schema}.orders WHERE order_uuid IN ({', '.join('?' * len(sub))});",
+                        sub))
+    return found
+
+def _insert_order_batch(batch):
+    """
+    Insert one batch of order dicts in a single write transaction; return
+    their ids. Orders whose order_uuid is already saved (or archived, or
+    repeated in the batch) are not inserted again; they get the existing id.
+    """
+    archived = _archived_uuids((o.get("order_uuid"), o.get("order_date")) for o in batch)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with transaction() as conn:  # holds the write lock, so the id block below stays ours
         cur = conn.cursor()
         cur.execute("""
-            SELECT * FROM orders
-            WHERE DATE(order_date) = ?
-            ORDER BY order_date DESC;
-        """, (date_yyyy_mm_dd,))
-        orders = cur.fetchall()
-
-        result = []
-        for row in orders:
-            cur.execute("SELECT * FROM order_items WHERE order_id = ?;", (row["id"],))
-            items = [dict(r) for r in cur.fetchall()]
-            o = dict(row)
-            o["items"] = items
-            result.append(o)
-        return result
-    finally:
-        conn.close()
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'orders'), 0),
+                       COALESCE((SELECT MAX(id) FROM orders), 0));
+        """)
+        first_id = cur.fetchone()[0] + 1
+        known = _existing_uuids(cur, [o.get("order_uuid") for o in batch])
+        known.update(archived)
+
+        ids = []
+        order_rows = []
+        item_rows = []
+        for o in batch:
+            order_uuid = o.get("order_uuid")
+            if order_uuid is not None and order_uuid in known:
+                ids.append(known[order_uuid])
+                continue
+            order_id = first_id + len(order_rows)
+            if order_uuid is not None:
+                known[order_uuid] = order_id
+            ids.append(order_id)
+            order_date = o.get("order_date") or now
+            datetime.strptime(order_date, "%Y-%m-%d %H:%M:%S")  # reject malformed timestamps
+            order_rows.append((
+                order_id, o["order_type"], o["subtotal"], o["gst"], o.get("discount", 0),
+                o["total"], o["payment_method"], order_date, order_date[:10], order_uuid,
+            ))
+            item_rows.extend((order_id, n, q, p) for (n, q, p) in _item_tuples(o["items"]))
 
+        cur.executemany("""
+            INSERT INTO orders (id, order_type, subtotal, gst, discount, total, payment_method,
+                                order_date, order_day, order_uuid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """, order_rows)
+        cur.executemany("""
+            INSERT INTO order_items (order_id, item_name, quantity, price)
+            VALUES (?, ?, ?, ?);
+        """, item_rows)
+        _update_daily_sales(cur, ((r[8], r[1], r[2], r[3], r[4], r[5], r[6]) for r in order_rows))
+        return ids
+
+@db_metrics.timed
+def save_orders_bulk(orders, batch_size=1000):
+    """
+    Persist many orders, committing once per batch of batch_size orders.
+    orders: iterable of dicts with the save_order fields (order_type, subtotal,
+            gst, discount, total, payment_method, items) and optional
+            order_date ('YYYY-MM-DD HH:MM:SS', defaults to now) and order_uuid.
+            Orders with an order_uuid that is already saved are skipped, so
+            replaying the same input is safe.
+    Returns: list of order ids in input order (the existing id for skipped orders)
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    ids = []
+    batch = []
+    for order in orders:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            ids.extend(_insert_order_batch(batch))
+            batch = []
+    if batch:
+        ids.extend(_insert_order_batch(batch))
+    return ids
+
+def iter_orders_jsonl(path):
+    """
+    Stream order dicts from a JSONL file (one JSON object per line).
+    Items may be [name, qty, price] lists or {"item_name", "quantity", "price"}
+    objects. Missing subtotal/gst/total are computed with the 5% default GST
+    (discount or discount_pct applied).
+    """
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                o = json.loads(line)
+                o["items"] = _item_tuples(o["items"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{lineno}: invalid order record ({e})") from e
+            if not all(k in o for k in ("subtotal", "gst", "total")):
+                o.update(calculate_batch_totals([o], use_numpy=False)[0])
+            yield o
+
+class LineItem:
+    """One order_items row."""
+    __slots__ = ("id", "order_id", "item_name", "quantity", "price")
+
+    def __init__(self, id, order_id, item_name, quantity, price):
+        self.id = id
+        self.order_id = order_id
+        self.item_name = item_name
+        self.quantity = quantity
+        self.price = price
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return f"LineItem({self.item_name!r} x{self.quantity} @ {self.price})"
+
+class Order:
+    """One orders row plus its LineItems."""
+    __slots__ = ("id", "order_type", "subtotal", "gst", "discount", "total",
+                 "payment_method", "order_date", "order_day", "items")
+
+    def __init__(self, id, order_type, subtotal, gst, discount, total,
+                 payment_method, order_date, order_day, items=None):
+        self.id = id
+        self.order_type = order_type
+        self.subtotal = subtotal
+        self.gst = gst
+        self.discount = discount
+        self.total = total
+        self.payment_method = payment_method
+        self.order_date = order_date
+        self.order_day = order_day
+        self.items = items if items is not None else []
+
+    def as_dict(self):
+        d = {k: getattr(self, k) for k in self.__slots__ if k != "items"}
+        d["items"] = [i.as_dict() for i in self.items]
+        return d
+
+    def __repr__(self):
+        return f"Order(#{self.id} {self.order_date} total={self.total} items={len(self.items)})"
+
+_ORDER_COLUMNS = ("id", "order_type", "subtotal", "gst", "discount", "total",
+                  "payment_method", "order_date", "order_day")
+_N_ORDER_COLS = len(_ORDER_COLUMNS)
+
+def _iter_joined_orders(cur, batch_size):
+    """
+    Group consecutive (order columns..., item id, name, qty, price) rows
+    into Order objects. Rows must be ordered so each order's items are adjacent.
+    """
+    current = None
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            if current is None or current.id != row[0]:
+                if current is not None:
+                    yield current
+                current = Order(*row[:_N_ORDER_COLS])
+            item_id = row[_N_ORDER_COLS]
+            if item_id is not None:
+                current.items.append(LineItem(item_id, current.id, *row[_N_ORDER_COLS + 1:]))
+    if current is not None:
+        yield current
+
+def iter_orders_by_date(date_yyyy_mm_dd: str, batch_size=500):
+    """
+    Yield Order objects (newest first) for one day, streaming a single
+    orders/order_items join through fetchmany(batch_size).
+    """
+    start, end = _day_range(date_yyyy_mm_dd)
+    order_cols = ", ".join(f"o.{c}" for c in _ORDER_COLUMNS)
+    arm = f"""
+        SELECT {order_cols}, oi.id, oi.item_name, oi.quantity, oi.price
+        FROM {{s}}.orders o
+        LEFT JOIN {{s}}.order_items oi ON oi.order_id = o.id
+        WHERE o.order_date >= ? AND o.order_date < ?"""
+    with db_connection() as conn:
+        for part, lo, hi in reversed(order_segments(conn, start, end)):
+            with attach_partition(conn, part) as schemas:
+                cur = conn.cursor()
+                cur.row_factory = None
+                # order_date DESC, orders.id DESC, order_items.id
+                cur.execute(union_all(arm, schemas) + "\nORDER BY 8 DESC, 1 DESC, 10;", (lo, hi) * len(schemas))
+                try:
+                    yield from _iter_joined_orders(cur, batch_size)
+                finally:
+                    cur.close()
+
+@db_metrics.timed
+def get_orders_by_date(date_yyyy_mm_dd: str):
+    """
+    Return list of dicts: each order + its items.
+    Use iter_orders_by_date() to stream large days without materializing them.
+    """
+    return [o.as_dict() for o in iter_orders_by_date(date_yyyy_mm_dd)]
+
+@db_metrics.timed
 def get_sales_summary(start_date, end_date):
     """
-    Returns dict with 'daily_summary' and 'top_items'
+    Returns dict with 'daily_summary' (rows) and 'top_items' (dicts: item_name, total_quantity)
+    Daily figures come from the daily_sales rollup; top items include archived partitions.
     """
-    conn = connect_db()
-    try:
+    start, end = _day_range(start_date, end_date)
+    with db_connection() as conn:
         cur = conn.cursor()
         cur.execute("""
-            SELECT DATE(order_date) AS date,
-                   SUM(total) AS total_sales,
-                   COUNT(*)  AS total_orders,
-                   AVG(total) AS avg_order_value
-            FROM orders
-            WHERE DATE(order_date) BETWEEN ? AND ?
-            GROUP BY DATE(order_date)
-            ORDER BY date DESC;
-        """, (start_date, end_date))
+            SELECT day AS date,
+                   total AS total_sales,
+                   order_count AS total_orders,
+                   total / order_count AS avg_order_value
+            FROM daily_sales
+            WHERE day >= ? AND day < ?
+            ORDER BY day DESC;
+        """, (start, end))
         daily_summary = cur.fetchall()
 
-        cur.execute("""
-            SELECT item_name, SUM(quantity) AS total_quantity
-            FROM order_items
-            WHERE order_id IN (
-                SELECT id FROM orders
-                WHERE DATE(order_date) BETWEEN ? AND ?
-            )
-            GROUP BY item_name
-            ORDER BY total_quantity DESC
-            LIMIT 5;
-        """, (start_date, end_date))
-        top_items = cur.fetchall()
+        # Top items: summed per segment (archives attached one at a time), merged here
+        arm = """
+            SELECT oi.item_name, SUM(oi.quantity) AS total_quantity
+            FROM {s}.orders o
+            JOIN {s}.order_items oi ON oi.order_id = o.id
+            WHERE o.order_date >= ? AND o.order_date < ?
+            GROUP BY oi.item_name"""
+        quantities = {}
+        for part, lo, hi in order_segments(conn, start, end):
+            with attach_partition(conn, part) as schemas:
+                cur.execute(union_all(arm, schemas) + ";", (lo, hi) * len(schemas))
+                for name, qty in cur.fetchall():
+                    quantities[name] = quantities.get(name, 0) + qty
+        top = sorted(quantities.items(), key=lambda kv: (-kv[1], kv[0]))[:5]
+        top_items = [{"item_name": name, "total_quantity": qty} for name, qty in top]
 
         return {"daily_summary": daily_summary, "top_items": top_items}
-    finally:
-        conn.close()
 
+@db_metrics.timed
 def get_total_sales():
-    conn = connect_db()
-    try:
+    """All-time order count, sales and average order value (from daily_sales)."""
+    with db_connection() as conn:
         cur = conn.cursor()
         cur.execute("""
-            SELECT COUNT(*) AS total_orders,
-                   SUM(total) AS total_sales,
-                   AVG(total) AS avg_order_value
-            FROM orders;
+            SELECT COALESCE(SUM(order_count), 0) AS total_orders,
+                   ROUND(SUM(total), 2) AS total_sales,
+                   SUM(total) / SUM(order_count) AS avg_order_value
+            FROM daily_sales;
         """)
         r = cur.fetchone()
         return dict(r)
-    finally:
-        conn.close()
+
+SAMPLE_MENU = (
+    ("Pizza", "Food", 10.00, 5),
+    ("Burger", "Food", 5.00, 5),
+    ("Coke", "Beverage", 2.00, 5),
+    ("Salad", "Food", 4.00, 5),
+    ("Pasta", "Food", 8.00, 5),
+    ("Sandwich", "Food", 6.00, 5),
+    ("Coffee", "Beverage", 3.00, 5),
+    ("Tea", "Beverage", 2.50, 5),
+    ("Ice Cream", "Dessert", 4.50, 5),
+    ("Juice", "Beverage", 3.50, 5),
+)
+
+def _seed_sample_menu(cur):
+    """Insert SAMPLE_MENU if the menu is empty."""
+    cur.execute("SELECT COUNT(*) FROM menu;")
+    if cur.fetchone()[0] > 0:
+        return
+    cur.executemany("INSERT INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?);", SAMPLE_MENU)
 
 def populate_sample_data():
-    """Insert default menu if empty."""
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM menu;")
-        if cur.fetchone()[0] > 0:
-            return
-        sample_menu = [
-            ("Pizza", "Food", 10.00, 5),
-            ("Burger", "Food", 5.00, 5),
-            ("Coke", "Beverage", 2.00, 5),
-            ("Salad", "Food", 4.00, 5),
-            ("Pasta", "Food", 8.00, 5),
-            ("Sandwich", "Food", 6.00, 5),
-            ("Coffee", "Beverage", 3.00, 5),
-            ("Tea", "Beverage", 2.50, 5),
-            ("Ice Cream", "Dessert", 4.50, 5),
-            ("Juice", "Beverage", 3.50, 5),
-        ]
-        cur.executemany(
-            "INSERT INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?);",
-            sample_menu
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    """Insert default menu if empty (init_database does this once for a new database)."""
+    with transaction() as conn:
+        _seed_sample_menu(conn.cursor())
+    invalidate_menu_cache()
+
+_MIGRATIONS = (
+    _create_base_tables,
+    _migrate_order_day,
+    _migrate_order_uuid,
+    _create_order_partitions,
+    _create_daily_sales,
+    _create_menu_version,
+    _seed_sample_menu,
+    _create_day_close,
+)
+SCHEMA_VERSION = len(_MIGRATIONS)
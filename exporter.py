@@ -0,0 +1,178 @@
+# utils/exporter.py
+# Streaming CSV/JSONL export of orders, line items and daily sales summaries.
+# Rows are pulled from SQLite with fetchmany() and written as they arrive, so
+# memory use stays flat however many rows are exported.
+import csv
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from utils.db_utils import db_connection, order_segments, attach_partition, union_all
+
+FETCH_SIZE = 1000
+
+# Each export is one SELECT per source ({s}: the hot database or an attached
+# archive partition, see db_utils), combined with UNION ALL and then ordered.
+ORDERS_SQL = """
+    SELECT id, order_date, order_type, payment_method, subtotal, gst, discount, total, order_uuid
+    FROM {s}.orders
+    WHERE order_date >= ? AND order_date < ?"""
+ORDERS_ORDER = "ORDER BY 2, 1"  # order_date, id
+
+ITEMS_SQL = """
+    SELECT oi.order_id, o.order_date, oi.item_name, oi.quantity, oi.price,
+           ROUND(oi.quantity * oi.price, 2) AS line_total, oi.id AS line_id
+    FROM {s}.orders o
+    JOIN {s}.order_items oi ON oi.order_id = o.id
+    WHERE o.order_date >= ? AND o.order_date < ?"""
+ITEMS_COLUMNS = "order_id, order_date, item_name, quantity, price, line_total"
+
+# Same columns as sales_report.csv; one statement per source group
+DAILY_ITEMS_SQL = """
+            SELECT oi.item_name, oi.quantity
+            FROM {s}.orders o
+            JOIN {s}.order_items oi ON oi.order_id = o.id
+            WHERE o.order_date >= d.day AND o.order_date < date(d.day, '+1 day')"""
+DAILY_SQL = """
+    SELECT d.day AS date,
+           d.total AS total_sales,
+           d.order_count AS total_orders,
+           (SELECT item_name
+            FROM ({items})
+            GROUP BY item_name
+            ORDER BY SUM(quantity) DESC, item_name
+            LIMIT 1) AS most_sold_item
+    FROM main.daily_sales d
+    WHERE d.day >= ? AND d.day < ?
+    ORDER BY d.day;
+"""
+
+EXPORTS = ("orders", "items", "daily")
+
+def _bounds(start_date=None, end_date=None):
+    """
+    Half-open [lo, hi) string bounds for an optional inclusive YYYY-MM-DD range.
+    Raises ValueError if start_date is after end_date.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise ValueError(f"start date {start_date} is after end date {end_date}")
+    lo = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d") if start_date else "0000-00-00"
+    if end_date:
+        hi = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        hi = "9999-99-99"
+    return lo, hi
+
+def _statement(kind, schemas, lo, hi):
+    if kind == "daily":
+        return DAILY_SQL.format(items=union_all(DAILY_ITEMS_SQL, schemas)), (lo, hi)
+    params = (lo, hi) * len(schemas)
+    if kind == "orders":
+        return f"{union_all(ORDERS_SQL, schemas)}\n{ORDERS_ORDER};", params
+    return (f"SELECT {ITEMS_COLUMNS} FROM ({union_all(ITEMS_SQL, schemas)})\n"
+            "ORDER BY order_date, order_id, line_id;"), params
+
+def iter_rows(sql, params=(), fetch_size=FETCH_SIZE, header=True):
+    """
+    Yield the column names (if header), then each row as a tuple, reading
+    the cursor fetch_size rows at a time.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        try:
+            cur.execute(sql, params)
+            if header:
+                yield [d[0] for d in cur.description]
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cur.close()
+
+def iter_export(kind, start_date=None, end_date=None, fetch_size=FETCH_SIZE):
+    """
+    Header + row generator for one export kind: 'orders', 'items' or 'daily'.
+    Archived periods are read from their partitions, oldest first.
+    The kind and date range are checked at once, not on first iteration.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}' (choose from {', '.join(EXPORTS)})")
+    lo, hi = _bounds(start_date, end_date)
+    return _iter_segments(kind, lo, hi, fetch_size)
+
+def _iter_segments(kind, lo, hi, fetch_size):
+    with db_connection() as conn:
+        segments = order_segments(conn, lo, hi)
+        for n, (part, seg_lo, seg_hi) in enumerate(segments):
+            with attach_partition(conn, part) as schemas:
+                sql, params = _statement(kind, schemas, seg_lo, seg_hi)
+                yield from iter_rows(sql, params, fetch_size, header=(n == 0))
+
+def _format_for(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".jsonl") or name.endswith(".json"):
+        return "jsonl"
+    return "csv"
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def write_rows(rows, path, fmt=None):
+    """
+    Write a header + rows generator to path as CSV or JSONL (gzip if the
+    name ends in .gz). Written to a temp file and renamed into place; a
+    generator with no header at all gives an empty file.
+    Returns: number of data rows written
+    """
+    fmt = fmt or _format_for(path)
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    rows = iter(rows)
+    header = next(rows, None)
+    tmp = path + ".part"
+    count = 0
+    try:
+        with _open_output(tmp, path.endswith(".gz")) as f:
+            if header is None:
+                pass
+            elif fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(header)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(header, row))))
+                    f.write("\n")
+                    count += 1
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return count
+
+def export(kind, path, start_date=None, end_date=None, fmt=None):
+    """
+    Export orders, line items or daily summaries for an optional inclusive
+    date range. Format follows the file name: .csv, .jsonl, .csv.gz, .jsonl.gz.
+    Returns: number of rows written
+    """
+    return write_rows(iter_export(kind, start_date, end_date), path, fmt)
+
+def export_orders(path, start_date=None, end_date=None, fmt=None):
+    return export("orders", path, start_date, end_date, fmt)
+
+def export_line_items(path, start_date=None, end_date=None, fmt=None):
+    return export("items", path, start_date, end_date, fmt)
+
+def export_daily_summary(path, start_date=None, end_date=None, fmt=None):
+    """Daily totals in the sales_report.csv layout (date,total_sales,total_orders,most_sold_item)."""
+    return export("daily", path, start_date, end_date, fmt)
@@ -1,11 +1,92 @@
 # ui/main_ui.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-import datetime
-from utils.db_utils import connect_db, init_database
-from utils.db_utils import save_order as db_save_order  # optional reuse
-# Calculator is optional; per-item GST ke liye hum yahin compute kar rahe
-# from utils.calculator import calculate_order_totals
+from utils.db_utils import init_database, menu_catalog
+from utils.cart import Cart
+from utils.order_writer import BackgroundOrderWriter
+
+MENU_POLL_MS = 5000  # how often to pick up menu edits made on other terminals
+WRITER_POLL_MS = 100  # how often to collect saved-bill results from the writer thread
+DISCOUNT_DEBOUNCE_MS = 250  # recompute totals once typing in the discount box pauses
+
+class VirtualListbox:
+    """
+    Listbox that only holds the rows on screen. The full row list stays in
+    Python and scrolling re-renders the visible window, so showing ten or
+    ten thousand search results costs the same. Rows are arbitrary objects;
+    selected() returns the object, not the displayed text.
+    """
+
+    def __init__(self, master, height=12, width=32, format_row=str):
+        self.height = height
+        self.format_row = format_row
+        self.rows = []
+        self.offset = 0
+        self._selected = None  # index into rows
+        self.listbox = tk.Listbox(master, height=height, width=width, exportselection=False)
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def grid(self, row, column, **kw):
+        self.listbox.grid(row=row, column=column, **kw)
+        self.scrollbar.grid(row=row, column=column + 1, sticky=(tk.N, tk.S))
+
+    def bind(self, sequence, func):
+        self.listbox.bind(sequence, func)
+
+    def set_rows(self, rows, select_first=False):
+        self.rows = rows
+        self.offset = 0
+        self._selected = 0 if rows and select_first else None
+        self._render()
+
+    def _render(self):
+        lb = self.listbox
+        lb.delete(0, tk.END)
+        window = self.rows[self.offset:self.offset + self.height]
+        if window:
+            lb.insert(tk.END, *[self.format_row(r) for r in window])
+        sel = self._selected
+        if sel is not None and self.offset <= sel < self.offset + self.height:
+            lb.selection_set(sel - self.offset)
+        n = len(self.rows)
+        self.scrollbar.set(self.offset / n if n else 0.0, min(1.0, (self.offset + self.height) / n) if n else 1.0)
+
+    def _on_select(self, event=None):
+        cur = self.listbox.curselection()
+        if cur:
+            self._selected = self.offset + cur[0]
+
+    def scroll(self, delta):
+        offset = min(max(self.offset + delta, 0), max(0, len(self.rows) - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")
+        if args[0] == "moveto":
+            self.scroll(int(float(args[1]) * len(self.rows)) - self.offset)
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]) * (self.height if args[2] == "pages" else 1))
+
+    def move_selection(self, delta):
+        if not self.rows:
+            return
+        sel = 0 if self._selected is None else min(max(self._selected + delta, 0), len(self.rows) - 1)
+        self._selected = sel
+        if sel < self.offset:
+            self.offset = sel
+        elif sel >= self.offset + self.height:
+            self.offset = sel - self.height + 1
+        self._render()
+
+    def selected(self):
+        sel = self._selected
+        return self.rows[sel] if sel is not None and sel < len(self.rows) else None
 
 class RestaurantBillingApp:
     def __init__(self, root):
@@ -22,6 +103,12 @@ class RestaurantBillingApp:
         # Load menu
         self.load_menu()
 
+        # Bills are saved on a background thread (spooled to disk first)
+        self.writer = BackgroundOrderWriter().start()
+        self.report_window = None
+        self.root.after(WRITER_POLL_MS, self._poll_writer)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def create_widgets(self):
         main_frame = ttk.Frame(self.root, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -36,9 +123,19 @@ class RestaurantBillingApp:
         # Menu
         menu_frame = ttk.LabelFrame(main_frame, text="Menu Items", padding="5")
         menu_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
-        self.menu_listbox = tk.Listbox(menu_frame, height=12, width=32)
-        self.menu_listbox.grid(row=0, column=0, padx=5, pady=5)
-        ttk.Button(menu_frame, text="Add to Order", command=self.add_to_order).grid(row=1, column=0, pady=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(menu_frame, textvariable=self.search_var, width=32)
+        search_entry.grid(row=0, column=0, columnspan=2, padx=5, pady=(5, 0), sticky=(tk.W, tk.E))
+        search_entry.bind("<KeyRelease>", lambda e: self._apply_search())  # type-ahead filter
+        search_entry.bind("<Down>", lambda e: self.menu_list.move_selection(1))
+        search_entry.bind("<Up>", lambda e: self.menu_list.move_selection(-1))
+        search_entry.bind("<Return>", lambda e: self.add_to_order())
+        search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.menu_list = VirtualListbox(menu_frame, height=12, width=32,
+                                        format_row=lambda item: f"{item.item_name} - ${item.price:.2f}")
+        self.menu_list.grid(row=1, column=0, padx=(5, 0), pady=5)
+        self.menu_list.bind("<Double-Button-1>", lambda e: self.add_to_order())
+        ttk.Button(menu_frame, text="Add to Order", command=self.add_to_order).grid(row=2, column=0, columnspan=2, pady=5)
 
         # Order
         order_frame = ttk.LabelFrame(main_frame, text="Current Order", padding="5")
@@ -57,7 +154,7 @@ class RestaurantBillingApp:
         self.discount_var = tk.DoubleVar(value=0.0)
         discount_entry = ttk.Entry(payment_frame, textvariable=self.discount_var, width=10)
         discount_entry.grid(row=0, column=1, padx=5)
-        discount_entry.bind("<KeyRelease>", lambda e: self.update_order_display())  # live update
+        discount_entry.bind("<KeyRelease>", lambda e: self._schedule_totals())  # debounced live update
 
         ttk.Label(payment_frame, text="Payment Method:").grid(row=0, column=2, padx=5)
         self.payment_method = tk.StringVar(value="Cash")
@@ -80,183 +177,195 @@ class RestaurantBillingApp:
         button_frame.grid(row=4, column=0, columnspan=2, pady=10)
         ttk.Button(button_frame, text="Generate Bill", command=self.generate_bill).grid(row=0, column=0, padx=5)
         ttk.Button(button_frame, text="View Reports", command=self.view_reports).grid(row=0, column=1, padx=5)
+        self.status_label = ttk.Label(button_frame, text="")
+        self.status_label.grid(row=0, column=2, padx=10)
 
         # State
-        self.current_order = []  # list of tuples: (item_name, quantity)
-        self.menu_items = {}     # item_name -> {"price": x, "gst": y}
+        self.cart = Cart()  # item_name -> line, with running totals; tree rows use item_name as iid
+        self.catalog = menu_catalog()  # shared, auto-refreshing menu cache
+        self._menu_version = None
+        self._search_query = None  # query the menu list currently shows
+        self._totals_job = None
 
     def load_menu(self):
-        conn = connect_db()
-        cur = conn.cursor()
-        try:
-            # Ensure menu has data (if you prefer, call populate_sample_data() in db_utils)
-            cur.execute("SELECT COUNT(*) FROM menu;")
-            if cur.fetchone()[0] == 0:
-                sample_menu = [
-                    ("Pizza", "Food", 10.00, 5),
-                    ("Burger", "Food", 5.00, 5),
-                    ("Coke", "Beverage", 2.00, 5),
-                    ("Salad", "Food", 4.00, 5),
-                    ("Pasta", "Food", 8.00, 5),
-                    ("Sandwich", "Food", 6.00, 5),
-                    ("Coffee", "Beverage", 3.00, 5),
-                    ("Tea", "Beverage", 2.50, 5),
-                    ("Ice Cream", "Dessert", 4.50, 5),
-                    ("Juice", "Beverage", 3.50, 5),
-                ]
-                cur.executemany("INSERT INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?);", sample_menu)
-                conn.commit()
-
-            # Load item_name, price, gst
-            cur.execute("SELECT item_name, price, gst FROM menu ORDER BY item_name;")
-            rows = cur.fetchall()
-            for r in rows:
-                name, price, gst = r["item_name"], r["price"], r["gst"]
-                self.menu_listbox.insert(tk.END, f"{name} - ${price:.2f}")
-                self.menu_items[name] = {"price": float(price), "gst": float(gst)}
-        finally:
-            conn.close()
+        self.catalog.invalidate()
+        self._refresh_menu_list()
+        self.root.after(MENU_POLL_MS, self._poll_menu)
+
+    def _refresh_menu_list(self):
+        self._menu_version = self.catalog.version
+        self._apply_search(force=True)
+
+    def _apply_search(self, force=False):
+        query = self.search_var.get()
+        if query == self._search_query and not force:
+            return  # e.g. arrow keys: text unchanged
+        self._search_query = query
+        self.menu_list.set_rows(self.catalog.search(query), select_first=bool(query.strip()))
+
+    def _poll_menu(self):
+        # Cheap when nothing changed: the catalog only re-reads the menu on a version bump
+        if self.catalog.version != self._menu_version:
+            self._refresh_menu_list()
+            for name in self.cart.reprice(self.catalog.get):
+                self._update_row(name)
+            self._update_totals()
+        self.root.after(MENU_POLL_MS, self._poll_menu)
 
     def add_to_order(self):
-        sel = self.menu_listbox.curselection()
-        if not sel:
+        selected = self.menu_list.selected()
+        if selected is None:
             messagebox.showwarning("Warning", "Please select an item from the menu")
             return
-        item_text = self.menu_listbox.get(sel[0])
-        item_name = item_text.split(" - ")[0]
-
-        # If exists, increment; else add
-        for i, (name, qty) in enumerate(self.current_order):
-            if name == item_name:
-                self.current_order[i] = (name, qty + 1)
-                break
-        else:
-            self.current_order.append((item_name, 1))
+        item = self.catalog.get_by_id(selected.id)
+        if item is None:
+            messagebox.showwarning("Warning", f"'{selected.item_name}' is no longer on the menu")
+            return
+        item_name = item.item_name
 
-        self.update_order_display()
+        # If exists, increment; else add (keyed, so no scan of the order)
+        self.cart.add(item_name, item.price, item.gst)
+        self._update_row(item_name)
+        self._update_totals()
 
     def remove_item(self):
         sel = self.order_tree.selection()
         if not sel:
             messagebox.showwarning("Warning", "Please select an item to remove")
             return
-        idx = self.order_tree.index(sel[0])
-        del self.current_order[idx]
-        self.update_order_display()
+        for iid in sel:
+            self.cart.remove(iid)
+            self.order_tree.delete(iid)
+        self._update_totals()
 
     def clear_order(self):
-        self.current_order = []
-        self.update_order_display()
-
-    def _compute_totals(self):
-        """
-        Per-item GST calculation.
-        Returns: (subtotal, gst_total, discount, grand_total, line_items_for_db)
-        """
-        subtotal = 0.0
-        gst_total = 0.0
-        line_items = []  # (item_name, qty, unit_price)
-
-        for item_name, qty in self.current_order:
-            meta = self.menu_items.get(item_name, {"price": 0.0, "gst": 0.0})
-            price = meta["price"]
-            gst_rate = meta["gst"]  # percentage
-            line_total = price * qty
-            subtotal += line_total
-            gst_total += line_total * (gst_rate / 100.0)
-            line_items.append((item_name, qty, price))
-
-        # Discount validation
+        self.cart.clear()
+        children = self.order_tree.get_children()
+        if children:
+            self.order_tree.delete(*children)
+        self._update_totals()
+
+    def _discount(self):
+        # Discount validation (engine clamps to subtotal + gst)
         try:
             discount = float(self.discount_var.get() or 0.0)
         except Exception:
             discount = 0.0
-        if discount < 0:
-            discount = 0.0
-        # Max discount = subtotal + gst_total
-        max_disc = round(subtotal + gst_total, 2)
-        if discount > max_disc:
-            discount = max_disc
-
-        grand_total = subtotal + gst_total - discount
-        return (round(subtotal, 2), round(gst_total, 2), round(discount, 2), round(grand_total, 2), line_items)
+        return max(discount, 0.0)
 
-    def update_order_display(self):
-        # Clear rows
-        for iid in self.order_tree.get_children():
-            self.order_tree.delete(iid)
+    def _compute_totals(self):
+        """
+        Per-item GST calculation (exact, from the cart's running sums).
+        Returns: (subtotal, gst_total, discount, grand_total, line_items_for_db)
+        """
+        t = self.cart.totals(self._discount())
+        return (t["subtotal"], t["gst"], t["discount"], t["total"], self.cart.line_items())
+
+    def _update_row(self, item_name):
+        """Insert, update or delete the single tree row for one cart line."""
+        line = self.cart.get(item_name)
+        if line is None:
+            if self.order_tree.exists(item_name):
+                self.order_tree.delete(item_name)
+            return
+        values = (item_name, line.qty, f"${line.price:.2f}", f"${line.total:.2f}")
+        if self.order_tree.exists(item_name):
+            self.order_tree.item(item_name, values=values)
+        else:
+            self.order_tree.insert("", "end", iid=item_name, values=values)
 
-        # Fill rows
-        for item_name, qty in self.current_order:
-            price = self.menu_items[item_name]["price"]
-            total = price * qty
-            self.order_tree.insert("", "end", values=(item_name, qty, f"${price:.2f}", f"${total:.2f}"))
+    def _schedule_totals(self):
+        if self._totals_job is not None:
+            self.root.after_cancel(self._totals_job)
+        self._totals_job = self.root.after(DISCOUNT_DEBOUNCE_MS, self._update_totals)
 
+    def _update_totals(self):
+        if self._totals_job is not None:
+            self.root.after_cancel(self._totals_job)
+            self._totals_job = None
         subtotal, gst_total, discount, grand_total, _ = self._compute_totals()
         self.subtotal_label.config(text=f"Subtotal: ${subtotal:.2f}")
         self.gst_label.config(text=f"GST: ${gst_total:.2f}")
         self.discount_label.config(text=f"Discount: ${discount:.2f}")
         self.total_label.config(text=f"Total: ${grand_total:.2f}")
 
+    def update_order_display(self):
+        """Full redraw of the order tree and totals (incremental paths use _update_row)."""
+        children = self.order_tree.get_children()
+        if children:
+            self.order_tree.delete(*children)
+        for line in self.cart:
+            self._update_row(line.item_name)
+        self._update_totals()
+
     def generate_bill(self):
-        if not self.current_order:
+        if not self.cart:
             messagebox.showwarning("Warning", "No items in order")
             return
 
         subtotal, gst_total, discount, grand_total, line_items = self._compute_totals()
 
-        # Save to DB (reuse helper)
-        order_id = db_save_order(
-            order_type=self.order_type.get(),
-            subtotal=subtotal,
-            gst=gst_total,
-            discount=discount,
-            total=grand_total,
-            payment_method=self.payment_method.get(),
-            items=line_items
-        )
-
-        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Hand off to the background writer; the bill is shown once it is committed
+        self.writer.submit({
+            "order_type": self.order_type.get(),
+            "subtotal": subtotal,
+            "gst": gst_total,
+            "discount": discount,
+            "total": grand_total,
+            "payment_method": self.payment_method.get(),
+            "items": line_items,
+        })
+        self.clear_order()
+        self._update_status()
+
+    def _poll_writer(self):
+        self.writer.poll(self._on_order_result)
+        self._update_status()
+        self.root.after(WRITER_POLL_MS, self._poll_writer)
+
+    def _update_status(self):
+        pending = self.writer.pending_count
+        self.status_label.config(text=f"Saving {pending} bill(s)..." if pending else "")
+
+    def _on_order_result(self, status, order_uuid, result, order):
+        if status == "saved":
+            self._show_bill(result, order)
+        elif status == "retrying":
+            self.status_label.config(text=f"Database busy, still retrying: {result}")
+        else:
+            messagebox.showerror("Bill Not Saved", f"Order could not be saved:\n{result}")
+
+    def _show_bill(self, order_id, order):
         bill_lines = [
             f"Order #{order_id}",
-            f"Type: {self.order_type.get()}",
-            f"Date: {now}",
+            f"Type: {order['order_type']}",
+            f"Date: {order['order_date']}",
             "",
             "Items:"
         ]
-        for (name, qty, price) in line_items:
+        for (name, qty, price) in order["items"]:
             bill_lines.append(f"{name} x{qty} @ ${price:.2f} = ${price*qty:.2f}")
         bill_lines += [
             f"",
-            f"Subtotal: ${subtotal:.2f}",
-            f"GST: ${gst_total:.2f}",
-            f"Discount: ${discount:.2f}",
-            f"Total: ${grand_total:.2f}",
-            f"Payment: {self.payment_method.get()}",
+            f"Subtotal: ${order['subtotal']:.2f}",
+            f"GST: ${order['gst']:.2f}",
+            f"Discount: ${order['discount']:.2f}",
+            f"Total: ${order['total']:.2f}",
+            f"Payment: {order['payment_method']}",
         ]
         messagebox.showinfo("Bill Generated", "\n".join(bill_lines))
-        self.clear_order()
+
+    def on_close(self):
+        # Unsaved bills stay in the spool and are replayed on next start
+        if self.report_window is not None:
+            self.report_window.close()
+        self.writer.stop()
+        self.root.destroy()
 
     def view_reports(self):
-        conn = connect_db()
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT DATE(order_date) AS date, SUM(total) AS sum_total, COUNT(*) AS cnt
-                FROM orders
-                GROUP BY DATE(order_date)
-                ORDER BY date DESC
-                LIMIT 7;
-            """)
-            rows = cur.fetchall()
-        finally:
-            conn.close()
-
-        if not rows:
-            messagebox.showinfo("Sales Report", "No orders yet.")
+        # Imported on first use: reports are not needed to start billing
+        from ui.report_window import ReportWindow
+        if self.report_window is not None and self.report_window.window.winfo_exists():
+            self.report_window.window.lift()
             return
-
-        report_lines = ["Sales Report (Last 7 Days)", ""]
-        for r in rows:
-            report_lines.append(f"{r['date']}: ${float(r['sum_total']):.2f} ({r['cnt']} orders)")
-        messagebox.showinfo("Sales Report", "\n".join(report_lines))
+        self.report_window = ReportWindow(self.root)
@@ -0,0 +1,111 @@
+# utils/menu_search.py
+# In-memory type-ahead index over menu item names and categories. Word
+# prefixes are found by bisecting a sorted word list and longer fragments
+# through a trigram index, so a lookup touches only the matching items
+# rather than scanning the whole catalog.
+import bisect
+import re
+from functools import lru_cache
+
+_WORD = re.compile(r"[^\W_]+")
+
+def normalize(text):
+    return " ".join(_WORD.findall(text.lower()))
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class MenuSearchIndex:
+    """
+    Search index over a sequence of menu items (anything with item_name and
+    category attributes, e.g. db_utils.MenuItem).
+
+    search("chi bur") returns items where every whitespace-separated term
+    starts a word of the name/category or appears anywhere in them (terms
+    of 3+ characters through the trigram index, shorter ones by scanning
+    the names, which the memo keeps cheap for type-ahead). Results are ranked: name starts with the
+    query, then every term starts a word of the name, then of the name or
+    category, then substring matches; ties are ordered by name.
+    """
+
+    def __init__(self, items):
+        self.items = tuple(items)
+        self._names = []
+        self._haystack = []
+        name_words, category_words = [], []
+        trigrams = {}
+        for idx, item in enumerate(self.items):
+            name = normalize(item.item_name)
+            category = normalize(item.category or "")
+            text = f"{name} {category}".strip()
+            self._names.append(name)
+            self._haystack.append(text)
+            name_words.extend((w, idx) for w in set(name.split()))
+            category_words.extend((w, idx) for w in set(category.split()))
+            for t in _trigrams(text):
+                trigrams.setdefault(t, set()).add(idx)
+        self._name_words = _WordList(name_words)
+        self._category_words = _WordList(category_words)
+        self._trigrams = {t: frozenset(ids) for t, ids in trigrams.items()}
+        self._by_name = sorted(range(len(self.items)), key=self._names.__getitem__)
+        self._pos = [0] * len(self.items)  # idx -> position in name order
+        for pos, idx in enumerate(self._by_name):
+            self._pos[idx] = pos
+        # Per-index memo of term -> match sets
+        self._term = lru_cache(maxsize=512)(self._match_term)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _match_term(self, term):
+        """Returns: (items with a name word starting with term, ... name or category word, any match)"""
+        in_name = self._name_words.prefix(term)
+        in_words = in_name | self._category_words.prefix(term)
+        if len(term) < 3:
+            inner = frozenset(i for i, text in enumerate(self._haystack) if i not in in_words and term in text)
+            return in_name, in_words, in_words | inner
+        grams = sorted((self._trigrams.get(t, frozenset()) for t in _trigrams(term)), key=len)
+        candidates = grams[0].intersection(*grams[1:]) if grams else frozenset()
+        inner = frozenset(i for i in candidates - in_words if term in self._haystack[i])
+        return in_name, in_words, in_words | inner
+
+    def search(self, query, limit=None):
+        """
+        Items matching every term of query, ordered by rank then name.
+        An empty query returns all items ordered by name.
+        Returns: list of items (at most limit, if given)
+        """
+        query = normalize(query)
+        if not query:
+            return [self.items[i] for i in self._by_name[:limit]]
+        name_hits = word_hits = hits = None
+        for term in query.split():
+            in_name, in_words, matched = self._term(term)
+            if hits is None:
+                name_hits, word_hits, hits = in_name, in_words, matched
+            else:
+                name_hits, word_hits, hits = name_hits & in_name, word_hits & in_words, hits & matched
+            if not hits:
+                return []
+        names = self._names
+        first = [i for i in name_hits if names[i].startswith(query)]
+        groups = (first, name_hits.difference(first), word_hits - name_hits, hits - word_hits)
+        ranked = []
+        for group in groups:
+            ranked.extend(sorted(group, key=self._pos.__getitem__))
+            if limit is not None and len(ranked) >= limit:
+                break
+        return [self.items[i] for i in ranked[:limit]]
+
+class _WordList:
+    """Sorted (word, item index) pairs; prefix() finds items by word prefix via bisect."""
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self._words = [w for w, _ in pairs]
+        self._idx = [i for _, i in pairs]
+
+    def prefix(self, term):
+        lo = bisect.bisect_left(self._words, term)
+        hi = bisect.bisect_left(self._words, term + "\uffff", lo)
+        return frozenset(self._idx[lo:hi])
@@ -0,0 +1,99 @@
+# utils/menu_sync.py
+# Sync the menu table from a CSV (item_name,category,price,gst). The file is
+# validated first, diffed against the current menu by item_name, and the
+# inserts, updates and deletes are applied as batched statements in one
+# transaction, so terminals see either the old menu or the new one.
+import csv
+import logging
+import os
+
+from utils import db_utils
+
+MENU_CSV = os.path.normpath(os.path.join(db_utils.BASE_DIR, "..", "data", "menu.csv"))
+COLUMNS = ("item_name", "category", "price", "gst")
+DEFAULT_GST = 5.0
+
+def read_menu_csv(path=MENU_CSV):
+    """
+    Stream and validate a menu CSV.
+    Returns: dict item_name -> (category, price, gst), in file order
+    Raises: ValueError naming the offending line
+    """
+    menu = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in ("item_name", "category", "price") if c not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+        for row in reader:
+            line = reader.line_num
+            name = (row["item_name"] or "").strip()
+            category = (row["category"] or "").strip()
+            if not name or not category:
+                raise ValueError(f"{path}:{line}: item_name and category are required")
+            if name in menu:
+                raise ValueError(f"{path}:{line}: duplicate item_name {name!r}")
+            try:
+                price = round(float(row["price"]), 2)
+                gst = float(row.get("gst") or DEFAULT_GST)
+            except (TypeError, ValueError):
+                raise ValueError(f"{path}:{line}: bad price/gst for {name!r}") from None
+            if price <= 0 or gst < 0:
+                raise ValueError(f"{path}:{line}: price must be > 0 and gst >= 0 for {name!r}")
+            menu[name] = (category, price, gst)
+    return menu
+
+def diff_menu(current, wanted, delete_missing=True):
+    """
+    current, wanted: dicts item_name -> (category, price, gst)
+    Returns: dict with inserted (names), updated ({name: {field: (old, new)}}),
+        deleted (names) and unchanged (count)
+    """
+    inserted, updated, unchanged = [], {}, 0
+    for name, new in wanted.items():
+        old = current.get(name)
+        if old is None:
+            inserted.append(name)
+            continue
+        changes = {}
+        for field, a, b in zip(COLUMNS[1:], old, new):
+            if (round(a, 2) if field == "price" else a) != b:
+                changes[field] = (a, b)
+        if changes:
+            updated[name] = changes
+        else:
+            unchanged += 1
+    deleted = [n for n in current if n not in wanted] if delete_missing else []
+    return {"inserted": inserted, "updated": updated, "deleted": deleted, "unchanged": unchanged}
+
+def _current_menu(conn):
+    return {r[0]: (r[1], r[2], r[3]) for r in
+            conn.execute("SELECT item_name, category, price, gst FROM menu;")}
+
+def sync_menu(path=MENU_CSV, delete_missing=True, dry_run=False):
+    """
+    Make the menu table match the CSV: add new items, update changed
+    category/price/gst, and (unless delete_missing is False) remove items
+    not in the file. Past orders keep their item names and prices.
+    A dry run only reads the menu and takes no write lock.
+    Returns: the change set (see diff_menu)
+    """
+    wanted = read_menu_csv(path)
+    if dry_run:
+        with db_utils.db_connection() as conn:
+            return diff_menu(_current_menu(conn), wanted, delete_missing)
+    with db_utils.transaction() as conn:  # write lock held from the start: the diff can't go stale
+        changes = diff_menu(_current_menu(conn), wanted, delete_missing)
+        upserts = [(n, *wanted[n]) for n in (*changes["inserted"], *changes["updated"])]
+        if upserts:
+            conn.executemany("""
+                INSERT INTO menu (item_name, category, price, gst) VALUES (?, ?, ?, ?)
+                ON CONFLICT(item_name) DO UPDATE SET
+                    category = excluded.category, price = excluded.price, gst = excluded.gst;
+            """, upserts)
+        if changes["deleted"]:
+            conn.executemany("DELETE FROM menu WHERE item_name = ?;", ((n,) for n in changes["deleted"]))
+    db_utils.invalidate_menu_cache()
+    logging.info(f"Menu sync from {path}: {len(changes['inserted'])} added, {len(changes['updated'])} updated, "
+                 f"{len(changes['deleted'])} deleted, {changes['unchanged']} unchanged")
+    return changes
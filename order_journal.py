@@ -0,0 +1,269 @@
+# utils/order_journal.py
+# Write-ahead order journal for the billing server. Accepting an order costs
+# one sequential append (group-fsync'd with whatever else arrived meanwhile);
+# a compactor thread applies journaled orders to SQLite in bulk, idempotently
+# by order_uuid, and records how far it got in a checkpoint file. On start the
+# unapplied tail is replayed and a torn last record (crash mid-append) is cut off.
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import uuid
+import zlib
+from collections import deque
+from datetime import datetime
+
+from utils import db_utils
+
+JOURNAL_NAME = "orders.journal"
+_HEADER = struct.Struct("<II")  # payload length, crc32(payload)
+MAX_RECORD_BYTES = 1024 * 1024
+
+def encode_record(order):
+    payload = json.dumps(order, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def scan(path, offset=0):
+    """
+    Read valid records from offset on, stopping at the first torn or corrupt one.
+    Returns: (list of (end_offset, order), offset just past the last valid record)
+    """
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                break
+            length, crc = _HEADER.unpack(head)
+            if length > MAX_RECORD_BYTES:
+                break
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                order = json.loads(payload)
+            except ValueError:
+                break
+            offset += _HEADER.size + length
+            records.append((offset, order))
+    return records, offset
+
+class OrderJournal:
+    """
+    Append-only, length-prefixed, crc32-checked journal of orders
+    (save_order keyword arguments plus order_uuid and order_date).
+
+    append_many() returns once its records are on disk; concurrent callers
+    share fsyncs. Orders become visible in SQLite when the compactor thread
+    applies them (every apply_interval seconds, up to apply_batch per
+    transaction); <journal>.ckpt holds the offset applied so far. When
+    everything is applied and the file exceeds max_bytes it is truncated.
+    Orders SQLite rejects (bad data, not lock errors) go to <journal>.failed.
+    """
+
+    def __init__(self, path=None, apply_interval=0.2, apply_batch=500, max_bytes=4 * 1024 * 1024):
+        self.path = path or os.path.join(db_utils.DB_DIR, JOURNAL_NAME)
+        self.checkpoint_path = self.path + ".ckpt"
+        self.apply_interval = apply_interval
+        self.apply_batch = apply_batch
+        self.max_bytes = max_bytes
+        self._file = None
+        self._end = 0          # bytes written
+        self._durable = 0      # bytes fsync'd
+        self._applied = 0      # bytes applied to SQLite (checkpointed)
+        self._pending = deque()  # (end_offset, order) written but not applied
+        self._lock = threading.Lock()       # file, offsets, pending
+        self._sync_lock = threading.Lock()  # one fsync at a time; others piggyback
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def start(self):
+        """Recover the journal, apply its unapplied tail, then start the compactor."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        applied = self._read_checkpoint()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if applied > size:
+            applied = 0  # crashed between checkpoint reset and truncation in a rotation
+        records, end = scan(self.path, applied) if size else ([], 0)
+        self._file = open(self.path, "ab")
+        if end < size:
+            logging.warning(f"Order journal: dropping {size - end} byte(s) of torn/corrupt tail at offset {end}")
+            self._file.truncate(end)
+            os.fsync(self._file.fileno())
+        self._end = self._durable = end
+        self._applied = applied
+        self._pending.extend(records)
+        if records:
+            logging.info(f"Order journal: replaying {len(records)} unapplied order(s)")
+            while self._pending:
+                if not self._apply_pending():
+                    break  # database unavailable: the compactor keeps trying
+        self._thread = threading.Thread(target=self._run, name="order-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Apply what is pending (up to timeout seconds) and close; the rest is replayed on next start."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    # ------------------------------------------------------------------ billing path
+
+    def append(self, order):
+        """Journal one order. Returns: its order_uuid"""
+        return self.append_many([order])[0]
+
+    def append_many(self, orders):
+        """
+        Journal orders (assigning order_uuid/order_date where missing) and
+        fsync before returning.
+        Returns: list of order_uuids
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        chunks, normalized = [], []
+        for order in orders:
+            order = dict(order)
+            order.setdefault("order_uuid", uuid.uuid4().hex)
+            order.setdefault("order_date", now)
+            order["items"] = [list(i) for i in order["items"]]
+            chunks.append(encode_record(order))
+            normalized.append(order)
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("order journal is not started")
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            for chunk, order in zip(chunks, normalized):
+                self._end += len(chunk)
+                self._pending.append((self._end, order))
+            end = self._end
+        self._sync(end)
+        return [o["order_uuid"] for o in normalized]
+
+    def _sync(self, end):
+        """Group commit: one fsync covers every append written before it started."""
+        with self._sync_lock:
+            if self._durable >= end:
+                return  # another caller's fsync already covered us
+            with self._lock:
+                target = self._end
+                fd = self._file.fileno()
+            os.fsync(fd)
+            self._durable = target
+
+    # ------------------------------------------------------------------ compactor
+
+    def _run(self):
+        delay = self.apply_interval
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            ok = True
+            while self._pending and ok:
+                ok = self._apply_pending()
+            delay = self.apply_interval if ok else min(delay * 2, 5.0)
+            if ok:
+                self._maybe_rotate()
+            if stopping:
+                break
+        db_utils.close_connections()
+
+    def _apply_pending(self):
+        """
+        Apply up to apply_batch durable orders in one transaction and advance
+        the checkpoint. Returns: False if the database was busy (try later)
+        """
+        durable = self._durable
+        with self._lock:
+            head = list(itertools.islice(self._pending, self.apply_batch))
+        batch = [(end, order) for end, order in head if end <= durable]
+        if not batch:
+            return True
+        try:
+            db_utils.save_orders_bulk([self._kwargs(o) for _, o in batch], len(batch))
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Order journal: applying {len(batch)} order(s) failed, will retry: {e}")
+            return False
+        except Exception:
+            if not self._apply_one_by_one(batch):
+                return False
+        self._checkpoint(batch[-1][0], len(batch))
+        return True
+
+    def _apply_one_by_one(self, batch):
+        """
+        A batch was rejected: save its orders individually and set the bad
+        ones aside. Returns: False if the database was busy (try later)
+        """
+        for _, order in batch:
+            try:
+                db_utils.save_orders_bulk([self._kwargs(order)])
+            except sqlite3.OperationalError as e:
+                logging.warning(f"Order journal: applying order {order['order_uuid']} failed, will retry: {e}")
+                return False
+            except Exception as e:
+                logging.error(f"Order journal: order {order['order_uuid']} rejected: {e}")
+                with open(self.path + ".failed", "a", encoding="utf-8") as f:
+                    f.write(json.dumps(order) + "\n")
+        return True
+
+    @staticmethod
+    def _kwargs(order):
+        o = dict(order)
+        o["items"] = [tuple(i) for i in order["items"]]
+        return o
+
+    def _checkpoint(self, offset, count):
+        with self._lock:
+            for _ in range(count):
+                self._pending.popleft()
+            self._applied = offset
+        self._write_checkpoint(offset)
+
+    def _maybe_rotate(self):
+        """Start the file over once everything in it is applied and it has grown past max_bytes."""
+        with self._sync_lock, self._lock:
+            if self._file is None or self._pending or self._end < self.max_bytes:
+                return
+            if self._applied != self._end:
+                return
+            # Reset the checkpoint first: a crash in between only re-applies
+            # already-saved orders, which the uuid check skips
+            self._write_checkpoint(0)
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._end = self._durable = self._applied = 0
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return int(json.load(f)["offset"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return 0
+
+    def _write_checkpoint(self, offset):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
@@ -0,0 +1,215 @@
+# utils/order_writer.py
+# Background order persistence for the cashier screen: bills are spooled to a
+# local file, saved by a writer thread, and their outcome is handed back to
+# the UI thread through a completion queue.
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from utils import db_utils
+
+SPOOL_NAME = "pending_orders.spool"
+
+class BackgroundOrderWriter:
+    """
+    Save orders on a background thread.
+
+    submit() appends the order to a JSONL spool (fsync'd) and returns at once;
+    the writer thread calls db_utils.save_order with the order's uuid, so an
+    order replayed from the spool after a crash is never saved twice.
+    A busy/locked database is retried with backoff (capped at
+    max_retry_delay); after max_attempts saves in a row the order goes to
+    the back of the queue, still spooled, so a lock never loses a bill.
+    Other errors are permanent: the order is reported and moved to
+    '<spool>.failed', so one bad order never holds up the bills behind it.
+
+    Outcomes are put on `completions` as tuples:
+        ("saved", order_uuid, order_id, order)
+        ("retrying", order_uuid, exception, order)   # database busy; still queued
+        ("failed", order_uuid, exception, order)
+    The UI drains it with poll() from its own thread (e.g. via root.after).
+    """
+
+    def __init__(self, spool_path=None, retry_delay=0.5, max_retry_delay=5.0, notify_after=3, max_attempts=10):
+        self.spool_path = spool_path or os.path.join(db_utils.DB_DIR, SPOOL_NAME)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.notify_after = notify_after
+        self.max_attempts = max_attempts
+        self.completions = queue.Queue()
+        self._queue = queue.Queue()
+        self._pending = {}  # order_uuid -> order, in submission order
+        self._retrying = set()  # order_uuids already reported as "retrying"
+        self._spool_lock = threading.Lock()
+        self._spool = None
+        self._done_since_compact = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def start(self):
+        """Replay orders left in the spool by a previous run, then start the thread."""
+        with self._spool_lock:
+            for order in self._read_spool():
+                self._pending[order["order_uuid"]] = order
+            self._rewrite_spool()
+        for order in list(self._pending.values()):
+            self._queue.put(order)
+        if self._pending:
+            logging.info(f"Replaying {len(self._pending)} spooled order(s)")
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Let queued orders finish (up to timeout seconds); unsaved ones stay spooled."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._stop.set()
+        with self._spool_lock:
+            self._rewrite_spool()  # keep only what is still unsaved (closes the spool)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    # ------------------------------------------------------------------ API
+
+    def submit(self, order):
+        """
+        Queue an order dict (save_order keyword arguments). Assigns
+        order_uuid/order_date if missing. Returns: order_uuid
+        """
+        order = dict(order)
+        order.setdefault("order_uuid", uuid.uuid4().hex)
+        order.setdefault("order_date", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        order["items"] = [list(i) for i in order["items"]]
+        with self._spool_lock:
+            self._append_spool({"op": "add", "order": order})
+            self._pending[order["order_uuid"]] = order
+        self._queue.put(order)
+        return order["order_uuid"]
+
+    def poll(self, callback):
+        """Call callback(*completion) for every finished order; non-blocking."""
+        while True:
+            try:
+                item = self.completions.get_nowait()
+            except queue.Empty:
+                return
+            callback(*item)
+
+    # ------------------------------------------------------------------ worker
+
+    def _run(self):
+        while not self._stop.is_set():
+            order = self._queue.get()
+            if order is None:
+                break
+            self._save(order)
+            if self._queue.empty():
+                self._maybe_compact()
+        db_utils.close_connections()
+
+    def _save(self, order):
+        attempt = 0
+        delay = self.retry_delay
+        kwargs = dict(order)
+        kwargs["items"] = [tuple(i) for i in order["items"]]
+        while True:
+            try:
+                order_id = db_utils.save_order(**kwargs)
+            except sqlite3.OperationalError as e:
+                if not db_utils._is_busy(e):
+                    self._reject(order, e)  # schema/data problem: retrying won't help
+                    return
+                attempt += 1
+                if attempt >= min(self.notify_after, self.max_attempts) and order["order_uuid"] not in self._retrying:
+                    self._retrying.add(order["order_uuid"])
+                    self.completions.put(("retrying", order["order_uuid"], e, order))
+                logging.warning(f"Saving order {order['order_uuid']} failed (attempt {attempt}): {e}")
+                if self._stop.wait(delay):
+                    return  # shutting down; order stays in the spool
+                if attempt >= self.max_attempts:
+                    self._queue.put(order)  # let the bills behind it try; it stays spooled
+                    return
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            except Exception as e:
+                self._reject(order, e)
+                return
+            self._finish(order)
+            self.completions.put(("saved", order["order_uuid"], order_id, order))
+            return
+
+    def _reject(self, order, error):
+        logging.error(f"Order {order['order_uuid']} rejected: {error}")
+        self._finish(order, failed=True)
+        self.completions.put(("failed", order["order_uuid"], error, order))
+
+    def _finish(self, order, failed=False):
+        with self._spool_lock:
+            if failed:
+                with open(self.spool_path + ".failed", "a", encoding="utf-8") as f:
+                    f.write(json.dumps(order) + "\n")
+            self._append_spool({"op": "done", "order_uuid": order["order_uuid"]}, sync=False)
+            self._pending.pop(order["order_uuid"], None)
+            self._retrying.discard(order["order_uuid"])
+            self._done_since_compact += 1
+
+    # ------------------------------------------------------------------ spool
+
+    def _read_spool(self):
+        """Return orders added but not marked done; tolerates a torn last line."""
+        pending = {}
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if rec.get("op") == "add":
+                        pending[rec["order"]["order_uuid"]] = rec["order"]
+                    elif rec.get("op") == "done":
+                        pending.pop(rec.get("order_uuid"), None)
+        except FileNotFoundError:
+            pass
+        return list(pending.values())
+
+    def _append_spool(self, record, sync=True):
+        if self._spool is None:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+        self._spool.write(json.dumps(record) + "\n")
+        self._spool.flush()
+        if sync:
+            os.fsync(self._spool.fileno())
+
+    def _rewrite_spool(self):
+        """Atomically replace the spool with just the pending orders (lock held)."""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        tmp = self.spool_path + ".tmp"
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            for order in self._pending.values():
+                f.write(json.dumps({"op": "add", "order": order}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool_path)
+        self._done_since_compact = 0
+
+    def _maybe_compact(self, threshold=100):
+        with self._spool_lock:
+            if self._done_since_compact >= threshold:
+                self._rewrite_spool()
@@ -0,0 +1,165 @@
+# utils/partitions.py
+# Moves closed months or years of orders out of the hot database into
+# compact, read-only archive files (db/archive/orders_<period>.db) and
+# registers them in order_partitions. db_utils routes order queries for
+# archived periods to these files; the daily_sales rollup stays in the hot
+# database, so totals and daily figures never need the archives.
+import logging
+import os
+import shutil
+import sqlite3
+from datetime import date, datetime
+
+from utils import db_utils
+
+ARCHIVE_DIR = "archive"  # under db_utils.DB_DIR
+GRANULARITIES = ("month", "year")
+
+_ORDER_COLS = ("id", "order_type", "subtotal", "gst", "discount", "total",
+               "payment_method", "order_date", "order_day", "order_uuid")
+
+_ARCHIVE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS {s}.orders (
+        id INTEGER PRIMARY KEY,
+        order_type TEXT NOT NULL,
+        subtotal REAL NOT NULL,
+        gst REAL NOT NULL,
+        discount REAL NOT NULL DEFAULT 0,
+        total REAL NOT NULL,
+        payment_method TEXT NOT NULL,
+        order_date TEXT NOT NULL,
+        order_day TEXT,
+        order_uuid TEXT
+    );""",
+    """CREATE TABLE IF NOT EXISTS {s}.order_items (
+        id INTEGER PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        item_name TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL
+    );""",
+    "CREATE INDEX IF NOT EXISTS {s}.idx_orders_order_date ON orders (order_date);",
+    "CREATE INDEX IF NOT EXISTS {s}.idx_orders_order_day ON orders (order_day);",
+    "CREATE UNIQUE INDEX IF NOT EXISTS {s}.idx_orders_order_uuid ON orders (order_uuid);",
+    "CREATE INDEX IF NOT EXISTS {s}.idx_order_items_order_id ON order_items (order_id);",
+)
+
+def period_of(day, granularity):
+    """
+    Period containing a YYYY-MM-DD day.
+    Returns: (name, start_day, end_day) with end_day exclusive, e.g. ('2024-03', '2024-03-01', '2024-04-01')
+    """
+    d = datetime.strptime(day[:10], "%Y-%m-%d").date()
+    if granularity == "month":
+        start = d.replace(day=1)
+        end = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+        name = start.strftime("%Y-%m")
+    elif granularity == "year":
+        start, end, name = date(d.year, 1, 1), date(d.year + 1, 1, 1), str(d.year)
+    else:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return name, start.isoformat(), end.isoformat()
+
+def _archive_file(name):
+    return os.path.join(ARCHIVE_DIR, f"orders_{name}.db")
+
+def archive_orders(before=None, granularity="month", vacuum=False):
+    """
+    Archive every period (month or year) that ends on or before `before`
+    (YYYY-MM-DD, default today) and still has orders in the hot database.
+    Archiving a period again merges late orders into its existing file.
+    Returns: list of (period name, orders moved)
+    """
+    cutoff = period_of(before or date.today().isoformat(), granularity)[1]
+    conn = db_utils.get_connection()
+    width = 7 if granularity == "month" else 4
+    periods = [r[0] for r in conn.execute(
+        f"SELECT DISTINCT substr(order_day, 1, {width}) FROM orders WHERE order_day < ? ORDER BY 1;",
+        (cutoff,),
+    )]
+    moved = []
+    for key in periods:
+        first_day = f"{key}-01" if granularity == "month" else f"{key}-01-01"
+        name, start, end = period_of(first_day, granularity)
+        moved.append((name, archive_period(name, start, end)))
+    if moved and vacuum:
+        conn.execute("VACUUM;")
+    return moved
+
+def archive_period(name, start_day, end_day):
+    """
+    Move orders with start_day <= order_day < end_day into the archive
+    file for `name`: build it next to the target, compact it, make it
+    read-only, swap it in, then register it and delete the moved rows from
+    the hot database in one transaction.
+    Returns: number of orders moved
+    """
+    rel = _archive_file(name)
+    path = os.path.join(db_utils.DB_DIR, rel)
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = db_utils.get_connection()
+    registered = conn.execute("SELECT 1 FROM order_partitions WHERE name = ?;", (name,)).fetchone()
+    if registered and os.path.exists(path):
+        shutil.copyfile(path, tmp)  # merge late orders into the existing archive
+        os.chmod(tmp, 0o644)
+
+    cols = ", ".join(_ORDER_COLS)
+    conn.execute("ATTACH DATABASE ? AS archive_build;", (tmp,))
+    try:
+        with db_utils.transaction() as conn:
+            for stmt in _ARCHIVE_SCHEMA:
+                conn.execute(stmt.format(s="archive_build"))
+            cur = conn.execute(f"""
+                INSERT OR IGNORE INTO archive_build.orders ({cols})
+                SELECT {cols} FROM main.orders WHERE order_day >= ? AND order_day < ?;
+            """, (start_day, end_day))
+            moved = cur.rowcount
+            conn.execute("""
+                INSERT OR IGNORE INTO archive_build.order_items (id, order_id, item_name, quantity, price)
+                SELECT oi.id, oi.order_id, oi.item_name, oi.quantity, oi.price
+                FROM main.orders o JOIN main.order_items oi ON oi.order_id = o.id
+                WHERE o.order_day >= ? AND o.order_day < ?;
+            """, (start_day, end_day))
+            total = conn.execute("SELECT COUNT(*) FROM archive_build.orders;").fetchone()[0]
+    finally:
+        conn.execute("DETACH DATABASE archive_build;")
+
+    _compact(tmp)
+    os.chmod(tmp, 0o444)
+    if os.path.exists(path):
+        os.chmod(path, 0o644)  # Windows refuses to replace a read-only file
+    os.replace(tmp, path)
+
+    # Delete exactly the rows that made it into the archive (orders saved
+    # for this period meanwhile stay in the hot database until the next run)
+    conn.execute("ATTACH DATABASE ? AS archive_done;", (db_utils.read_only_uri(path),))
+    try:
+        with db_utils.transaction() as conn:
+            conn.execute("""
+                DELETE FROM main.order_items
+                WHERE order_id IN (SELECT id FROM archive_done.orders);
+            """)
+            conn.execute("DELETE FROM main.orders WHERE id IN (SELECT id FROM archive_done.orders);")
+            conn.execute("""
+                INSERT OR REPLACE INTO order_partitions
+                    (name, file, start_day, end_day, order_count, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, (name, rel, start_day, end_day, total, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    finally:
+        conn.execute("DETACH DATABASE archive_done;")
+    logging.info(f"Archived {moved} order(s) for {name} to {rel} ({total} in archive)")
+    return moved
+
+def _compact(path):
+    """Rebuild the file tightly packed, with a rollback journal (no -wal files next to a read-only archive)."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = DELETE;")
+        conn.execute("ANALYZE;")
+        conn.execute("VACUUM;")
+    finally:
+        conn.close()
@@ -0,0 +1,257 @@
+# utils/report_engine.py
+# Parallel sales reports for long date ranges. The range is split into day or
+# month chunks; each chunk is aggregated in a worker process on its own
+# read-only connection (archived partitions attached as needed), and the
+# partial results are merged here. Money is summed in integer paise, so the
+# merged totals and averages are exact whatever the chunking.
+import heapq
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from utils import db_utils
+from utils.calculator import from_minor
+
+CHUNKS = ("day", "month")
+
+_DAYS_SQL = """
+    SELECT order_day, COUNT(*),
+           SUM(CAST(ROUND(total * 100) AS INTEGER)),
+           SUM(CAST(ROUND(subtotal * 100) AS INTEGER)),
+           SUM(CAST(ROUND(gst * 100) AS INTEGER)),
+           SUM(CAST(ROUND(discount * 100) AS INTEGER))
+    FROM {s}.orders
+    WHERE order_date >= ? AND order_date < ?
+    GROUP BY order_day"""
+
+_ITEMS_SQL = """
+    SELECT oi.item_name, SUM(oi.quantity)
+    FROM {s}.orders o
+    JOIN {s}.order_items oi ON oi.order_id = o.id
+    WHERE o.order_date >= ? AND o.order_date < ?
+    GROUP BY oi.item_name"""
+
+# ---------------------------------------------------------------------- worker side
+
+_worker_conns = {}  # db_path -> read-only connection; only populated inside pool worker processes
+
+def _open_read_only(db_path):
+    conn = sqlite3.connect(db_utils.read_only_uri(db_path), uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute(f"PRAGMA cache_size = {int(db_utils.DB_SETTINGS['cache_size'])};")
+    conn.execute(f"PRAGMA mmap_size = {int(db_utils.DB_SETTINGS['mmap_size'])};")
+    return conn
+
+def _read_only_connection(db_path):
+    conn = _worker_conns.get(db_path)
+    if conn is None:
+        conn = _worker_conns[db_path] = _open_read_only(db_path)
+    return conn
+
+def aggregate_chunk(db_path, lo, hi):
+    """
+    Aggregate orders with lo <= order_date < hi (YYYY-MM-DD bounds) in one database.
+    Runs in a pool worker process, reusing that process's connection.
+    Returns: (days, items) where days is a list of
+        (day, orders, total, subtotal, gst, discount) in paise and items maps item_name -> quantity
+    """
+    return _aggregate(_read_only_connection(db_path), os.path.dirname(db_path), lo, hi)
+
+def _aggregate_inline(groups):
+    """
+    aggregate_chunk for every (db_path, lo, hi) task in the calling thread, on
+    connections opened for this call only, so any thread (e.g. a server
+    reader) may run it. Returns: list of lists of partial results, like groups
+    """
+    conns = {}
+    try:
+        parts = []
+        for group in groups:
+            part = []
+            for db_path, lo, hi in group:
+                if db_path not in conns:
+                    conns[db_path] = _open_read_only(db_path)
+                part.append(_aggregate(conns[db_path], os.path.dirname(db_path), lo, hi))
+            parts.append(part)
+        return parts
+    finally:
+        for conn in conns.values():
+            conn.close()
+
+def _aggregate(conn, base_dir, lo, hi, with_days=True):
+    days, items = [], {}
+    for part, seg_lo, seg_hi in db_utils.order_segments(conn, lo, hi):
+        with db_utils.attach_partition(conn, part, base_dir) as schemas:
+            params = (seg_lo, seg_hi) * len(schemas)
+            if with_days:
+                days.extend(tuple(r) for r in conn.execute(db_utils.union_all(_DAYS_SQL, schemas) + ";", params))
+            for name, qty in conn.execute(db_utils.union_all(_ITEMS_SQL, schemas) + ";", params):
+                items[name] = items.get(name, 0) + qty
+    return days, items
+
+# ---------------------------------------------------------------------- driver side
+
+def split_range(start_date, end_date, chunk="month"):
+    """
+    Split an inclusive YYYY-MM-DD range into half-open [lo, hi) chunks
+    aligned to days or calendar months.
+    """
+    if chunk not in CHUNKS:
+        raise ValueError(f"chunk must be one of {', '.join(CHUNKS)}")
+    day = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
+    chunks = []
+    while day < end:
+        if chunk == "day":
+            nxt = day + timedelta(days=1)
+        else:
+            nxt = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+        nxt = min(nxt, end)
+        chunks.append((day.isoformat(), nxt.isoformat()))
+        day = nxt
+    return chunks
+
+def _merge(parts, start_date, end_date, top_n):
+    per_day = {}
+    items = {}
+    for days, quantities in parts:
+        for day, *sums in days:
+            acc = per_day.get(day)
+            if acc is None:
+                per_day[day] = list(sums)
+            else:
+                for i, v in enumerate(sums):
+                    acc[i] += v
+        for name, qty in quantities.items():
+            items[name] = items.get(name, 0) + qty
+
+    daily = []
+    orders = total = 0
+    for day in sorted(per_day, reverse=True):
+        n, tot, sub, gst, disc = per_day[day]
+        orders += n
+        total += tot
+        daily.append({
+            "date": day, "total_sales": from_minor(tot), "total_orders": n,
+            "avg_order_value": round(tot / n / 100, 2),
+            "subtotal": from_minor(sub), "gst": from_minor(gst), "discount": from_minor(disc),
+        })
+    top = heapq.nsmallest(top_n, items.items(), key=lambda kv: (-kv[1], kv[0]))
+    return {
+        "start": start_date,
+        "end": end_date,
+        "total_orders": orders,
+        "total_sales": from_minor(total),
+        "avg_order_value": round(total / orders / 100, 2) if orders else None,
+        "daily_summary": daily,
+        "top_items": [{"item_name": name, "total_quantity": qty} for name, qty in top],
+    }
+
+class ReportEngine:
+    """
+    Process pool for range reports. Keep one around (e.g. in the server) to
+    reuse warm workers and their connections; close() when done.
+
+    databases: main database files to report over (several outlets merge
+    into one report); default is the local restaurant.db.
+    """
+
+    def __init__(self, workers=None, chunk="month", databases=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self.databases = [os.path.abspath(p) for p in (databases or [db_utils._db_path()])]
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def sales_reports(self, ranges, top_n=5, chunk=None):
+        """
+        Build several reports at once (e.g. this year and last year); all
+        their chunks share the pool.
+        ranges: list of (start_date, end_date), inclusive YYYY-MM-DD
+        Returns: list of report dicts (see sales_report), in the same order
+        """
+        tasks = [[(db, lo, hi) for lo, hi in split_range(s, e, chunk or self.chunk) for db in self.databases]
+                 for s, e in ranges]
+        n_tasks = sum(len(t) for t in tasks)
+        if n_tasks <= 1 or self.workers <= 1:
+            parts = _aggregate_inline(tasks)
+        else:
+            pool = self._executor()
+            futures = [[pool.submit(aggregate_chunk, *t) for t in group] for group in tasks]
+            parts = [[f.result() for f in group] for group in futures]
+        return [_merge(p, s, e, top_n) for p, (s, e) in zip(parts, ranges)]
+
+    def sales_report(self, start_date, end_date, top_n=5, chunk=None):
+        """
+        Sales report for an inclusive YYYY-MM-DD range.
+        Returns: dict with start, end, total_orders, total_sales, avg_order_value,
+            daily_summary (newest first: date, total_sales, total_orders,
+            avg_order_value, subtotal, gst, discount) and top_items
+        """
+        return self.sales_reports([(start_date, end_date)], top_n, chunk)[0]
+
+    def year_over_year(self, start_date, end_date, years=1, top_n=5):
+        """Reports for the range and the same range 1..years years earlier, newest first."""
+        ranges = [(start_date, end_date)]
+        for back in range(1, years + 1):
+            ranges.append(tuple(_years_earlier(d, back) for d in (start_date, end_date)))
+        return self.sales_reports(ranges, top_n)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Single-threaded helpers on the caller's connection (e.g. a UI worker that may interrupt() it)
+
+def rollup_totals(conn, start_date, end_date):
+    """
+    Totals for an inclusive YYYY-MM-DD range from the daily_sales rollup
+    (one row per day, so cheap however many orders there are).
+    Returns: dict with total_orders, total_sales, avg_order_value, gst, discount
+    """
+    n, total, gst, discount = conn.execute("""
+        SELECT COALESCE(SUM(order_count), 0), COALESCE(SUM(total), 0),
+               COALESCE(SUM(gst), 0), COALESCE(SUM(discount), 0)
+        FROM daily_sales WHERE day >= ? AND day <= ?;
+    """, (start_date, end_date)).fetchone()
+    return {
+        "total_orders": n,
+        "total_sales": round(total, 2),
+        "avg_order_value": round(total / n, 2) if n else None,
+        "gst": round(gst, 2),
+        "discount": round(discount, 2),
+    }
+
+def top_items(conn, start_date, end_date, top_n=5, base_dir=None):
+    """
+    Best-selling items for an inclusive YYYY-MM-DD range (archived partitions
+    included), ties by name. Returns: list of {item_name, total_quantity}
+    """
+    _, items = _aggregate(conn, base_dir, start_date, db_utils._next_day(end_date), with_days=False)
+    top = heapq.nsmallest(top_n, items.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [{"item_name": name, "total_quantity": qty} for name, qty in top]
+
+def _years_earlier(day, years):
+    d = datetime.strptime(day, "%Y-%m-%d").date()
+    try:
+        return d.replace(year=d.year - years).isoformat()
+    except ValueError:  # Feb 29
+        return d.replace(year=d.year - years, day=28).isoformat()
+
+def sales_report(start_date, end_date, top_n=5, chunk="month", workers=None):
+    """One-off parallel sales report (starts and stops its own pool)."""
+    with ReportEngine(workers=workers, chunk=chunk) as engine:
+        return engine.sales_report(start_date, end_date, top_n)
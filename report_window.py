@@ -0,0 +1,251 @@
+# ui/report_window.py
+# Sales report window. Reports are computed on a background thread with its
+# own read-only connection, so the billing screen never waits on a long query.
+# Period totals come from the daily_sales rollup and appear at once; the top
+# item of each period (a line-item scan) fills in as it finishes, and Cancel
+# interrupts the scan in flight.
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import tkinter as tk
+from datetime import date, timedelta
+from tkinter import ttk, messagebox
+
+from utils import db_utils
+from utils.report_engine import rollup_totals, top_items
+
+RANGES = ("Day", "Week", "Month")
+DEFAULT_COUNTS = {"Day": 7, "Week": 8, "Month": 12}
+MAX_PERIODS = 366
+POLL_MS = 50  # how often the window collects results from the worker
+COLUMNS = ("period", "orders", "sales", "avg", "gst", "discount", "top_item")
+HEADINGS = ("Period", "Orders", "Sales", "Avg Order", "GST", "Discount", "Top Item")
+
+def periods(kind, count, today=None):
+    """
+    The `count` most recent day/week/month periods up to today, newest first.
+    Weeks are ISO weeks (Monday to Sunday).
+    Returns: list of (label, start_date, end_date), inclusive YYYY-MM-DD
+    """
+    today = today or date.today()
+    out = []
+    if kind == "Day":
+        for i in range(count):
+            d = today - timedelta(days=i)
+            out.append((d.isoformat(), d.isoformat(), d.isoformat()))
+    elif kind == "Week":
+        monday = today - timedelta(days=today.weekday())
+        for i in range(count):
+            start = monday - timedelta(weeks=i)
+            year, week, _ = start.isocalendar()
+            out.append((f"{year}-W{week:02d}", start.isoformat(), (start + timedelta(days=6)).isoformat()))
+    elif kind == "Month":
+        first = today.replace(day=1)
+        for _ in range(count):
+            last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            out.append((first.strftime("%Y-%m"), first.isoformat(), last.isoformat()))
+            first = (first - timedelta(days=1)).replace(day=1)
+    else:
+        raise ValueError(f"range must be one of {', '.join(RANGES)}")
+    return out
+
+class ReportWorker(threading.Thread):
+    """
+    Computes period reports on its own read-only connection and puts
+    ("row", label, totals) for every period (see report_engine.rollup_totals),
+    then ("top", label, item or None) for each period as its line items are
+    scanned, then ("done", n), ("cancelled", n) or ("error", message) on the
+    results queue; n counts periods with their top item.
+    """
+
+    def __init__(self, spans, results, db_path=None):
+        super().__init__(name="report-worker", daemon=True)
+        self.spans = spans
+        self.results = results
+        self.db_path = db_path or db_utils._db_path()
+        self._cancel = threading.Event()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def cancel(self):
+        """Stop after the current period; the running query is interrupted."""
+        self._cancel.set()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self):
+        done = 0
+        try:
+            conn = sqlite3.connect(db_utils.read_only_uri(self.db_path), uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = ON;")
+            with self._conn_lock:
+                self._conn = conn
+            try:
+                for label, start, end in self.spans:
+                    self.results.put(("row", label, rollup_totals(conn, start, end)))
+                base_dir = os.path.dirname(self.db_path)
+                for label, start, end in self.spans:
+                    if self._cancel.is_set():
+                        break
+                    top = top_items(conn, start, end, top_n=1, base_dir=base_dir)
+                    self.results.put(("top", label, top[0] if top else None))
+                    done += 1
+            finally:
+                with self._conn_lock:
+                    self._conn = None
+                conn.close()
+        except sqlite3.OperationalError as e:
+            if not self._cancel.is_set():  # "interrupted" is how cancel() ends a query
+                logging.error(f"Report failed: {e}")
+                self.results.put(("error", str(e)))
+                return
+        except Exception as e:
+            logging.error(f"Report failed: {e}")
+            self.results.put(("error", str(e)))
+            return
+        self.results.put(("cancelled", done) if self._cancel.is_set() else ("done", done))
+
+class ReportWindow:
+    """Toplevel sales report: pick Day/Week/Month and how many, Run, Cancel."""
+
+    def __init__(self, root, db_path=None):
+        self.root = root
+        self.db_path = db_path
+        self.worker = None
+        self._results = None
+        self._poll_job = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Sales Reports")
+        self.window.geometry("820x420")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = ttk.Frame(self.window, padding=8)
+        controls.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(controls, text="Range:").grid(row=0, column=0, padx=(0, 4))
+        self.range_var = tk.StringVar(value="Day")
+        range_box = ttk.Combobox(controls, textvariable=self.range_var, values=RANGES, state="readonly", width=8)
+        range_box.grid(row=0, column=1)
+        range_box.bind("<<ComboboxSelected>>", self._on_range_changed)
+        ttk.Label(controls, text="Last:").grid(row=0, column=2, padx=(10, 4))
+        self.count_var = tk.StringVar(value=str(DEFAULT_COUNTS["Day"]))
+        ttk.Spinbox(controls, from_=1, to=MAX_PERIODS, textvariable=self.count_var, width=5).grid(row=0, column=3)
+        self.run_button = ttk.Button(controls, text="Run", command=self.run)
+        self.run_button.grid(row=0, column=4, padx=(10, 4))
+        self.cancel_button = ttk.Button(controls, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=5)
+        self.status_label = ttk.Label(controls, text="")
+        self.status_label.grid(row=0, column=6, padx=(10, 0), sticky=tk.W)
+
+        table = ttk.Frame(self.window, padding=(8, 0, 8, 8))
+        table.grid(row=1, column=0, sticky=(tk.N, tk.S, tk.W, tk.E))
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+        table.columnconfigure(0, weight=1)
+        table.rowconfigure(0, weight=1)
+        self.tree = ttk.Treeview(table, columns=COLUMNS, show="headings", height=15)
+        for col, heading in zip(COLUMNS, HEADINGS):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=160 if col == "top_item" else 90,
+                             anchor=tk.W if col in ("period", "top_item") else tk.E)
+        scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky=(tk.N, tk.S, tk.W, tk.E))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.run()
+
+    def _on_range_changed(self, event=None):
+        self.count_var.set(str(DEFAULT_COUNTS[self.range_var.get()]))
+        self.run()
+
+    def run(self):
+        """Start a fresh report, cancelling one still running."""
+        try:
+            count = int(self.count_var.get())
+        except (TypeError, ValueError):
+            count = 0
+        if not 1 <= count <= MAX_PERIODS:
+            messagebox.showwarning("Sales Reports", f"Enter a number of periods from 1 to {MAX_PERIODS}", parent=self.window)
+            return
+        self._stop_worker()
+        self.tree.delete(*self.tree.get_children())
+        spans = periods(self.range_var.get(), count)
+        # A new queue per run: rows a cancelled worker still produces are never shown
+        self._results = queue.Queue()
+        self.worker = ReportWorker(spans, self._results, self.db_path)
+        self.worker.start()
+        self._total = len(spans)
+        self._topped = 0
+        self.status_label.config(text="Running...")
+        self.cancel_button.config(state=tk.NORMAL)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.status_label.config(text="Cancelling...")
+
+    def _stop_worker(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def _poll(self):
+        self._poll_job = None
+        finished = False
+        while self._results is not None:
+            try:
+                msg = self._results.get_nowait()
+            except queue.Empty:
+                break
+            kind = msg[0]
+            if kind == "row":
+                self._add_row(msg[1], msg[2])
+            elif kind == "top":
+                self._set_top_item(msg[1], msg[2])
+                self._topped += 1
+                self.status_label.config(text=f"Top items... {self._topped}/{self._total}")
+            else:
+                finished = True
+                if kind == "done":
+                    self.status_label.config(text=f"{msg[1]} period(s)")
+                elif kind == "cancelled":
+                    self.status_label.config(text=f"Cancelled after {msg[1]} of {self._total} period(s)")
+                else:
+                    self.status_label.config(text="Failed")
+                    messagebox.showerror("Sales Reports", f"Report failed:\n{msg[1]}", parent=self.window)
+                break
+        if finished:
+            self.worker = None
+            self.cancel_button.config(state=tk.DISABLED)
+        elif self.worker is not None:
+            self._poll_job = self.root.after(POLL_MS, self._poll)
+
+    def _add_row(self, label, totals):
+        self.tree.insert("", tk.END, iid=label, values=(
+            label,
+            totals["total_orders"],
+            f"${totals['total_sales']:.2f}",
+            f"${totals['avg_order_value']:.2f}" if totals["avg_order_value"] is not None else "-",
+            f"${totals['gst']:.2f}",
+            f"${totals['discount']:.2f}",
+            "...",
+        ))
+
+    def _set_top_item(self, label, top):
+        values = list(self.tree.item(label, "values"))
+        values[-1] = f"{top['item_name']} ({top['total_quantity']})" if top else "-"
+        self.tree.item(label, values=values)
+
+    def close(self):
+        self._stop_worker()
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.window.destroy()
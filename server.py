@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Restaurant Billing Software - headless HTTP/JSON billing server.
+
+Standard library only (asyncio). One writer task serializes all DB writes
+(group-committing whatever orders are queued), and a small thread pool of
+readers serves menu and report queries, each thread on its own pooled
+SQLite connection.
+
+With a journal (--journal), POST /orders is acknowledged (202, with the
+order_uuid) as soon as the order is fsync'd to the append-only order journal;
+a background compactor saves journaled orders to SQLite (see order_journal).
+
+Every order gets an order_uuid (the client's, or one assigned here). If the
+save is still queued when the request times out, POST /orders answers 202
+with that uuid instead of 504: the order will still be written, and
+resubmitting it with the uuid never saves it twice.
+
+Endpoints:
+    GET  /health
+    GET  /menu
+    POST /orders                 {"order_type", "payment_method", "items": [{"item_name", "quantity"}],
+                                  "discount"?, "discount_pct"?, "order_uuid"?}
+    GET  /orders?date=YYYY-MM-DD
+    GET  /reports/summary?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET  /reports/total
+    GET  /reports/range?start=YYYY-MM-DD&end=YYYY-MM-DD&chunk=month|day&years=N
+                                 (parallel report engine; years adds year-over-year ranges)
+    GET  /metrics                (DB query metrics; empty unless metrics are enabled)
+"""
+
+import asyncio
+import json
+import logging
+import math
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from utils import db_utils
+from utils.report_engine import ReportEngine, CHUNKS
+from utils.calculator import calculate_batch_totals
+
+ORDER_TYPES = ("Dine-In", "Takeaway")
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_QUANTITY = 10000          # per line item
+MAX_DISCOUNT = 1000000.0      # absolute discount per order
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT = 15.0
+
+_REASONS = {
+    200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 408: "Request Timeout", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+class HTTPError(Exception):
+    """Raised by handlers to send an error status with a JSON message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _rows(rows):
+    return [dict(r) for r in rows]
+
+class BillingServer:
+    def __init__(self, host="127.0.0.1", port=8080, readers=4, write_queue_size=1000,
+                 write_batch=100, request_timeout=10.0, report_workers=None, journal=None):
+        self.host = host
+        self.port = port
+        self.write_batch = write_batch
+        self.request_timeout = request_timeout
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="billing-reader")
+        # A single writer thread keeps one connection and never contends with itself
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="billing-writer")
+        # Worker processes for long-range reports, started on first use
+        self._reports = ReportEngine(workers=report_workers)
+        # Optional write-ahead journal (path); orders are then applied to SQLite in the background
+        self.journal_path = journal
+        self._journal = None
+        self._queue_size = write_queue_size
+        self._queue = None
+        self._writer_task = None
+        self._server = None
+        self._routes = {
+            ("GET", "/health"): self.handle_health,
+            ("GET", "/menu"): self.handle_menu,
+            ("POST", "/orders"): self.handle_create_order,
+            ("GET", "/orders"): self.handle_orders_by_date,
+            ("GET", "/reports/summary"): self.handle_sales_summary,
+            ("GET", "/reports/total"): self.handle_total_sales,
+            ("GET", "/reports/range"): self.handle_range_report,
+            ("GET", "/metrics"): self.handle_metrics,
+        }
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, db_utils.init_database)
+        if self.journal_path:
+            from utils.order_journal import OrderJournal
+            self._journal = OrderJournal(self.journal_path)
+            await loop.run_in_executor(self._writer, self._journal.start)  # replays the unapplied tail
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._writer_task = asyncio.ensure_future(self._writer_loop())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        sock = self._server.sockets[0].getsockname()
+        self.port = sock[1]
+        logging.info(f"Billing server listening on http://{sock[0]}:{sock[1]}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer_task is not None:
+            await self._queue.put(None)  # drain queued orders, then exit
+            await self._writer_task
+        loop = asyncio.get_running_loop()
+        if self._journal is not None:
+            await loop.run_in_executor(self._writer, self._journal.stop)
+        await loop.run_in_executor(self._writer, db_utils.close_connections)
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        self._reports.close()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ------------------------------------------------------------------ writer
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            while len(batch) < self.write_batch and not self._queue.empty():
+                nxt = self._queue.get_nowait()
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            orders = [o for o, _ in batch]
+            if self._journal is not None:
+                # One append + fsync for the whole group; results are order_uuids
+                try:
+                    uuids = await loop.run_in_executor(self._writer, self._journal.append_many, orders)
+                    results = list(zip(batch, uuids))
+                except Exception as e:
+                    results = [(item, e) for item in batch]
+                self._resolve(results)
+                continue
+            try:
+                ids = await loop.run_in_executor(self._writer, db_utils.save_orders_bulk, orders, len(orders))
+                results = list(zip(batch, ids))
+            except Exception:
+                # One bad order must not fail the whole group: retry individually
+                results = []
+                for item in batch:
+                    try:
+                        [oid] = await loop.run_in_executor(self._writer, db_utils.save_orders_bulk, [item[0]])
+                        results.append((item, oid))
+                    except Exception as e:
+                        results.append((item, e))
+            self._resolve(results)
+
+    @staticmethod
+    def _resolve(results):
+        for (_, fut), outcome in results:
+            if fut.done():
+                continue
+            if isinstance(outcome, Exception):
+                fut.set_exception(outcome)
+            else:
+                fut.set_result(outcome)
+
+    def _enqueue(self, order):
+        """Queue an order dict for the writer. Returns: future of its id (its order_uuid when journaling)"""
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((order, fut))
+        except asyncio.QueueFull:
+            raise HTTPError(503, "write queue full, retry later")
+        return fut
+
+    async def submit_order(self, order):
+        """Queue an order dict for the writer and wait for its id (its order_uuid when journaling)."""
+        return await self._enqueue(order)
+
+    @staticmethod
+    def _log_late_outcome(fut):
+        """Done-callback for writes the client stopped waiting for."""
+        if fut.exception() is not None:
+            logging.error(f"Order saved after its request timed out failed: {fut.exception()}")
+
+    # ------------------------------------------------------------------ handlers
+
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+
+    async def handle_health(self, query, body):
+        health = {"status": "ok", "pending_writes": self._queue.qsize()}
+        if self._journal is not None:
+            health["journal_pending"] = self._journal.pending_count
+        return 200, health
+
+    async def handle_menu(self, query, body):
+        catalog = db_utils.menu_catalog()
+        version, items = await self._read(lambda: (catalog.version, [i.as_dict() for i in catalog.items]))
+        return 200, {"version": version, "items": items}
+
+    async def handle_create_order(self, query, body):
+        # Times itself (not bounded by _handle_connection): once queued, the
+        # write cannot be taken back, so a timeout must not look like a failure
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.request_timeout
+        order = await asyncio.wait_for(self._read(self._parse_order, body), self.request_timeout)
+        fut = self._enqueue(order)
+        result = {k: order[k] for k in ("order_uuid", "order_type", "payment_method", "subtotal", "gst", "discount", "total")}
+        result["items"] = [{"item_name": n, "quantity": q, "price": p} for n, q, p in order["items"]]
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(fut), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            fut.add_done_callback(self._log_late_outcome)
+            result["status"] = "queued"  # will be saved; retry with the same order_uuid to confirm
+            return 202, result
+        if self._journal is not None:
+            return 202, result  # durable; order_id is assigned when it is applied
+        result["order_id"] = outcome
+        return 201, result
+
+    async def handle_orders_by_date(self, query, body):
+        date = self._param(query, "date")
+        return 200, {"date": date, "orders": await self._read(db_utils.get_orders_by_date, date)}
+
+    async def handle_sales_summary(self, query, body):
+        start = self._param(query, "start")
+        end = self._param(query, "end", start)
+        summary = await self._read(db_utils.get_sales_summary, start, end)
+        return 200, {
+            "start": start,
+            "end": end,
+            "daily_summary": _rows(summary["daily_summary"]),
+            "top_items": _rows(summary["top_items"]),
+        }
+
+    async def handle_total_sales(self, query, body):
+        return 200, await self._read(db_utils.get_total_sales)
+
+    async def handle_range_report(self, query, body):
+        start = self._param(query, "start")
+        end = self._param(query, "end", start)
+        chunk = self._param(query, "chunk", "month")
+        if chunk not in CHUNKS:
+            raise HTTPError(400, f"chunk must be one of {', '.join(CHUNKS)}")
+        years = int(self._param(query, "years", "0"))
+        if years:
+            reports = await self._read(self._reports.year_over_year, start, end, years)
+            return 200, {"reports": reports}
+        return 200, await self._read(self._reports.sales_report, start, end, 5, chunk)
+
+    async def handle_metrics(self, query, body):
+        return 200, dict(db_utils.get_metrics(), enabled=db_utils.db_metrics.ENABLED)
+
+    @staticmethod
+    def _param(query, name, default=None):
+        values = query.get(name)
+        if values:
+            return values[0]
+        if default is not None:
+            return default
+        raise HTTPError(400, f"missing query parameter '{name}'")
+
+    def _parse_order(self, body):
+        """Validate a JSON order and price it from the menu catalog."""
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        order_type = data.get("order_type", "Dine-In")
+        payment_method = data.get("payment_method", "Cash")
+        if order_type not in ORDER_TYPES:
+            raise HTTPError(400, f"order_type must be one of {', '.join(ORDER_TYPES)}")
+        if payment_method not in PAYMENT_METHODS:
+            raise HTTPError(400, f"payment_method must be one of {', '.join(PAYMENT_METHODS)}")
+        order_uuid = data.get("order_uuid")
+        if order_uuid is not None and (not isinstance(order_uuid, str) or not 0 < len(order_uuid) <= 64):
+            raise HTTPError(400, "order_uuid must be a string of 1-64 characters")
+        raw_items = data.get("items")
+        if not isinstance(raw_items, list) or not raw_items:
+            raise HTTPError(400, "items must be a non-empty list")
+
+        catalog = db_utils.menu_catalog()
+        priced = []
+        for it in raw_items:
+            try:
+                name = it["item_name"]
+                qty = int(it.get("quantity", 1))
+            except (TypeError, KeyError, ValueError, OverflowError):
+                raise HTTPError(400, "each item needs item_name and an integer quantity")
+            if not isinstance(name, str):
+                raise HTTPError(400, "item_name must be a string")
+            if not 0 < qty <= MAX_QUANTITY:
+                raise HTTPError(400, f"quantity for {name!r} must be between 1 and {MAX_QUANTITY}")
+            menu_item = catalog.get(name)
+            if menu_item is None:
+                raise HTTPError(400, f"unknown menu item {name!r}")
+            priced.append((name, qty, menu_item.price, menu_item.gst))
+
+        try:
+            discount = float(data.get("discount", 0) or 0)
+            discount_pct = float(data.get("discount_pct", 0) or 0)
+        except (TypeError, ValueError, OverflowError):
+            raise HTTPError(400, "discount and discount_pct must be numbers")
+        if not (math.isfinite(discount) and 0 <= discount <= MAX_DISCOUNT):
+            raise HTTPError(400, f"discount must be between 0 and {MAX_DISCOUNT:g}")
+        if not (math.isfinite(discount_pct) and 0 <= discount_pct <= 100):
+            raise HTTPError(400, "discount_pct must be between 0 and 100")
+        try:
+            totals = calculate_batch_totals([{
+                "items": priced, "discount": discount, "discount_pct": discount_pct,
+            }], use_numpy=False)[0]
+        except (TypeError, ValueError, ArithmeticError):  # ArithmeticError: overflow, decimal.InvalidOperation
+            raise HTTPError(400, "order totals out of range")
+        order = {"order_type": order_type, "payment_method": payment_method,
+                 "items": [(n, q, p) for n, q, p, _ in priced]}
+        # Resubmitting the same uuid never saves twice; assigning one here lets
+        # a client whose request timed out retry safely
+        order["order_uuid"] = order_uuid or uuid.uuid4().hex
+        order.update(totals)
+        return order
+
+    # ------------------------------------------------------------------ HTTP
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(400, "too many headers")
+            name, _, value = h.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raw_length = headers.get("content-length", "0")
+        if not (raw_length.isascii() and raw_length.isdigit()):
+            raise HTTPError(400, "Content-Length must be a non-negative integer")
+        length = int(raw_length)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, version, headers, body
+
+    async def _dispatch(self, method, target):
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        handler = self._routes.get((method, path))
+        if handler is None:
+            if any(p == path for (_, p) in self._routes):
+                raise HTTPError(405, f"{method} not allowed on {path}")
+            raise HTTPError(404, f"no route for {path}")
+        return handler, parse_qs(parts.query)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    handler, query = await self._dispatch(method, target)
+                    if handler == self.handle_create_order:
+                        status, payload = await handler(query, body)  # applies request_timeout itself
+                    else:
+                        status, payload = await asyncio.wait_for(handler(query, body), self.request_timeout)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except asyncio.TimeoutError:
+                    status, payload = 504, {"error": "request timed out"}
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    logging.exception("Unhandled error for %s %s", method, target)
+                    status, payload = 500, {"error": str(e)}
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+def run_server(host="127.0.0.1", port=8080, readers=4, journal=None):
+    """Run the billing server until Ctrl+C or SIGTERM, then drain queued writes."""
+    server = BillingServer(host=host, port=port, readers=readers, journal=journal)
+
+    async def _main():
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, task.cancel)
+            except (NotImplementedError, RuntimeError):
+                pass  # e.g. Windows: Ctrl+C still raises KeyboardInterrupt
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+    logging.info("Billing server stopped")
@@ -0,0 +1,49 @@
+# tests/conftest.py
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The code imports utils.<module> / ui.<module>; in a flat checkout both
+# package names resolve to the project root.
+for _name in ("utils", "ui"):
+    if _name not in sys.modules and not os.path.isdir(os.path.join(ROOT, _name)):
+        _pkg = types.ModuleType(_name)
+        _pkg.__path__ = [ROOT]
+        sys.modules[_name] = _pkg
+
+from utils import db_utils  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, migrated database in a temporary directory. Yields: its DB_DIR"""
+    monkeypatch.setattr(db_utils, "DB_DIR", str(tmp_path))
+    settings = dict(db_utils.DB_SETTINGS)
+    db_utils.invalidate_menu_cache()
+    db_utils.init_database()
+    yield str(tmp_path)
+    db_utils.close_connections()
+    db_utils.configure_db(**settings)
+    db_utils.invalidate_menu_cache()
+
+
+def make_order(items=(("Coke", 2, 2.0),), order_date="2024-03-15 12:00:00", **extra):
+    """save_order keyword arguments for a small order; totals follow the items."""
+    subtotal = round(sum(q * p for _, q, p in items), 2)
+    order = {
+        "order_type": "Dine-In",
+        "subtotal": subtotal,
+        "gst": round(subtotal * 0.05, 2),
+        "discount": 0.0,
+        "total": round(subtotal * 1.05, 2),
+        "payment_method": "Cash",
+        "items": list(items),
+        "order_date": order_date,
+    }
+    order.update(extra)
+    return order
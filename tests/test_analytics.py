@@ -0,0 +1,36 @@
+# tests/test_analytics.py
+import os
+
+from conftest import make_order
+from utils import db_utils
+from utils.analytics import Snapshot, refresh_snapshot
+from utils.report_engine import top_items
+
+
+def test_snapshot_matches_sql_reports(db):
+    # "Ice Cream" gets the lower dictionary code but ties with "Coke", which sorts first by name
+    db_utils.save_orders_bulk([
+        make_order([("Ice Cream", 2, 3.0)], "2024-05-01 10:00:00"),
+        make_order([("Coke", 2, 2.0)], "2024-05-01 11:00:00"),
+        make_order([("Coke", 1, 2.0), ("Ice Cream", 1, 3.0)], "2024-05-02 23:30:00"),
+    ])
+    path = os.path.join(db, "analytics")
+    assert refresh_snapshot(path) == 3
+    sql = top_items(db_utils.get_connection(), "2024-05-01", "2024-05-02")
+    with Snapshot(path) as snap:
+        assert snap.top_items("2024-05-01", "2024-05-02") == [
+            (i["item_name"], i["total_quantity"]) for i in sql]
+        assert snap.top_items("2024-05-01", "2024-05-02")[0] == ("Coke", 3)
+        assert [(d, n) for d, n, _ in snap.sales_by_day("2024-05-01", "2024-05-02")] == [
+            ("2024-05-01", 2), ("2024-05-02", 1)]
+
+
+def test_refresh_is_incremental(db):
+    path = os.path.join(db, "analytics")
+    db_utils.save_orders_bulk([make_order(order_date="2024-05-01 10:00:00")])
+    assert refresh_snapshot(path) == 1
+    assert refresh_snapshot(path) == 0
+    db_utils.save_orders_bulk([make_order(order_date="2024-05-03 10:00:00")])
+    assert refresh_snapshot(path) == 1
+    with Snapshot(path) as snap:
+        assert [d for d, _, _ in snap.sales_by_day("2024-05-01", "2024-05-31")] == ["2024-05-01", "2024-05-03"]
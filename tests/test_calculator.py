@@ -0,0 +1,63 @@
+# tests/test_calculator.py
+import random
+
+import pytest
+
+from utils import calculator
+from utils.calculator import OrderBatch, calculate_batch, calculate_batch_totals, percent_to_bp, to_minor
+
+
+def test_rounding_is_half_up():
+    assert to_minor(0.005) == 1
+    assert to_minor("2.675") == 268  # float 2.675 is 2.67499..., the string is exact
+    assert percent_to_bp(12.5) == 1250
+    [totals] = calculate_batch_totals([{"items": [("Tea", 1, 0.10)]}])
+    assert totals == {"subtotal": 0.1, "gst": 0.01, "discount": 0.0, "total": 0.11}  # gst 0.005 -> 0.01
+
+
+def test_gst_rounded_once_per_order():
+    # three lines of 0.0015 gst each: 0.0045 rounds to 0.00, not 3 x 0.00 or 3 x 0.01
+    [totals] = calculate_batch_totals([{"items": [("Tea", 1, 0.03)] * 3}])
+    assert totals["gst"] == 0.0
+
+
+def test_discount_clamped_to_order_value():
+    [over, negative] = calculate_batch_totals([
+        {"items": [("Coke", 2, 2.0)], "discount": 50},
+        {"items": [("Coke", 2, 2.0)], "discount": -1},
+    ])
+    assert over == {"subtotal": 4.0, "gst": 0.2, "discount": 4.2, "total": 0.0}
+    assert negative["discount"] == 0.0 and negative["total"] == 4.2
+
+
+def test_percent_discount_and_item_gst():
+    [totals] = calculate_batch_totals([
+        {"items": [("Pizza", 1, 10.0, 12), ("Coke", 1, 2.0)], "discount_pct": 10, "discount": 1},
+    ])
+    # gst 1.20 + 0.10; discount 1.00 + 10% of 12.00
+    assert totals == {"subtotal": 12.0, "gst": 1.3, "discount": 2.2, "total": 11.1}
+
+
+def test_empty_orders():
+    assert calculate_batch_totals([]) == []
+    batch = OrderBatch()
+    batch.add_order([], discount=5)
+    batch.add_order([("Coke", 1, 2.0)])
+    batch.add_order([])
+    assert calculate_batch(batch, use_numpy=False).as_dicts() == [
+        {"subtotal": 0.0, "gst": 0.0, "discount": 0.0, "total": 0.0},
+        {"subtotal": 2.0, "gst": 0.1, "discount": 0.0, "total": 2.1},
+        {"subtotal": 0.0, "gst": 0.0, "discount": 0.0, "total": 0.0},
+    ]
+
+
+def test_numpy_and_python_agree():
+    if calculator._load_numpy() is None:
+        pytest.skip("numpy is not installed")
+    rng = random.Random(7)
+    batch = OrderBatch()
+    for _ in range(500):
+        items = [("x", rng.randint(1, 9), rng.randint(1, 99999) / 100, rng.choice((0, 5, 12, 18)))
+                 for _ in range(rng.randint(0, 6))]
+        batch.add_order(items, discount=rng.randint(0, 2000) / 100, discount_pct=rng.choice((0, 5, 12.5)))
+    assert calculate_batch(batch, use_numpy=True).as_dicts() == calculate_batch(batch, use_numpy=False).as_dicts()
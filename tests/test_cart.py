@@ -0,0 +1,49 @@
+# tests/test_cart.py
+from collections import namedtuple
+
+from utils.calculator import calculate_batch_totals
+from utils.cart import Cart
+
+MenuItem = namedtuple("MenuItem", "price gst")
+
+
+def _cart():
+    cart = Cart()
+    cart.add("Coke", 2.0, 5)
+    cart.add("Pizza", 10.0, 12)
+    cart.add("Coke", 2.0, 5, qty=2)
+    return cart
+
+
+def test_add_merges_lines_by_name():
+    cart = _cart()
+    assert len(cart) == 2 and "Coke" in cart
+    assert cart.line_items() == [("Coke", 3, 2.0), ("Pizza", 1, 10.0)]
+    assert cart.get("Coke").total == 6.0
+
+
+def test_set_quantity_and_remove_keep_totals_in_step():
+    cart = _cart()
+    cart.set_quantity("Coke", 1)
+    assert cart.totals() == {"subtotal": 12.0, "gst": 1.3, "discount": 0.0, "total": 13.3}
+    assert cart.set_quantity("Pizza", 0) is None
+    assert "Pizza" not in cart
+    assert cart.remove("Pizza") is None
+    assert cart.remove("Coke").item_name == "Coke"
+    assert cart.totals() == {"subtotal": 0.0, "gst": 0.0, "discount": 0.0, "total": 0.0}
+
+
+def test_totals_match_calculator():
+    cart = _cart()
+    items = [(l.item_name, l.qty, l.price, l.gst) for l in cart]
+    [expected] = calculate_batch_totals([{"items": items, "discount": 1, "discount_pct": 10}], use_numpy=False)
+    assert cart.totals(discount=1, discount_pct=10) == expected
+
+
+def test_reprice_and_clear():
+    cart = _cart()
+    menu = {"Coke": MenuItem(2.5, 5)}  # Pizza vanished from the menu: keeps its price
+    assert cart.reprice(menu.get) == ["Coke"]
+    assert cart.totals()["subtotal"] == 17.5
+    cart.clear()
+    assert len(cart) == 0 and cart.totals()["total"] == 0.0
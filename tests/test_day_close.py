@@ -0,0 +1,55 @@
+# tests/test_day_close.py
+import csv
+import os
+
+from conftest import make_order
+from utils import db_utils
+from utils.day_close import close_days
+
+
+def _csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_close_is_idempotent(db):
+    path = os.path.join(db, "sales_report.csv")
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-06-01 10:00:00"),
+        make_order([("Ice Cream", 3, 3.0)], "2024-06-02 10:00:00"),
+        make_order([("Coke", 1, 2.0)], "2024-06-03 10:00:00"),
+    ])
+    assert close_days("2024-06-02", path) == ["2024-06-01", "2024-06-02"]
+    assert close_days("2024-06-02", path) == []
+    assert close_days("2024-06-03", path) == ["2024-06-03"]
+    rows = _csv(path)
+    assert rows[0] == ["date", "total_sales", "total_orders", "most_sold_item"]
+    assert [r[0] for r in rows[1:]] == ["2024-06-01", "2024-06-02", "2024-06-03"]
+    assert rows[2] == ["2024-06-02", "9.45", "1", "Ice Cream"]
+
+
+def test_rerun_after_crash_does_not_duplicate(db):
+    path = os.path.join(db, "sales_report.csv")
+    db_utils.save_orders_bulk([make_order(order_date="2024-06-01 10:00:00")])
+    close_days("2024-06-01", path)
+    with db_utils.transaction() as conn:  # crash after the CSV append, before the checkpoint
+        conn.execute("DELETE FROM day_close;")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2024-06-0")  # torn append
+    assert close_days("2024-06-01", path) == ["2024-06-01"]
+    assert [r[0] for r in _csv(path)[1:]] == ["2024-06-01"]
+
+
+def test_late_order_recloses_day(db):
+    path = os.path.join(db, "sales_report.csv")
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-06-01 10:00:00"),
+        make_order([("Coke", 1, 2.0)], "2024-06-02 10:00:00"),
+    ])
+    close_days("2024-06-02", path)
+    db_utils.save_order(**make_order([("Ice Cream", 5, 3.0)], "2024-06-01 21:00:00"))  # late order
+    assert close_days("2024-06-02", path) == ["2024-06-01"]
+    rows = _csv(path)
+    assert rows[1] == ["2024-06-01", "19.95", "2", "Ice Cream"]
+    assert [r[0] for r in rows[1:]] == ["2024-06-01", "2024-06-02"]
+    assert close_days("2024-06-02", path) == []
@@ -0,0 +1,56 @@
+# tests/test_db_metrics.py
+import pytest
+
+from conftest import make_order
+from utils import db_metrics, db_utils
+
+
+@pytest.fixture
+def metrics(db):
+    was_enabled = db_metrics.ENABLED
+    db_utils.close_connections()
+    db_utils.enable_metrics()
+    db_metrics.REGISTRY.reset()
+    yield db_metrics.REGISTRY
+    if not was_enabled:
+        db_utils.disable_metrics()
+    db_metrics.REGISTRY.reset()
+
+
+def _count(registry, fragment):
+    """Samples recorded for the one statement whose SQL contains fragment."""
+    matches = [s for sql, s in registry.snapshot()["queries"].items() if fragment in sql]
+    assert len(matches) == 1, matches
+    return matches[0]["count"]
+
+
+def test_pragmas_recorded_on_connect(metrics):
+    db_utils.get_connection()
+    assert _count(metrics, "PRAGMA journal_mode") == 1
+    assert _count(metrics, "PRAGMA mmap_size") == 1
+
+
+def test_statement_read_with_one_fetchone_is_counted(metrics):
+    db_utils.save_order(**make_order())
+    db_utils.get_total_sales()
+    db_utils.get_total_sales()
+    queries = metrics.snapshot()["queries"]
+    totals = [s for sql, s in queries.items() if sql.startswith("SELECT") and "daily_sales" in sql and "SUM" in sql]
+    assert [s["count"] for s in totals] == [2]
+
+
+def test_uuid_lookup_counted_per_save(metrics):
+    order = make_order(order_uuid="abc")
+    assert db_utils.save_order(**order) == db_utils.save_order(**order)
+    assert _count(metrics, "SELECT id FROM orders WHERE order_uuid = ?") == 2
+
+
+def test_fetch_rows_added_without_extra_samples(metrics):
+    db_utils.save_orders_bulk([make_order(order_date=f"2024-03-{d:02d} 10:00:00") for d in range(1, 6)])
+    conn = db_utils.get_connection()
+    cur = conn.execute("SELECT id FROM orders ORDER BY id;")
+    assert len(list(cur)) == 5
+    summary = metrics.snapshot()["queries"]["SELECT id FROM orders ORDER BY id"]
+    assert summary["count"] == 1
+    assert summary["rows"] == 5
+    assert summary["fetch_ms"] >= 0
@@ -0,0 +1,119 @@
+# tests/test_db_utils.py
+import sqlite3
+
+import pytest
+
+from conftest import make_order
+from utils import db_utils
+
+
+def _order_count():
+    return db_utils.get_connection().execute("SELECT COUNT(*) FROM orders;").fetchone()[0]
+
+
+def test_save_orders_bulk_batches_and_returns_ids_in_order(db):
+    orders = [make_order(order_date=f"2024-04-{d:02d} 10:00:00") for d in range(1, 8)]
+    ids = db_utils.save_orders_bulk(orders, batch_size=3)
+    assert ids == list(range(1, 8))
+    assert _order_count() == 7
+    items = db_utils.get_connection().execute("SELECT COUNT(*) FROM order_items;").fetchone()[0]
+    assert items == 7
+
+
+def test_save_orders_bulk_skips_saved_and_repeated_uuids(db):
+    first = db_utils.save_orders_bulk([make_order(order_uuid="a"), make_order(order_uuid="b")])
+    again = db_utils.save_orders_bulk([
+        make_order(order_uuid="b"), make_order(order_uuid="c"), make_order(order_uuid="c"), make_order(),
+    ])
+    assert again[0] == first[1]
+    assert again[1] == again[2]
+    assert _order_count() == 4
+    assert db_utils.save_order(**make_order(order_uuid="a")) == first[0]
+    assert _order_count() == 4
+
+
+def test_bad_order_rolls_back_whole_batch(db):
+    with pytest.raises(ValueError):
+        db_utils.save_orders_bulk([make_order(), make_order(order_date="15/03/2024")])
+    assert _order_count() == 0
+    assert db_utils.save_orders_bulk([make_order()]) == [1]
+
+
+def test_iter_orders_jsonl_computes_missing_totals(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"order_type": "Takeaway", "payment_method": "UPI", "items": [["Coke", 2, 2.0]]}\n\n')
+    [order] = list(db_utils.iter_orders_jsonl(str(path)))
+    assert (order["subtotal"], order["gst"], order["total"]) == (4.0, 0.2, 4.2)
+
+
+def _rollup():
+    conn = db_utils.get_connection()
+    return [tuple(r) for r in conn.execute("SELECT * FROM daily_sales ORDER BY day;")]
+
+
+def test_daily_sales_rollup_matches_rebuild(db):
+    db_utils.save_order(**make_order(order_date="2024-07-01 09:00:00"))
+    db_utils.save_orders_bulk([
+        make_order([("Ice Cream", 2, 3.0)], "2024-07-01 20:00:00", payment_method="UPI", order_type="Takeaway"),
+        make_order(order_date="2024-07-02 12:00:00", payment_method="Card", discount=0.5),
+    ])
+    incremental = _rollup()
+    assert db_utils.rebuild_daily_sales() == 2
+    assert _rollup() == incremental
+    day = dict(db_utils.get_connection().execute("SELECT * FROM daily_sales WHERE day = '2024-07-01';").fetchone())
+    assert (day["order_count"], day["total"], day["cash_count"], day["upi_count"], day["takeaway_count"]) == (
+        2, 10.5, 1, 1, 1)
+    assert db_utils.get_total_sales()["total_orders"] == 3
+    summary = db_utils.get_sales_summary("2024-07-01", "2024-07-02")
+    assert [r["date"] for r in summary["daily_summary"]] == ["2024-07-02", "2024-07-01"]
+
+
+def test_rebuild_range_only_touches_that_range(db):
+    db_utils.save_orders_bulk([make_order(order_date=f"2024-07-0{d} 12:00:00") for d in (1, 2, 3)])
+    with db_utils.transaction() as conn:
+        conn.execute("UPDATE daily_sales SET order_count = 99;")
+    assert db_utils.rebuild_daily_sales("2024-07-02", "2024-07-02") == 1
+    assert [r[1] for r in _rollup()] == [99, 1, 99]
+
+
+def test_rollup_migration_backfills_existing_orders(db):
+    db_utils.save_orders_bulk([make_order(order_date="2024-07-01 09:00:00"),
+                               make_order(order_date="2024-07-05 09:00:00")])
+    expected = _rollup()
+    step = db_utils._MIGRATIONS.index(db_utils._create_daily_sales)
+    with db_utils.transaction() as conn:  # back to a database from before the rollup
+        conn.execute("DROP TABLE daily_sales;")
+        conn.execute(f"PRAGMA user_version = {step};")
+    db_utils.init_database()
+    assert _rollup() == expected
+
+
+def test_legacy_database_migrates_to_current_schema(tmp_path, monkeypatch):
+    # Schema of the original release: no order_day/order_uuid, no user_version
+    monkeypatch.setattr(db_utils, "DB_DIR", str(tmp_path))
+    legacy = sqlite3.connect(db_utils._db_path())
+    legacy.executescript("""
+        CREATE TABLE menu (id INTEGER PRIMARY KEY AUTOINCREMENT, item_name TEXT NOT NULL UNIQUE,
+                           category TEXT NOT NULL, price REAL NOT NULL CHECK(price > 0),
+                           gst REAL NOT NULL DEFAULT 5.0);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY AUTOINCREMENT, order_type TEXT NOT NULL,
+                             subtotal REAL NOT NULL, gst REAL NOT NULL, discount REAL NOT NULL DEFAULT 0,
+                             total REAL NOT NULL, payment_method TEXT NOT NULL, order_date TEXT NOT NULL);
+        CREATE TABLE order_items (id INTEGER PRIMARY KEY AUTOINCREMENT, order_id INTEGER NOT NULL,
+                                  item_name TEXT NOT NULL, quantity INTEGER NOT NULL, price REAL NOT NULL);
+        INSERT INTO orders VALUES (1, 'Dine-In', 4.0, 0.2, 0, 4.2, 'Cash', '2023-12-31 22:00:00');
+        INSERT INTO order_items VALUES (1, 1, 'Coke', 2, 2.0);
+    """)
+    legacy.close()
+    try:
+        db_utils.init_database()
+        conn = db_utils.get_connection()
+        assert conn.execute("PRAGMA user_version;").fetchone()[0] == db_utils.SCHEMA_VERSION
+        assert conn.execute("SELECT order_day FROM orders;").fetchone()[0] == "2023-12-31"
+        assert db_utils.get_total_sales()["total_orders"] == 1
+        assert db_utils.save_order(**make_order(order_uuid="new")) == 2
+        db_utils.init_database()  # up to date: nothing to do
+        assert conn.execute("PRAGMA user_version;").fetchone()[0] == db_utils.SCHEMA_VERSION
+    finally:
+        db_utils.close_connections()
+        db_utils.invalidate_menu_cache()
@@ -0,0 +1,59 @@
+# tests/test_exporter.py
+import csv
+import gzip
+import json
+import os
+
+import pytest
+
+from conftest import make_order
+from utils import db_utils
+from utils.exporter import export, write_rows
+
+
+def _seed():
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-01-10 12:00:00"),
+        make_order([("Coke", 1, 2.0), ("Ice Cream", 4, 3.0)], "2024-01-10 18:00:00"),
+        make_order([("Ice Cream", 1, 3.0)], "2024-02-01 09:30:00"),
+    ])
+
+
+@pytest.mark.parametrize("kind, rows", [("orders", 3), ("items", 4), ("daily", 2)])
+def test_export_row_counts(db, kind, rows):
+    _seed()
+    path = os.path.join(db, f"{kind}.csv")
+    assert export(kind, path, "2024-01-01", "2024-02-29") == rows
+    with open(path, newline="", encoding="utf-8") as f:
+        assert len(list(csv.reader(f))) == rows + 1  # header
+
+
+def test_export_daily_gzip_jsonl(db):
+    _seed()
+    path = os.path.join(db, "daily.jsonl.gz")
+    assert export("daily", path, "2024-01-10", "2024-01-10") == 1
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        [row] = [json.loads(line) for line in f]
+    assert row == {"date": "2024-01-10", "total_sales": 18.9, "total_orders": 2, "most_sold_item": "Ice Cream"}
+    assert not os.path.exists(path + ".part")
+
+
+def test_export_empty_range_writes_header_only(db):
+    _seed()
+    path = os.path.join(db, "orders.csv.gz")
+    assert export("orders", path, "2025-01-01", "2025-01-31") == 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read().startswith("id,order_date,")
+
+
+def test_export_inverted_range_is_rejected(db):
+    path = os.path.join(db, "daily.csv")
+    with pytest.raises(ValueError, match="after end date"):
+        export("daily", path, "2024-02-01", "2024-01-01")
+    assert not os.path.exists(path)
+
+
+def test_write_rows_without_header(tmp_path):
+    path = str(tmp_path / "empty.csv")
+    assert write_rows(iter(()), path) == 0
+    assert os.path.getsize(path) == 0
@@ -0,0 +1,63 @@
+# tests/test_menu_search.py
+from collections import namedtuple
+
+import pytest
+
+from utils.menu_search import MenuSearchIndex, normalize
+
+Item = namedtuple("Item", "item_name category")
+
+MENU = [
+    Item("Burger", "Food"),
+    Item("Chicken Burger", "Food"),
+    Item("Veg Burrito", "Food"),
+    Item("Hamburger", "Food"),
+    Item("New York Cheesecake", "Dessert"),
+    Item("Club Sandwich", "Food"),
+    Item("Coke", "Beverage"),
+]
+
+
+def _names(items):
+    return [i.item_name for i in items]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return MenuSearchIndex(MENU)
+
+
+def test_normalize():
+    assert normalize("  Mac-&-Cheese_XL ") == "mac cheese xl"
+
+
+def test_ranking_exact_then_prefix_then_substring(index):
+    # name starts with it, then a name word starts with it, then trigram (substring) matches
+    assert _names(index.search("bur")) == ["Burger", "Chicken Burger", "Veg Burrito", "Hamburger"]
+    assert _names(index.search("burger")) == ["Burger", "Chicken Burger", "Hamburger"]
+
+
+def test_category_words_rank_below_name_words(index):
+    assert _names(index.search("dessert")) == ["New York Cheesecake"]
+    # Coke matches by its category (Beverage); Club Sandwich and Hamburger only inside a word
+    assert _names(index.search("b")) == ["Burger", "Chicken Burger", "Veg Burrito", "Coke", "Club Sandwich", "Hamburger"]
+
+
+def test_every_term_must_match(index):
+    assert _names(index.search("chi bur")) == ["Chicken Burger"]
+    assert index.search("chi coke") == []
+
+
+def test_case_and_punctuation_folded(index):
+    assert index.search("BURGER") == index.search("burger")
+    assert index.search("new-york") == index.search("New York")
+
+
+def test_short_queries_match_inside_words(index):
+    assert _names(index.search("ew")) == ["New York Cheesecake"]
+    assert _names(index.search("ch")) == ["Chicken Burger", "New York Cheesecake", "Club Sandwich"]
+
+
+def test_empty_query_and_limit(index):
+    assert _names(index.search("")) == sorted(i.item_name for i in MENU)
+    assert _names(index.search("bur", limit=2)) == ["Burger", "Chicken Burger"]
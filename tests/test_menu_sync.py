@@ -0,0 +1,68 @@
+# tests/test_menu_sync.py
+import sqlite3
+
+import pytest
+
+from utils import db_utils
+from utils.menu_sync import read_menu_csv, sync_menu
+
+
+def _menu_csv(tmp_path, rows):
+    path = tmp_path / "menu.csv"
+    path.write_text("item_name,category,price,gst\n" + "".join(f"{r}\n" for r in rows), encoding="utf-8")
+    return str(path)
+
+
+def _menu():
+    return {i.item_name: (i.category, i.price, i.gst) for i in db_utils.load_menu()}
+
+
+def _new_menu(tmp_path):
+    """The sample menu with Coke repriced, Tea dropped and Lassi added."""
+    rows = [f"{n},{c},{3.0 if n == 'Coke' else p},{g}" for n, c, p, g in db_utils.SAMPLE_MENU if n != "Tea"]
+    return _menu_csv(tmp_path, rows + ["Lassi,Beverage,2.75,5"])
+
+
+def test_read_menu_csv_rejects_bad_rows(tmp_path):
+    with pytest.raises(ValueError, match=":3: duplicate item_name 'Coke'"):
+        read_menu_csv(_menu_csv(tmp_path, ["Coke,Beverage,2,5", "Coke,Beverage,2,5"]))
+    with pytest.raises(ValueError, match="price must be > 0"):
+        read_menu_csv(_menu_csv(tmp_path, ["Coke,Beverage,0,5"]))
+
+
+def test_sync_detects_insert_update_delete(db, tmp_path):
+    changes = sync_menu(_new_menu(tmp_path))
+    assert changes["inserted"] == ["Lassi"]
+    assert changes["updated"] == {"Coke": {"price": (2.0, 3.0)}}
+    assert changes["deleted"] == ["Tea"]
+    assert changes["unchanged"] == len(db_utils.SAMPLE_MENU) - 2
+    menu = _menu()
+    assert menu["Coke"] == ("Beverage", 3.0, 5)
+    assert menu["Lassi"] == ("Beverage", 2.75, 5)
+    assert "Tea" not in menu
+
+
+def test_keep_missing_items(db, tmp_path):
+    changes = sync_menu(_new_menu(tmp_path), delete_missing=False)
+    assert changes["deleted"] == []
+    assert "Tea" in _menu()
+
+
+def test_dry_run_writes_nothing_and_takes_no_lock(db, tmp_path):
+    before = _menu()
+    db_utils.configure_db(busy_timeout=0, write_retries=0)
+    other = sqlite3.connect(db_utils._db_path(), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE;")  # a dry run must still work while the till is writing
+    try:
+        changes = sync_menu(_new_menu(tmp_path), dry_run=True)
+    finally:
+        other.close()
+    assert changes["inserted"] == ["Lassi"]
+    assert _menu() == before
+
+
+def test_sync_refreshes_menu_catalog(db, tmp_path):
+    catalog = db_utils.menu_catalog()
+    assert "Lassi" not in [i.item_name for i in catalog.items]
+    sync_menu(_new_menu(tmp_path))
+    assert "Lassi" in [i.item_name for i in catalog.items]
@@ -0,0 +1,50 @@
+# tests/test_order_journal.py
+import os
+
+from conftest import make_order
+from utils import db_utils
+from utils.order_journal import OrderJournal, encode_record, scan
+
+
+def _saved_uuids():
+    return sorted(r[0] for r in db_utils.get_connection().execute("SELECT order_uuid FROM orders;"))
+
+
+def test_scan_stops_at_torn_or_corrupt_record(tmp_path):
+    path = tmp_path / "j"
+    a, b = encode_record({"n": 1}), encode_record({"n": 2})
+    path.write_bytes(a + b + b[:-3])
+    records, end = scan(str(path))
+    assert [o["n"] for _, o in records] == [1, 2]
+    assert end == len(a) + len(b)
+    path.write_bytes(a + b[:-1] + b"X")  # bad checksum
+    assert scan(str(path)) == ([(len(a), {"n": 1})], len(a))
+
+
+def test_torn_tail_dropped_and_rest_replayed(db):
+    path = os.path.join(db, "orders.journal")
+    with open(path, "wb") as f:
+        f.write(encode_record(make_order(order_uuid="a")))
+        f.write(encode_record(make_order(order_uuid="b")))
+        f.write(encode_record(make_order(order_uuid="c"))[:10])  # crash mid-append
+    journal = OrderJournal(path).start()
+    try:
+        assert journal.pending_count == 0
+        assert _saved_uuids() == ["a", "b"]
+        journal.append(make_order(order_uuid="d"))
+    finally:
+        journal.stop()
+    records, end = scan(path)
+    assert end == os.path.getsize(path)  # torn bytes were cut before the new append
+    assert [o["order_uuid"] for _, o in records] == ["a", "b", "d"]
+    assert _saved_uuids() == ["a", "b", "d"]
+
+
+def test_replay_after_lost_checkpoint_is_idempotent(db):
+    path = os.path.join(db, "orders.journal")
+    journal = OrderJournal(path, apply_interval=0.01).start()
+    journal.append_many([make_order(order_uuid="x"), make_order(order_uuid="y")])
+    journal.stop()
+    os.remove(path + ".ckpt")  # crash before the checkpoint was written
+    OrderJournal(path).start().stop()
+    assert _saved_uuids() == ["x", "y"]
@@ -0,0 +1,91 @@
+# tests/test_order_writer.py
+import json
+import os
+import sqlite3
+
+from conftest import make_order
+from utils import db_utils
+from utils.order_writer import BackgroundOrderWriter
+
+
+def _drain(writer, n):
+    """Wait for n completions. Returns: list of (status, order_uuid, result)"""
+    return [writer.completions.get(timeout=10)[:3] for _ in range(n)]
+
+
+def test_permanent_error_does_not_block_queue(db, monkeypatch):
+    save_order = db_utils.save_order
+
+    def flaky(**kwargs):
+        if kwargs["order_uuid"] == "bad":
+            raise sqlite3.OperationalError("no such column: nope")
+        return save_order(**kwargs)
+
+    monkeypatch.setattr(db_utils, "save_order", flaky)
+    writer = BackgroundOrderWriter(retry_delay=0.01).start()
+    try:
+        writer.submit(make_order(order_uuid="bad"))
+        writer.submit(make_order(order_uuid="good"))
+        results = _drain(writer, 2)
+    finally:
+        writer.stop()
+    assert [(s, u) for s, u, _ in results] == [("failed", "bad"), ("saved", "good")]
+    with open(writer.spool_path + ".failed", encoding="utf-8") as f:
+        assert [json.loads(line)["order_uuid"] for line in f] == ["bad"]
+    assert writer.pending_count == 0
+
+
+def test_busy_order_requeued_not_lost(db, monkeypatch):
+    save_order = db_utils.save_order
+    calls = []
+
+    def locked_for_x(**kwargs):
+        calls.append(kwargs["order_uuid"])
+        if kwargs["order_uuid"] == "x" and calls.count("x") <= 5:
+            raise sqlite3.OperationalError("database is locked")
+        return save_order(**kwargs)
+
+    monkeypatch.setattr(db_utils, "save_order", locked_for_x)
+    writer = BackgroundOrderWriter(retry_delay=0.01, max_retry_delay=0.02, notify_after=2, max_attempts=3).start()
+    try:
+        writer.submit(make_order(order_uuid="x"))
+        writer.submit(make_order(order_uuid="y"))
+        results = _drain(writer, 3)
+    finally:
+        writer.stop()
+    # x goes to the back of the queue after 3 locked attempts, so y is saved first
+    assert [(s, u) for s, u, _ in results] == [("retrying", "x"), ("saved", "y"), ("saved", "x")]
+    assert calls == ["x", "x", "x", "y", "x", "x", "x"]
+    assert not os.path.exists(writer.spool_path + ".failed")
+    assert writer.pending_count == 0
+
+
+def test_busy_order_stays_spooled_on_stop(db, monkeypatch):
+    def locked(**kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db_utils, "save_order", locked)
+    spool = os.path.join(db, "spool")
+    writer = BackgroundOrderWriter(spool_path=spool, retry_delay=0.01, max_retry_delay=0.01, max_attempts=2).start()
+    writer.submit(make_order(order_uuid="z"))
+    _drain(writer, 1)  # "retrying"
+    writer.stop()
+    with open(spool, encoding="utf-8") as f:
+        assert [json.loads(line)["order"]["order_uuid"] for line in f] == ["z"]
+    assert not os.path.exists(spool + ".failed")
+
+
+def test_spooled_order_replayed_once(db):
+    spool = os.path.join(db, "spool")
+    order = make_order(order_uuid="once")
+    ids = []
+    for _ in range(2):  # crash before "done" was written: the order is replayed again
+        with open(spool, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "add", "order": order}) + "\n")
+        writer = BackgroundOrderWriter(spool_path=spool).start()
+        [(status, _, order_id)] = _drain(writer, 1)
+        writer.stop()
+        assert status == "saved"
+        ids.append(order_id)
+    assert ids[0] == ids[1]
+    assert db_utils.get_total_sales()["total_orders"] == 1
@@ -0,0 +1,100 @@
+# tests/test_partitions.py
+import os
+
+import pytest
+
+from conftest import make_order
+from utils import db_utils
+from utils.partitions import archive_orders, period_of
+from utils.report_engine import ReportEngine
+
+
+def _register(name, start_day, end_day, file="missing.db"):
+    with db_utils.transaction() as conn:
+        conn.execute("""
+            INSERT INTO order_partitions (name, file, start_day, end_day, order_count, archived_at)
+            VALUES (?, ?, ?, ?, 0, '2024-01-01 00:00:00');
+        """, (name, file, start_day, end_day))
+
+
+def _spans(segments):
+    return [(p["name"] if p is not None else None, lo, hi) for p, lo, hi in segments]
+
+
+def test_period_of():
+    assert period_of("2024-12-15", "month") == ("2024-12", "2024-12-01", "2025-01-01")
+    assert period_of("2024-12-15 10:00:00", "year") == ("2024", "2024-01-01", "2025-01-01")
+    with pytest.raises(ValueError):
+        period_of("2024-12-15", "week")
+
+
+def test_order_segments_routes_range(db):
+    _register("2024-02", "2024-02-01", "2024-03-01")
+    _register("2024-03", "2024-03-01", "2024-04-01")
+    conn = db_utils.get_connection()
+    assert _spans(db_utils.order_segments(conn, "2024-01-15", "2024-05-01")) == [
+        (None, "2024-01-15", "2024-02-01"),
+        ("2024-02", "2024-02-01", "2024-03-01"),
+        ("2024-03", "2024-03-01", "2024-04-01"),
+        (None, "2024-04-01", "2024-05-01"),
+    ]
+    assert _spans(db_utils.order_segments(conn, "2024-02-10", "2024-02-11")) == [("2024-02", "2024-02-10", "2024-02-11")]
+    assert _spans(db_utils.order_segments(conn, "2024-06-01", "2024-06-02")) == [(None, "2024-06-01", "2024-06-02")]
+
+
+def test_attach_partition(db):
+    conn = db_utils.get_connection()
+    with db_utils.attach_partition(conn, None) as schemas:
+        assert schemas == ["main"]
+    _register("2024-02", "2024-02-01", "2024-03-01")
+    part = conn.execute("SELECT * FROM order_partitions;").fetchone()
+    with pytest.raises(FileNotFoundError):
+        with db_utils.attach_partition(conn, part):
+            pass
+
+    db_utils.save_orders_bulk([make_order(order_date="2024-02-10 10:00:00")])
+    archive_orders("2024-03-01")
+    part = conn.execute("SELECT * FROM order_partitions;").fetchone()
+    with db_utils.attach_partition(conn, part) as schemas:
+        alias = schemas[0]
+        assert schemas == [alias, "main"]
+        assert conn.execute(f"SELECT COUNT(*) FROM {alias}.orders;").fetchone()[0] == 1
+    assert alias not in [r[1] for r in conn.execute("PRAGMA database_list;")]
+
+
+def test_archived_orders_still_reported(db):
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-01-20 10:00:00"),
+        make_order([("Ice Cream", 1, 3.0)], "2024-02-10 10:00:00"),
+        make_order([("Coke", 1, 2.0)], "2024-03-05 10:00:00"),
+    ])
+    with ReportEngine(workers=1) as engine:
+        before = engine.sales_report("2024-01-01", "2024-03-31")
+    assert archive_orders("2024-03-01") == [("2024-01", 1), ("2024-02", 1)]
+    conn = db_utils.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM orders;").fetchone()[0] == 1
+    assert os.path.exists(os.path.join(db, db_utils.list_partitions()[0]["file"]))
+
+    # A late order for an archived month is read from the hot database too
+    db_utils.save_order(**make_order([("Coke", 4, 2.0)], "2024-02-11 10:00:00"))
+    assert [o["order_date"] for o in db_utils.get_orders_by_date("2024-02-10")] == ["2024-02-10 10:00:00"]
+    assert len(db_utils.get_orders_by_date("2024-02-11")) == 1
+    with ReportEngine(workers=1) as engine:
+        after = engine.sales_report("2024-01-01", "2024-03-31")
+    assert after["total_orders"] == before["total_orders"] + 1
+    assert after["top_items"][0] == {"item_name": "Coke", "total_quantity": 7}
+    top = db_utils.get_sales_summary("2024-01-01", "2024-03-31")["top_items"]
+    assert top[0] == {"item_name": "Coke", "total_quantity": 7}
+
+
+def test_replayed_uuid_not_duplicated_after_archiving(db):
+    order = make_order([("Coke", 2, 2.0)], "2024-01-20 10:00:00", order_uuid="jan-1")
+    [order_id] = db_utils.save_orders_bulk([order])
+    assert archive_orders("2024-03-01") == [("2024-01", 1)]
+    # e.g. a spooled or journalled order replayed after its month was archived
+    assert db_utils.save_order(**order) == order_id
+    assert db_utils.save_orders_bulk([order, make_order(order_date="2024-01-21 10:00:00")])[0] == order_id
+    conn = db_utils.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM orders WHERE order_uuid = 'jan-1';").fetchone()[0] == 0
+    with ReportEngine(workers=1) as engine:
+        assert engine.sales_report("2024-01-01", "2024-01-31")["total_orders"] == 2
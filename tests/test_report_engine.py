@@ -0,0 +1,68 @@
+# tests/test_report_engine.py
+import threading
+
+from conftest import make_order
+from utils import db_utils
+from utils.report_engine import ReportEngine, rollup_totals, split_range, top_items
+
+
+def _seed():
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-01-10 12:00:00"),
+        make_order([("Coke", 1, 2.0), ("Ice Cream", 1, 3.0)], "2024-01-31 23:59:59"),
+        make_order([("Ice Cream", 3, 3.0)], "2024-02-01 00:00:00"),
+        make_order([("Ice Cream", 1, 3.0)], "2024-03-05 09:30:00"),
+    ])
+
+
+def test_split_range_months_and_days():
+    assert split_range("2024-01-30", "2024-03-02") == [
+        ("2024-01-30", "2024-02-01"), ("2024-02-01", "2024-03-01"), ("2024-03-01", "2024-03-03")]
+    assert split_range("2024-02-28", "2024-03-01", "day") == [
+        ("2024-02-28", "2024-02-29"), ("2024-02-29", "2024-03-01"), ("2024-03-01", "2024-03-02")]
+
+
+def test_inline_matches_pool(db):
+    _seed()
+    with ReportEngine(workers=1) as engine:
+        inline = engine.sales_report("2024-01-01", "2024-03-31")
+    with ReportEngine(workers=2) as engine:
+        pooled = engine.sales_report("2024-01-01", "2024-03-31")
+    assert inline == pooled
+    assert inline["total_orders"] == 4
+    assert [d["date"] for d in inline["daily_summary"]] == ["2024-03-05", "2024-02-01", "2024-01-31", "2024-01-10"]
+    assert inline["top_items"][0] == {"item_name": "Ice Cream", "total_quantity": 5}
+
+
+def test_rollup_totals_and_top_items_match_engine(db):
+    _seed()
+    conn = db_utils.get_connection()
+    with ReportEngine(workers=1) as engine:
+        report = engine.sales_report("2024-01-01", "2024-02-29")
+    totals = rollup_totals(conn, "2024-01-01", "2024-02-29")
+    assert (totals["total_orders"], totals["total_sales"], totals["avg_order_value"]) == (
+        report["total_orders"], report["total_sales"], report["avg_order_value"])
+    assert totals["gst"] == round(sum(d["gst"] for d in report["daily_summary"]), 2)
+    assert top_items(conn, "2024-01-01", "2024-02-29") == report["top_items"]
+    assert rollup_totals(conn, "2025-01-01", "2025-01-31") == {
+        "total_orders": 0, "total_sales": 0, "avg_order_value": None, "gst": 0, "discount": 0}
+
+
+def test_inline_reports_from_other_threads(db):
+    _seed()
+    engine = ReportEngine(workers=1)
+    results, errors = [], []
+
+    def report():
+        try:
+            results.append(engine.sales_report("2024-01-01", "2024-01-31"))
+        except Exception as e:  # pragma: no cover - the failure being tested
+            errors.append(e)
+
+    for _ in range(2):  # a second thread must not reuse the first thread's connection
+        t = threading.Thread(target=report)
+        t.start()
+        t.join()
+    engine.close()  # must not touch connections of other threads
+    assert errors == []
+    assert [r["total_orders"] for r in results] == [2, 2]
@@ -0,0 +1,54 @@
+# tests/test_report_window.py
+import queue
+from datetime import date
+
+from conftest import make_order
+from utils import db_utils
+from ui.report_window import ReportWorker, periods
+
+
+def test_periods():
+    today = date(2024, 3, 6)
+    assert periods("Day", 2, today) == [("2024-03-06", "2024-03-06", "2024-03-06"),
+                                        ("2024-03-05", "2024-03-05", "2024-03-05")]
+    assert periods("Week", 1, today) == [("2024-W10", "2024-03-04", "2024-03-10")]
+    assert periods("Month", 2, today) == [("2024-03", "2024-03-01", "2024-03-31"),
+                                          ("2024-02", "2024-02-01", "2024-02-29")]
+
+
+def _run(spans):
+    results = queue.Queue()
+    worker = ReportWorker(spans, results, db_utils._db_path())
+    worker.start()
+    worker.join(10)
+    out = []
+    while not results.empty():
+        out.append(results.get())
+    return out
+
+
+def test_worker_streams_rollup_totals_then_top_items(db):
+    db_utils.save_orders_bulk([
+        make_order([("Coke", 2, 2.0)], "2024-03-06 10:00:00"),
+        make_order([("Ice Cream", 1, 3.0)], "2024-02-10 10:00:00", discount=0.5),
+    ])
+    msgs = _run(periods("Month", 3, date(2024, 3, 6)))
+    assert [m[0] for m in msgs] == ["row"] * 3 + ["top"] * 3 + ["done"]
+    assert [(m[1], m[2]["total_orders"]) for m in msgs[:3]] == [("2024-03", 1), ("2024-02", 1), ("2024-01", 0)]
+    assert msgs[1][2]["discount"] == 0.5
+    assert [m[2] for m in msgs[3:6]] == [{"item_name": "Coke", "total_quantity": 2},
+                                         {"item_name": "Ice Cream", "total_quantity": 1}, None]
+    assert msgs[-1] == ("done", 3)
+
+
+def test_cancelled_worker_stops_early(db):
+    results = queue.Queue()
+    worker = ReportWorker(periods("Day", 30, date(2024, 3, 6)), results, db_utils._db_path())
+    worker.cancel()  # before it starts: totals still stream, no line-item scans
+    worker.start()
+    worker.join(10)
+    msgs = []
+    while not results.empty():
+        msgs.append(results.get())
+    assert msgs[-1] == ("cancelled", 0)
+    assert sum(m[0] == "top" for m in msgs) == 0
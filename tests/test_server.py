@@ -0,0 +1,126 @@
+# tests/test_server.py
+import asyncio
+import json
+import time
+
+import pytest
+
+from server import BillingServer
+from utils import db_utils
+
+
+async def _request(port, raw):
+    """Send raw request bytes. Returns: (status, JSON body)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(raw)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = next(int(line.split(b":", 1)[1]) for line in head.split(b"\r\n")
+                      if line.lower().startswith(b"content-length:"))
+        return status, json.loads(await reader.readexactly(length))
+    finally:
+        writer.close()
+
+
+def _post(body, extra_headers=""):
+    body = body.encode() if isinstance(body, str) else body
+    return (f"POST /orders HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{extra_headers}"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def _serve(requests, **kwargs):
+    async def main():
+        server = BillingServer(port=0, readers=2, report_workers=1, **kwargs)
+        await server.start()
+        try:
+            return [await _request(server.port, raw) for raw in requests]
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3", " "])
+def test_bad_content_length_is_400(db, length):
+    raw = f"POST /orders HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode()
+    [(status, body)] = _serve([raw])
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_oversized_body_is_413(db):
+    raw = b"POST /orders HTTP/1.1\r\nHost: x\r\nContent-Length: 99999999\r\n\r\n"
+    [(status, _)] = _serve([raw])
+    assert status == 413
+
+
+@pytest.mark.parametrize("body, message", [
+    ("not json", "body must be JSON"),
+    ("[1, 2]", "body must be a JSON object"),
+    ('{"items": []}', "items must be a non-empty list"),
+    ('{"order_type": "Drone", "items": [{"item_name": "Coke"}]}', "order_type"),
+    ('{"items": [{"item_name": "Coke", "quantity": 0}]}', "between 1 and"),
+    ('{"items": [{"item_name": "Nope", "quantity": 1}]}', "unknown menu item"),
+    ('{"items": [{"item_name": "Coke"}], "discount": "lots"}', "discount"),
+    ('{"items": [{"item_name": "Coke"}], "order_uuid": 7}', "order_uuid"),
+    ('{"items": [{"item_name": ["x"], "quantity": 1}]}', "item_name must be a string"),
+    ('{"items": [{"item_name": {"a": 1}}]}', "item_name must be a string"),
+    ('{"items": [{"item_name": "Coke", "quantity": 1e30}]}', "quantity"),
+    ('{"items": [{"item_name": "Coke", "quantity": 1e400}]}', "quantity"),
+    ('{"items": [{"item_name": "Coke"}], "discount": 1e300}', "discount must be between"),
+    ('{"items": [{"item_name": "Coke"}], "discount": -1}', "discount must be between"),
+    ('{"items": [{"item_name": "Coke"}], "discount": NaN}', "discount must be between"),
+    ('{"items": [{"item_name": "Coke"}], "discount_pct": 150}', "discount_pct"),
+])
+def test_invalid_orders_are_400(db, body, message):
+    [(status, payload)] = _serve([_post(body)])
+    assert status == 400
+    assert message in payload["error"]
+
+
+def test_missing_query_parameter_and_bad_chunk(db):
+    results = _serve([
+        b"GET /orders HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+        b"GET /reports/range?start=2024-01-01&chunk=week HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+    ])
+    assert [s for s, _ in results] == [400, 400]
+    assert "date" in results[0][1]["error"]
+
+
+def test_valid_order_is_created(db):
+    [(status, payload)] = _serve([_post('{"items": [{"item_name": "Coke", "quantity": 2}], "order_uuid": "u1"}')])
+    assert status == 201
+    assert payload["order_uuid"] == "u1"
+    assert payload["order_id"] == 1
+
+
+def test_timed_out_order_is_accepted_and_saved_once(db, monkeypatch):
+    save = db_utils.save_orders_bulk
+
+    def slow_save(orders, batch_size=1000):
+        time.sleep(0.3)
+        return save(orders, batch_size)
+
+    monkeypatch.setattr(db_utils, "save_orders_bulk", slow_save)
+    body = '{"items": [{"item_name": "Coke", "quantity": 1}]}'
+
+    async def main():
+        server = BillingServer(port=0, readers=2, report_workers=1, request_timeout=0.1)
+        await server.start()
+        try:
+            first = await _request(server.port, _post(body))
+            retry = json.dumps({"items": [{"item_name": "Coke", "quantity": 1}],
+                                "order_uuid": first[1]["order_uuid"]})
+            server.request_timeout = 5.0
+            second = await _request(server.port, _post(retry))
+            return first, second
+        finally:
+            await server.stop()
+
+    (status, payload), (status2, payload2) = asyncio.run(main())
+    assert status == 202
+    assert payload["status"] == "queued"
+    assert status2 == 201
+    assert payload2["order_uuid"] == payload["order_uuid"]
+    assert db_utils.get_total_sales()["total_orders"] == 1
@@ -0,0 +1,65 @@
+# tests/test_transaction.py
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import make_order
+from utils import db_utils
+
+
+def _hold_write_lock():
+    other = sqlite3.connect(db_utils._db_path(), isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE;")
+    return other
+
+
+def test_begin_retried_until_lock_released(db):
+    db_utils.configure_db(busy_timeout=0, write_retries=5, retry_backoff_ms=20)
+    other = _hold_write_lock()
+    timer = threading.Timer(0.05, other.rollback)
+    timer.start()
+    try:
+        with db_utils.transaction() as conn:
+            conn.execute("INSERT INTO daily_sales (day) VALUES ('2024-01-01');")
+    finally:
+        timer.join()
+        other.close()
+    assert db_utils.get_connection().execute("SELECT COUNT(*) FROM daily_sales;").fetchone()[0] == 1
+
+
+def test_gives_up_after_retries_without_doing_work(db):
+    db_utils.configure_db(busy_timeout=0, write_retries=2, retry_backoff_ms=1)
+    other = _hold_write_lock()
+    ran = []
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            with db_utils.transaction():
+                ran.append(True)
+    finally:
+        other.close()
+    assert ran == []
+    assert not db_utils.get_connection().in_transaction
+
+
+def test_other_errors_not_retried(db):
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise sqlite3.OperationalError("no such table: nope")
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        db_utils._retry_busy(broken)
+    assert calls == [1]
+
+
+def test_nested_transaction_commits_once_and_rolls_back_whole(db):
+    with pytest.raises(RuntimeError):
+        with db_utils.transaction():
+            db_utils.save_order(**make_order())  # nested transaction() joins the outer one
+            raise RuntimeError("abort")
+    assert db_utils.get_total_sales()["total_orders"] == 0
+    with db_utils.transaction():
+        db_utils.save_order(**make_order())
+    assert db_utils.get_total_sales()["total_orders"] == 1